@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Declarative recovery of dropped columns from Supabase (standard library only)
+
+A recovery spec names the enum types to recreate and, per table, the key and
+the columns to copy back from Supabase:
+
+    {
+      "enum_types": {"gender_filter": ["MALE", "FEMALE", "ANY"]},
+      "tables": [
+        {"table": "member", "key": "id", "columns": {"gender": "gender_filter"}}
+      ]
+    }
+
+Every enum type and every table is one step, and a table depends on the enum
+types of its columns. Steps run on a thread pool as soon as their
+dependencies are done, so independent tables are fetched and applied
+concurrently and the whole recovery takes about as long as the slowest
+table. Each table is read in one keyset-paginated pass selecting all of its
+recovered columns, and every page is applied as batched multi-column UPDATEs.
+"""
+
+import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from graphlib import TopologicalSorter
+
+from sql_batch import DEFAULT_CHUNK_SIZE, apply_batched_row_updates, sql_identifier, sql_literal, sql_type
+
+DEFAULT_WORKERS = 4
+
+# The columns lost in the CASCADE drop of the enum types
+DEFAULT_SPEC = {
+    'enum_types': {
+        'gender_filter': ['MALE', 'FEMALE', 'ANY'],
+        'activity_type': ['SESSION', 'CAMP', 'COURSE', 'EVENT', 'CAMPAIGN', 'PROTECTION_SESSION', 'BODH_SESSION'],
+        'family_relation': ['SELF', 'FATHER', 'MOTHER', 'HUSBAND', 'WIFE', 'SON', 'DAUGHTER', 'BROTHER', 'SISTER',
+                            'GRANDFATHER', 'GRANDMOTHER', 'GRANDSON', 'GRANDDAUGHTER', 'UNCLE', 'AUNT', 'COUSIN',
+                            'NEPHEW', 'NIECE', 'GUARDIAN', 'RELATIVE', 'OTHER'],
+    },
+    'tables': [
+        {'table': 'member', 'key': 'id', 'columns': {'gender': 'gender_filter'}},
+        {'table': 'activities', 'key': 'id', 'columns': {'type': 'activity_type', 'allowed_gender': 'gender_filter'}},
+        {'table': 'family_member', 'key': 'id', 'columns': {'relation_to_head': 'family_relation'}},
+    ],
+}
+
+
+def load_spec(path):
+    """Read a JSON recovery spec; raises ValueError if it is malformed"""
+    with open(path) as f:
+        spec = json.load(f)
+    validate_spec(spec)
+    return spec
+
+
+def validate_spec(spec):
+    for name, values in spec.get('enum_types', {}).items():
+        sql_type(name)
+        if not values:
+            raise ValueError(f"Enum type {name} has no values")
+    tables = spec.get('tables') or []
+    if not tables:
+        raise ValueError("Recovery spec has no tables")
+    seen = set()
+    for table_spec in tables:
+        table = table_spec.get('table')
+        if not table or not table_spec.get('columns'):
+            raise ValueError(f"Table entry needs a table and columns: {table_spec!r}")
+        if table in seen:
+            raise ValueError(f"Table {table} is listed twice")
+        seen.add(table)
+        for column_type in table_spec['columns'].values():
+            sql_type(column_type)
+
+
+def recovery_steps(spec, create_schema=True):
+    """{step: steps it depends on}; steps are ('type', name) and ('table', name)"""
+    enum_types = spec.get('enum_types', {}) if create_schema else {}
+    steps = {('type', name): set() for name in enum_types}
+    for table_spec in spec['tables']:
+        steps[('table', table_spec['table'])] = {
+            ('type', column_type) for column_type in table_spec['columns'].values() if column_type in enum_types
+        }
+    return steps
+
+
+def create_type_sql(name, values):
+    """CREATE TYPE ... AS ENUM, skipped if the type already exists (CREATE TYPE has no IF NOT EXISTS)"""
+    labels = ', '.join(sql_literal(value) for value in values)
+    return (
+        "DO $$ BEGIN\n"
+        f"  IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = {sql_literal(name)}) THEN\n"
+        f"    CREATE TYPE {sql_identifier(name)} AS ENUM ({labels});\n"
+        "  END IF;\n"
+        "END $$;"
+    )
+
+
+def add_columns_sql(table, columns):
+    additions = ',\n  '.join(f"ADD COLUMN IF NOT EXISTS {sql_identifier(column)} {sql_type(column_type)}"
+                             for column, column_type in columns.items())
+    return f"ALTER TABLE {sql_identifier(table)}\n  {additions};"
+
+
+def verification_sql(spec):
+    """One row per recovered column: ('table.column', non-NULL rows in Nhost)"""
+    return '\nUNION ALL\n'.join(
+        f"SELECT {sql_literal(table_spec['table'] + '.' + column)} AS column_name, COUNT(*) AS restored_count "
+        f"FROM {sql_identifier(table_spec['table'])} WHERE {sql_identifier(column)} IS NOT NULL"
+        for table_spec in spec['tables'] for column in table_spec['columns']
+    ) + ';'
+
+
+def _sql_error(result):
+    if 'error' in result or result.get('result_type') not in ('CommandOk', 'TuplesOk'):
+        return result.get('error', result)
+    return None
+
+
+def recover_type(run_sql, name, values):
+    error = _sql_error(run_sql(create_type_sql(name, values)))
+    return {'errors': [f"Creating type {name} failed: {error}"] if error else []}
+
+
+def recover_table(run_sql, fetch_pages, table_spec, create_columns=True, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Re-add the table's columns if needed, then copy their values from Supabase in one streamed pass
+
+    fetch_pages(table, select_fields, key) yields pages of Supabase rows.
+    Returns {'fetched', 'updated', 'values': {column: non-NULL values fetched}, 'errors'}.
+    """
+    table, key = table_spec['table'], table_spec.get('key', 'id')
+    columns = list(table_spec['columns'])
+    result = {'fetched': 0, 'updated': 0, 'values': dict.fromkeys(columns, 0), 'errors': []}
+    if create_columns:
+        error = _sql_error(run_sql(add_columns_sql(table, table_spec['columns'])))
+        if error:
+            result['errors'].append(f"Adding columns to {table} failed: {error}")
+            return result
+
+    try:
+        for page in fetch_pages(table, ','.join([key] + columns), key):
+            result['fetched'] += len(page)
+            rows = []
+            for row in page:
+                values = [row.get(column) or None for column in columns]
+                for column, value in zip(columns, values):
+                    if value is not None:
+                        result['values'][column] += 1
+                if any(value is not None for value in values):
+                    rows.append((row[key], *values))
+            updated, errors = apply_batched_row_updates(run_sql, table, key, columns, rows,
+                                                        casts=table_spec['columns'], chunk_size=chunk_size)
+            result['updated'] += updated
+            result['errors'].extend(errors)
+    except Exception as e:
+        result['errors'].append(f"Fetching {table} from Supabase failed: {e}")
+    return result
+
+
+def run_recovery(run_sql, fetch_pages, spec, workers=DEFAULT_WORKERS, create_schema=True,
+                 chunk_size=DEFAULT_CHUNK_SIZE, on_step=None):
+    """Run every step of the spec in dependency order, independent steps concurrently
+
+    on_step(step, result) is called from this thread as each step finishes.
+    A table whose enum type could not be created is skipped. Returns {step: result}.
+    """
+    tables = {table_spec['table']: table_spec for table_spec in spec['tables']}
+    steps = recovery_steps(spec, create_schema)
+    results = {}
+
+    def run_step(step):
+        kind, name = step
+        if kind == 'type':
+            return recover_type(run_sql, name, spec['enum_types'][name])
+        failed = sorted(dependency[1] for dependency in steps[step] if results[dependency]['errors'])
+        if failed:
+            return {'fetched': 0, 'updated': 0, 'values': {}, 'errors': [f"Skipped {name}: type {', '.join(failed)} missing"]}
+        return recover_table(run_sql, fetch_pages, tables[name], create_schema, chunk_size)
+
+    graph = TopologicalSorter(steps)
+    graph.prepare()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        while graph.is_active():
+            for step in graph.get_ready():
+                running[executor.submit(run_step, step)] = step
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step = running.pop(future)
+                results[step] = future.result()
+                if on_step:
+                    on_step(step, results[step])
+                graph.done(step)
+    return results
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Content-addressed upload index for storage deduplication (standard library only)
+
+Maps (bucket, SHA-256 of the object) to the Nhost file that already holds
+that content, so a second object with identical bytes is recorded as an
+alias of the first instead of being uploaded again. Aliases never cross
+buckets: each Nhost bucket has its own access rules.
+"""
+
+import hashlib
+import threading
+
+from migration_journal import STAGE_UPLOADED
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def new_hasher():
+    return hashlib.sha256()
+
+
+def file_hexdigest(path, chunk_size=HASH_CHUNK_SIZE):
+    """SHA-256 of a file on disk, read in chunks (hashlib.file_digest needs Python 3.11)"""
+    hasher = new_hasher()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ContentIndex:
+    """Thread-safe (bucket, sha256) -> {'nhost_id', 'key'} index with in-flight claims"""
+
+    def __init__(self):
+        self._entries = {}
+        self._uploading = set()
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries)
+
+    def add(self, bucket, digest, nhost_id, key):
+        with self._cond:
+            self._entries.setdefault((bucket, digest), {'nhost_id': nhost_id, 'key': key})
+
+    def claim(self, bucket, digest):
+        """Return the existing entry for this content, or None if the caller should upload it
+
+        A caller that gets None owns the upload and must call release().
+        Workers that see the same content while it is being uploaded wait for
+        that upload rather than sending a second copy.
+        """
+        item = (bucket, digest)
+        with self._cond:
+            while item in self._uploading:
+                self._cond.wait()
+            entry = self._entries.get(item)
+            if entry is None:
+                self._uploading.add(item)
+            return entry
+
+    def release(self, bucket, digest, nhost_id=None, key=None):
+        """Finish a claimed upload; without nhost_id (failed upload) the next worker claims it"""
+        item = (bucket, digest)
+        with self._cond:
+            self._uploading.discard(item)
+            if nhost_id:
+                self._entries.setdefault(item, {'nhost_id': nhost_id, 'key': key})
+            self._cond.notify_all()
+
+    def seed_from_journal(self, journal):
+        """Index uploads recorded by earlier runs; returns the number of entries added"""
+        added = 0
+        for key, entry in journal.entries.items():
+            if entry['stage'] == STAGE_UPLOADED and entry.get('sha256') and entry.get('nhost_id'):
+                if not entry.get('alias_of'):
+                    self.add(key.split('/', 1)[0], entry['sha256'], entry['nhost_id'], key)
+                    added += 1
+        return added
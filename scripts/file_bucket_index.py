@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Compact file -> bucket index for bucket reassignment (standard library only)
+
+Keyed by the full object key ("bucket/path/to/file"), so objects that share a
+basename in different folders or buckets never overwrite each other. Bucket
+names are interned to small integer ids, and the rows live in an SQLite
+database (a private temporary file by default), so millions of objects cost
+disk pages rather than Python objects. Lookups go through the primary key;
+per-bucket iteration and counts use an index on (bucket, key).
+"""
+
+import sqlite3
+
+from sql_batch import chunked
+
+INSERT_BATCH_SIZE = 5000
+
+
+def inventory_bucket(group):
+    """Split an inventory group such as "documents/activity_overview" into (bucket, folder prefix)"""
+    bucket, _, prefix = group.partition('/')
+    return bucket, prefix
+
+
+class FileBucketIndex:
+    def __init__(self, path=''):
+        """Open the index at `path`; the default '' is a temporary file SQLite deletes on close"""
+        self._db = sqlite3.connect(path)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS buckets (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+            CREATE TABLE IF NOT EXISTS files (
+                key TEXT PRIMARY KEY,
+                bucket_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                nhost_id TEXT
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS files_by_bucket ON files (bucket_id, key);
+            CREATE INDEX IF NOT EXISTS files_by_name ON files (name, bucket_id);
+        """)
+        self._bucket_ids = dict(self._db.execute("SELECT name, id FROM buckets"))
+        self._bucket_names = {bucket_id: name for name, bucket_id in self._bucket_ids.items()}
+
+    def _intern(self, bucket):
+        bucket_id = self._bucket_ids.get(bucket)
+        if bucket_id is None:
+            bucket_id = self._db.execute("INSERT INTO buckets (name) VALUES (?)", (bucket,)).lastrowid
+            self._bucket_ids[bucket] = bucket_id
+            self._bucket_names[bucket_id] = bucket
+        return bucket_id
+
+    def add_files(self, files):
+        """Index (bucket, path) pairs; a key seen again keeps its latest bucket. Returns the number added"""
+        added = 0
+        for chunk in chunked(files, INSERT_BATCH_SIZE):
+            rows = []
+            for bucket, path in chunk:
+                path = path.lstrip('/')
+                rows.append((f"{bucket}/{path}", self._intern(bucket), path.rsplit('/', 1)[-1]))
+            self._db.executemany(
+                "INSERT INTO files (key, bucket_id, name) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET bucket_id = excluded.bucket_id", rows)
+            added += len(rows)
+        self._db.commit()
+        return added
+
+    def attach_file_ids(self, records):
+        """Record Nhost file ids from journal records ({'key', 'nhost_id', ...}); later records win"""
+        pairs = ((record['nhost_id'], record['key']) for record in records if record.get('nhost_id'))
+        for chunk in chunked(pairs, INSERT_BATCH_SIZE):
+            self._db.executemany("UPDATE files SET nhost_id = ? WHERE key = ?", chunk)
+        self._db.commit()
+
+    def get(self, key):
+        """(bucket, nhost_id) for a full object key, or None"""
+        row = self._db.execute("SELECT bucket_id, nhost_id FROM files WHERE key = ?", (key,)).fetchone()
+        return None if row is None else (self._bucket_names[row[0]], row[1])
+
+    def __len__(self):
+        return self._db.execute("SELECT count(*) FROM files").fetchone()[0]
+
+    def bucket_counts(self):
+        """{bucket: number of files}"""
+        rows = self._db.execute("SELECT bucket_id, count(*) FROM files GROUP BY bucket_id ORDER BY bucket_id")
+        return {self._bucket_names[bucket_id]: count for bucket_id, count in rows}
+
+    def ambiguous_names(self):
+        """Basenames indexed under more than one bucket - a name-based update cannot tell them apart"""
+        rows = self._db.execute(
+            "SELECT name FROM files GROUP BY name HAVING count(DISTINCT bucket_id) > 1 ORDER BY name")
+        return {name for (name,) in rows}
+
+    def iter_bucket(self, bucket):
+        """Yield (key, name, nhost_id) for every file in `bucket`, in key order"""
+        bucket_id = self._bucket_ids.get(bucket)
+        if bucket_id is None:
+            return
+        yield from self._db.execute(
+            "SELECT key, name, nhost_id FROM files WHERE bucket_id = ? ORDER BY key", (bucket_id,))
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
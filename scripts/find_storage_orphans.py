@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Find (and optionally delete) Nhost storage files that no database row references
+
+Streams storage.files and the referencing columns (member.profile_image,
+activities.media_files, ... - see url_rewrite.REFERENCING_COLUMNS) through
+Hasura run_sql with a sorted merge join, or a Bloom filter when there are
+many references (see storage_orphans.py). Memory stays flat however many
+files there are. Nothing is reported or deleted while a referencing value
+resolves to no file. Candidates and their sizes go to a JSONL report; --delete
+then removes them through the Storage API in throttled batches:
+
+    python3 scripts/find_storage_orphans.py                     # report only
+    python3 scripts/find_storage_orphans.py --bucket documents --min-age-hours 72
+    python3 scripts/find_storage_orphans.py --delete --batch-size 50 --pause 2
+    python3 scripts/find_storage_orphans.py --delete-from nhost/migrations/storage_orphans.jsonl
+"""
+
+import argparse
+import sys
+import time
+import urllib.error
+
+import http_pool
+import request_executor
+from migrate_storage_stdlib import load_credentials, nhost_file_url, nhost_request, run_nhost_sql
+from rate_limit import EndpointLimiter
+from storage_orphans import (
+    DEFAULT_BLOOM_THRESHOLD, DEFAULT_FALSE_POSITIVE_RATE, DEFAULT_MIN_AGE_HOURS, DEFAULT_PAGE_SIZE,
+    NhostReferences, UnresolvedReferences, delete_orphans, find_orphans, write_report,
+)
+
+REPORT_PATH = 'nhost/migrations/storage_orphans.jsonl'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find Nhost storage files no database row references")
+    parser.add_argument('--method', choices=('auto', 'merge', 'bloom'), default='auto',
+                        help="merge: exact sorted merge join; bloom: one pass over the references into a Bloom "
+                             "filter; auto: bloom above --bloom-threshold references (default: auto)")
+    parser.add_argument('--bloom-threshold', type=int, default=DEFAULT_BLOOM_THRESHOLD,
+                        help=f"References above which auto uses the Bloom filter (default: {DEFAULT_BLOOM_THRESHOLD})")
+    parser.add_argument('--false-positive-rate', type=float, default=DEFAULT_FALSE_POSITIVE_RATE,
+                        help="Bloom filter false positive rate; a false positive keeps an orphan "
+                             f"(default: {DEFAULT_FALSE_POSITIVE_RATE})")
+    parser.add_argument('--bucket', action='append', metavar='NAME',
+                        help="Only consider files in this bucket (repeatable; default: every bucket)")
+    parser.add_argument('--min-age-hours', type=float, default=DEFAULT_MIN_AGE_HOURS,
+                        help="Ignore files uploaded more recently than this, whose rows may not be saved yet "
+                             f"(default: {DEFAULT_MIN_AGE_HOURS})")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f"Rows per run_sql page (default: {DEFAULT_PAGE_SIZE})")
+    parser.add_argument('--report', default=REPORT_PATH,
+                        help=f"JSONL report of the orphan candidates (default: {REPORT_PATH})")
+    parser.add_argument('--delete', action='store_true',
+                        help="Delete the candidates through the Storage API after the scan")
+    parser.add_argument('--delete-from', metavar='REPORT',
+                        help="Skip the scan and delete the candidates of an earlier report")
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help="Candidates re-checked and deleted per batch (default: 100)")
+    parser.add_argument('--pause', type=float, default=1.0,
+                        help="Seconds to sleep between delete batches (default: 1)")
+    parser.add_argument('--delete-rps', type=float, default=5.0,
+                        help="Max delete requests per second (0 = unlimited, default: 5)")
+    parser.add_argument('--max-retries', type=int, default=request_executor.DEFAULT_MAX_RETRIES,
+                        help=f"Retries per request on 429/5xx/timeouts (default: {request_executor.DEFAULT_MAX_RETRIES})")
+    args = parser.parse_args(argv)
+    if args.page_size < 1 or args.batch_size < 1 or args.bloom_threshold < 0:
+        parser.error("--page-size and --batch-size must be at least 1, --bloom-threshold at least 0")
+    if not 0 < args.false_positive_rate < 1:
+        parser.error("--false-positive-rate must be between 0 and 1")
+    if args.min_age_hours < 0 or args.pause < 0 or args.delete_rps < 0:
+        parser.error("--min-age-hours, --pause and --delete-rps cannot be negative")
+    if args.delete and args.delete_from:
+        parser.error("--delete deletes the fresh scan's candidates; --delete-from those of an earlier report")
+    return args
+
+
+def delete_file(file_id, limiter):
+    """DELETE one file through the Storage API (object and storage.files row); a 404 counts as deleted"""
+    def send():
+        limiter.before_request()
+        req = nhost_request(nhost_file_url(file_id))
+        req.method = 'DELETE'
+        with http_pool.urlopen(req) as response:
+            response.read()
+            return response.status
+
+    try:
+        request_executor.run('nhost-storage', send, idempotent=True)
+        return True, None
+    except urllib.error.HTTPError as e:
+        if e.code == 404:
+            return True, None
+        return False, f"HTTP {e.code}"
+    except Exception as e:
+        return False, str(e)
+
+
+def print_unresolved(error):
+    """Explain why nothing was reported or deleted: references that resolve to no file"""
+    print(f"✗ Refusing to look for orphans: {error.total} referencing values resolve to no storage file")
+    for column, count, example in error.unresolved:
+        print(f"   • {column}: {count} (e.g. {example[:80]})")
+    print("   Files these values mean would look unreferenced. Rewrite them to file ids "
+          "(00012_update_storage_urls.sql, then 00013) and run again.")
+
+
+def run_delete(source, report_path, args):
+    print(f"\n🗑  Deleting the candidates in {report_path} ({args.batch_size} per batch, "
+          f"{args.pause:g}s apart, at most {args.delete_rps:g} deletes/s)")
+    limiter = EndpointLimiter(args.delete_rps)
+
+    def progress(summary):
+        print(f"   … {summary['deleted']} deleted ({summary['bytes_deleted'] / 1e6:.1f} MB), "
+              f"{summary['now_referenced']} referenced again, {len(summary['failed'])} failed")
+
+    try:
+        summary = delete_orphans(source, report_path, lambda file_id: delete_file(file_id, limiter),
+                                 args.batch_size, args.pause, on_batch=progress)
+    except UnresolvedReferences as e:
+        print_unresolved(e)
+        return 1
+    except (OSError, RuntimeError) as e:
+        print(f"✗ {e} - deleting again with --delete-from skips files already gone")
+        return 1
+    for failure in summary['failed'][:10]:
+        print(f"   ✗ {failure['id']}: {failure['error']}")
+    print(f"✓ {summary['deleted']} files deleted ({summary['bytes_deleted'] / 1e6:.1f} MB freed), "
+          f"{summary['now_referenced']} kept because a row references them now")
+    return 0 if not summary['failed'] else 1
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("=" * 70)
+    print("🧹 Orphaned Nhost Storage Files")
+    print("=" * 70)
+    print()
+
+    load_credentials()
+    http_pool.configure(2)
+    request_executor.configure(max_retries=args.max_retries, max_concurrency=1)
+    source = NhostReferences(run_nhost_sql, args.page_size)
+
+    if args.delete_from:
+        return run_delete(source, args.delete_from, args)
+
+    def chosen(method, count):
+        references = f" ({count} references)" if count is not None else ''
+        print(f"🔍 Scanning storage.files with the {'sorted merge join' if method == 'merge' else 'Bloom filter'}"
+              f"{references}, ignoring files newer than {args.min_age_hours:g}h")
+
+    started = time.monotonic()
+    try:
+        orphans = find_orphans(source, args.method, args.bucket, args.min_age_hours, args.bloom_threshold,
+                               args.false_positive_rate, on_method=chosen)
+        count, total_bytes = write_report(args.report, orphans)
+    except UnresolvedReferences as e:
+        print_unresolved(e)
+        return 1
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        return 1
+    print(f"✓ {count} orphan candidates, {total_bytes / 1e6:.1f} MB "
+          f"({source.queries} queries, {time.monotonic() - started:.1f}s)")
+    print(f"📝 Report: {args.report}")
+
+    if args.delete and count:
+        return run_delete(source, args.report, args)
+    if count:
+        print(f"   Review it, then run with --delete-from {args.report} to delete them")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Interrupted - deleting again with --delete-from skips files already gone")
+        sys.exit(1)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Keep-alive HTTP connection pool for the migration/recovery scripts (standard library only)
+
+`urlopen(req, timeout)` is a drop-in replacement for urllib.request.urlopen:
+it takes a urllib.request.Request, raises urllib.error.HTTPError for 4xx/5xx
+responses, and returns a response with read()/status/headers. Connections are
+kept open per (scheme, host, port) and reused, so a loop of requests against
+the same Supabase/Nhost host pays the TCP + TLS handshake once.
+
+Not handled (unlike urllib): redirects and proxy environment variables.
+"""
+
+import http.client
+import select
+import ssl
+import threading
+import time
+import urllib.error
+from urllib.parse import urlsplit
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_IDLE_TIMEOUT = 30.0
+DEFAULT_TIMEOUT = 60
+
+# Errors that mean a reused keep-alive connection was closed by the server
+# before it saw our request - safe to retry once on a fresh connection
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class PooledResponse:
+    """Wraps http.client.HTTPResponse and hands the connection back to the pool once fully read"""
+
+    def __init__(self, pool, key, conn, response, url, timings=None):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._response = response
+        self.url = url
+        self.status = response.status
+        self.code = response.status
+        self.reason = response.reason
+        self.headers = response.msg
+        # Seconds spent connecting (0 for a reused connection), sending the
+        # request, and waiting for the response headers after that
+        self.timings = timings or {}
+
+    def getheader(self, name, default=None):
+        return self._response.getheader(name, default)
+
+    def getcode(self):
+        return self.status
+
+    def read(self, amt=None):
+        data = self._response.read(amt)
+        if self._response.isclosed():
+            self._release()
+        return data
+
+    def readinto(self, buffer):
+        count = self._response.readinto(buffer)
+        if self._response.isclosed():
+            self._release()
+        return count
+
+    def close(self):
+        """Release the connection; an unread body means it cannot be reused"""
+        if self._conn is None:
+            return
+        if not self._response.isclosed():
+            self._conn.close()
+        self._release()
+
+    def _release(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            reusable = not self._response.will_close and conn.sock is not None
+            self._pool._put(self._key, conn, reusable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    """Per-host pool of persistent http.client connections
+
+    maxsize: idle connections kept per host (busy connections are not capped)
+    idle_timeout: seconds after which an idle connection is discarded
+    """
+
+    def __init__(self, maxsize=DEFAULT_POOL_SIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+        self.stats = {'requests': 0, 'connections_opened': 0, 'connections_reused': 0}
+
+    def configure(self, maxsize=None, idle_timeout=None):
+        if maxsize is not None:
+            self.maxsize = maxsize
+        if idle_timeout is not None:
+            self.idle_timeout = idle_timeout
+
+    def urlopen(self, req, timeout=DEFAULT_TIMEOUT):
+        """Send a urllib.request.Request over a pooled connection"""
+        headers = dict(req.header_items())
+        return self.request(req.get_method(), req.full_url, req.data, headers, timeout)
+
+    def request(self, method, url, body=None, headers=None, timeout=DEFAULT_TIMEOUT):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        headers = dict(headers or {})
+
+        # bytes/None bodies can be replayed if a reused connection turns out stale;
+        # generator bodies (streaming uploads) cannot
+        replayable = body is None or isinstance(body, (bytes, bytearray))
+        timings = {'connect': 0.0}
+        conn, reused = self._get(key, timeout)
+        try:
+            response = self._send(conn, method, path, body, headers, timings)
+        except STALE_CONNECTION_ERRORS:
+            conn.close()
+            if not (reused and replayable):
+                raise
+            conn = self._new_connection(key, timeout)
+            try:
+                response = self._send(conn, method, path, body, headers, timings)
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+
+        with self._lock:
+            self.stats['requests'] += 1
+        pooled = PooledResponse(self, key, conn, response, url, timings)
+        if response.status >= 400:
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.msg, pooled)
+        return pooled
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn, _ in connections:
+                conn.close()
+
+    def _send(self, conn, method, path, body, headers, timings):
+        """Send one request, recording connect (TCP + TLS), body send and wait-for-response times"""
+        if conn.sock is None:
+            started = time.monotonic()
+            conn.connect()
+            timings['connect'] = time.monotonic() - started
+        started = time.monotonic()
+        conn.request(method, path, body=body, headers=headers)
+        sent = time.monotonic()
+        response = conn.getresponse()
+        timings['send'] = sent - started
+        timings['ttfb'] = time.monotonic() - sent
+        return response
+
+    def _get(self, key, timeout):
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                connections = self._idle.get(key)
+                if not connections:
+                    break
+                conn, last_used = connections.pop()
+            if now - last_used < self.idle_timeout and self._is_healthy(conn):
+                conn.timeout = timeout
+                conn.sock.settimeout(timeout)
+                with self._lock:
+                    self.stats['connections_reused'] += 1
+                return conn, True
+            conn.close()
+        return self._new_connection(key, timeout), False
+
+    def _new_connection(self, key, timeout):
+        scheme, host, port = key
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        with self._lock:
+            self.stats['connections_opened'] += 1
+        return conn
+
+    def _put(self, key, conn, reusable):
+        if not reusable:
+            conn.close()
+            return
+        with self._lock:
+            connections = self._idle.setdefault(key, [])
+            if len(connections) < self.maxsize:
+                connections.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    @staticmethod
+    def _is_healthy(conn):
+        """An idle keep-alive socket must exist and have nothing to read (EOF or stray bytes mean it is dead)"""
+        sock = conn.sock
+        if sock is None:
+            return False
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+
+default_pool = ConnectionPool()
+
+
+def configure(maxsize=None, idle_timeout=None):
+    """Tune the shared pool used by urlopen()"""
+    default_pool.configure(maxsize, idle_timeout)
+
+
+def urlopen(req, timeout=DEFAULT_TIMEOUT):
+    """Pooled replacement for urllib.request.urlopen(req, timeout)"""
+    return default_pool.urlopen(req, timeout)
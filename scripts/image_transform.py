@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Optional WebP re-encoding of migrated images (needs Pillow)
+
+Large JPEG/PNG originals (multi-megabyte phone photos) are re-encoded to
+WebP, downscaled to a maximum dimension, before they are uploaded to Nhost.
+Decoding and encoding are CPU-bound, so they run in a process pool: the
+migrator's I/O threads only wait on the result while the other threads keep
+transferring. The re-encoded file is used only when it is smaller than the
+original; otherwise the original is uploaded unchanged.
+
+Pillow is optional: without it this module still imports, and the migrator
+refuses --webp.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from content_index import file_hexdigest
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+TRANSFORMABLE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+DEFAULT_QUALITY = 80
+DEFAULT_MAX_DIMENSION = 1600
+DEFAULT_MIN_BYTES = 200 * 1024
+
+
+def webp_available():
+    return Image is not None and 'WEBP' in Image.registered_extensions().values()
+
+
+def webp_path(file_path):
+    """Name of the re-encoded object: same folder and stem, .webp extension"""
+    return os.path.splitext(file_path)[0] + '.webp'
+
+
+def reencode_to_webp(source_path, output_path, quality, max_dimension, min_bytes):
+    """Re-encode one image to WebP (runs in a pool process)
+
+    Returns {'transformed': True, 'size', 'width', 'height', ...} when
+    output_path holds a smaller WebP, else {'transformed': False, 'reason'}
+    and no output file.
+    """
+    original_size = os.path.getsize(source_path)
+    try:
+        with Image.open(source_path) as image:
+            width, height = image.size
+            if original_size <= min_bytes and max(width, height) <= max_dimension:
+                return {'transformed': False, 'reason': 'below threshold'}
+            # Phone photos are often stored sideways with an EXIF rotation
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            image.save(output_path, 'WEBP', quality=quality, method=4)
+            new_width, new_height = image.size
+    except Exception as e:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return {'transformed': False, 'reason': f"re-encode failed: {e}"}
+
+    size = os.path.getsize(output_path)
+    if size >= original_size:
+        os.remove(output_path)
+        return {'transformed': False, 'reason': 'WebP not smaller'}
+    digest = file_hexdigest(output_path)
+    return {'transformed': True, 'original_size': original_size, 'size': size, 'sha256': digest,
+            'original_dimensions': [width, height], 'dimensions': [new_width, new_height]}
+
+
+class ImageTransformer:
+    """Submits re-encodes to a process pool; thread-safe, called from the migration workers"""
+
+    def __init__(self, processes=None, quality=DEFAULT_QUALITY, max_dimension=DEFAULT_MAX_DIMENSION,
+                 min_bytes=DEFAULT_MIN_BYTES):
+        self.quality = quality
+        self.max_dimension = max_dimension
+        self.min_bytes = min_bytes
+        # spawn rather than fork: the parent already runs HTTP worker threads
+        self._pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'))
+
+    def applies_to(self, file_path):
+        return os.path.splitext(file_path)[1].lower() in TRANSFORMABLE_EXTENSIONS
+
+    def transform(self, source_path, output_path):
+        """Re-encode source_path into output_path; blocks the calling thread only"""
+        future = self._pool.submit(reencode_to_webp, source_path, output_path,
+                                   self.quality, self.max_dimension, self.min_bytes)
+        return future.result()
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
@@ -7,14 +7,52 @@ Migrates files from Supabase Storage to Nhost Storage
 import os
 import sys
 import json
+import argparse
 import urllib.request
 import urllib.error
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 import time
 
+import http_pool
+import request_executor
+import image_transform
+import ranged_transfer
+from content_index import ContentIndex, new_hasher
+from migration_metrics import (
+    MigrationMetrics, RunProfiler, add_response_timings, add_timing, new_job_metrics,
+)
+from migration_journal import (
+    MigrationJournal, parse_nhost_file_id, read_entries, STAGE_DOWNLOADED, STAGE_FAILED, STAGE_UPLOADED,
+)
+from migration_shards import (
+    load_shard_logs, merge_journals, merge_logs, parse_shard, run_local_shards, shard_of, shard_path, without_option,
+)
+from nhost_targets import FanOutJournals, NhostTarget, load_targets
+from object_cache import DEFAULT_MAX_BYTES as DEFAULT_CACHE_MAX_BYTES, ObjectCache, parse_byte_size
+from rate_limit import EndpointLimiter, UNLIMITED
+from storage_listing import (
+    CRAWL_WORKERS, build_nhost_index, compute_delta, crawl_supabase_objects, iter_nhost_files, list_supabase_buckets,
+)
+from url_rewrite import iter_url_mappings, source_url_prefixes, write_url_rewrite_sql
+
 # Configuration
-SUPABASE_PROJECT_ID = #project_ref
-NHOST_PROJECT_ID = #subdomain
+SUPABASE_PROJECT_ID = '<YOUR_SUPABASE_PROJECT_REF>'
+NHOST_PROJECT_ID = '<YOUR_NHOST_SUBDOMAIN>'
+DEFAULT_CHUNK_SIZE = 64 * 1024
+JOURNAL_PATH = 'nhost/migrations/storage_migration_journal.jsonl'
+INVENTORY_PATH = 'nhost/migrations/storage_migration_inventory.json'
+LOG_PATH = 'nhost/migrations/storage_migration_log.json'
+URL_REWRITE_SQL_PATH = 'nhost/migrations/00012_update_storage_urls.sql'
+VERIFY_JOURNAL_PATH = 'nhost/migrations/storage_verify_journal.jsonl'
+VERIFY_REPORT_PATH = 'nhost/migrations/storage_verify_report.json'
+PROFILE_PREFIX = 'nhost/migrations/storage_migration_profile'
+# Staging directory for downloads; a --shard run uses its own, with the shard suffix
+TEMP_DIR = 'temp_storage_migration'
+# Console output of each --processes child, with the shard suffix
+SHARD_OUTPUT_PATH = 'nhost/migrations/storage_migration_output.txt'
+# Journal fields of an object uploaded as re-encoded WebP
+TRANSFORM_FIELDS = ('renamed_to', 'original_size', 'webp_size', 'webp_sha256')
 
 def load_credentials():
     """Load credentials from config files"""
@@ -43,79 +81,259 @@ def load_credentials():
                 elif line.startswith('admin_secret ='):
                     os.environ['NHOST_ADMIN_SECRET'] = line.split("'")[1]
 
-def download_file(url, local_path):
-    """Download a file from URL to local path"""
-    try:
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+def new_boundary():
+    return '----WebKitFormBoundary' + str(int(time.time() * 1000))
 
-        req = urllib.request.Request(url)
-        if os.environ.get('SUPABASE_ANON_KEY'):
-            req.add_header('apikey', os.environ['SUPABASE_ANON_KEY'])
-            req.add_header('Authorization', f"Bearer {os.environ['SUPABASE_ANON_KEY']}")
+def multipart_envelope(boundary, bucket, filename, content_type):
+    """Return the (head, tail) bytes that surround the file content in an Nhost upload body
 
-        with urllib.request.urlopen(req, timeout=30) as response:
-            with open(local_path, 'wb') as f:
-                f.write(response.read())
-        return True, None
-    except Exception as e:
-        return False, str(e)
+    Nhost requires bucket-id as a form field, sent FIRST (this is critical!),
+    followed by the file field.
+    """
+    head = '\r\n'.join([
+        f'--{boundary}',
+        'Content-Disposition: form-data; name="bucket-id"',
+        '',
+        bucket,
+        f'--{boundary}',
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"',
+        f'Content-Type: {content_type}',
+        '',
+        '',
+    ]).encode()
+    tail = f'\r\n--{boundary}--\r\n'.encode()
+    return head, tail
+
+# NHOST_STORAGE_URL / NHOST_HASURA_URL / SUPABASE_URL override the hosted
+# endpoints, e.g. to run against the local stand-ins in stand_in_servers.py
+def nhost_upload_url():
+    base = os.environ.get('NHOST_STORAGE_URL') or f"https://{os.environ['NHOST_SUBDOMAIN']}.storage.ap-south-1.nhost.run"
+    return f"{base}/v1/files"
+
+def nhost_query_url():
+    base = os.environ.get('NHOST_HASURA_URL') or f"https://{os.environ['NHOST_SUBDOMAIN']}.hasura.ap-south-1.nhost.run"
+    return f"{base}/v2/query"
+
+def supabase_base_url():
+    return os.environ.get('SUPABASE_URL') or f"https://{os.environ['SUPABASE_PROJECT_ID']}.supabase.co"
+
+def supabase_api_key():
+    """Service role key when available (listing needs it), otherwise the anon key"""
+    return os.environ.get('SUPABASE_SERVICE_ROLE_KEY') or os.environ.get('SUPABASE_ANON_KEY', '')
+
+def supabase_object_url(bucket, file_path):
+    return f"{supabase_base_url()}/storage/v1/object/public/{bucket}/{file_path}"
+
+def run_nhost_sql(sql):
+    """Execute SQL on Nhost through the Hasura run_sql endpoint"""
+    headers = {
+        'Content-Type': 'application/json',
+        'x-hasura-admin-secret': os.environ.get('NHOST_ADMIN_SECRET', '')
+    }
+    data = json.dumps({
+        'type': 'run_sql',
+        'args': {'sql': sql}
+    }).encode()
+
+    def send():
+        req = urllib.request.Request(nhost_query_url(), data=data, headers=headers)
+        with http_pool.urlopen(req) as response:
+            return json.loads(response.read())
 
-def upload_file_to_nhost(local_path, bucket, file_path):
-    """Upload a file to Nhost Storage"""
     try:
-        # Read file content
-        with open(local_path, 'rb') as f:
-            file_content = f.read()
+        return request_executor.run('nhost-sql', send)
+    except urllib.error.HTTPError as e:
+        return {'error': f"HTTP {e.code}: {e.read().decode()}"}
+    except Exception as e:
+        return {'error': str(e)}
+
+def nhost_file_url(file_id):
+    return f"{nhost_upload_url()}/{file_id}"
+
+def nhost_request(url):
+    req = urllib.request.Request(url)
+    if os.environ.get('NHOST_ADMIN_SECRET'):
+        req.add_header('x-hasura-admin-secret', os.environ['NHOST_ADMIN_SECRET'])
+    return req
+
+def supabase_request(url):
+    req = urllib.request.Request(url)
+    if os.environ.get('SUPABASE_ANON_KEY'):
+        req.add_header('apikey', os.environ['SUPABASE_ANON_KEY'])
+        req.add_header('Authorization', f"Bearer {os.environ['SUPABASE_ANON_KEY']}")
+    return req
+
+def download_file(url, local_path, limiter=UNLIMITED, metrics=None, cache=None, key=None):
+    """Download a file from URL to local path with Range requests
 
+    Objects larger than one segment are fetched as parallel segments and a
+    partial download left by a failed run is resumed (see ranged_transfer.py).
+    With a cache, a cached copy of `key` is revalidated with a conditional GET
+    and reused if unchanged; fresh downloads are added to the cache.
+    Returns (True, SHA-256 hex digest of the content) or (False, error).
+    """
+    # Retries and adaptive concurrency cover each request up to the response
+    # headers; time to first byte is the congestion signal for the endpoint
+    make_request = lambda: supabase_request(url)
+    if cache is None:
+        return ranged_transfer.download_object(make_request, local_path, limiter, metrics)
+
+    entry = cache.lookup(key)
+    info = {}
+    success, result = ranged_transfer.download_object(make_request, local_path, limiter, metrics,
+                                                      ObjectCache.validators(entry), info)
+    if success and info.get('not_modified'):
+        try:
+            cache.restore(entry, local_path)
+            return True, entry['sha256']
+        except OSError:
+            # Evicted by another process since the lookup: download it after all
+            info = {}
+            success, result = ranged_transfer.download_object(make_request, local_path, limiter, metrics, info=info)
+    if success:
+        try:
+            cache.store(key, local_path, result, info.get('etag'), info.get('last_modified'))
+        except OSError as e:
+            print(f"⚠️  Could not cache {key}: {e}")
+    return success, result
+
+def upload_file_to_nhost(local_path, bucket, file_path, limiter=UNLIMITED, metrics=None, target=None):
+    """Upload a file to Nhost Storage (the configured project, or a fan-out NhostTarget)
+
+    Files larger than one download segment are streamed from disk in fixed
+    chunks with a per-chunk timeout instead of being sent as one buffer.
+    """
+    try:
         # Clean file path - remove leading slashes
         clean_path = file_path.lstrip('/')
 
         # Prepare multipart form data
-        boundary = '----WebKitFormBoundary' + str(int(time.time() * 1000))
+        boundary = new_boundary()
+        filename = os.path.basename(clean_path)
+        head, tail = multipart_envelope(boundary, bucket, filename, get_content_type(filename))
+        file_size = os.path.getsize(local_path)
+        chunked = file_size > ranged_transfer.segment_size
+        upload_url = target.upload_url if target else nhost_upload_url()
+        admin_secret = target.admin_secret if target else os.environ.get('NHOST_ADMIN_SECRET')
+        if not chunked:
+            with open(local_path, 'rb') as f:
+                body_bytes = head + f.read() + tail
 
-        # Build multipart body - Nhost requires bucket-id as a form field
-        body = []
+        def new_request():
+            # Bucket ID is in the form data, not URL; a chunked body is a
+            # generator, so every attempt needs a fresh request
+            data = ranged_transfer.iter_file_body(head, local_path, tail, limiter, metrics) if chunked else body_bytes
+            req = urllib.request.Request(upload_url, data=data, method='POST')
+            req.add_header('Content-Type', f'multipart/form-data; boundary={boundary}')
+            req.add_header('Content-Length', str(len(head) + file_size + len(tail)))
+            if admin_secret:
+                req.add_header('x-hasura-admin-secret', admin_secret)
+            return req
 
-        # Add bucket-id field FIRST (this is critical!)
-        body.append(f'--{boundary}'.encode())
-        body.append(b'Content-Disposition: form-data; name="bucket-id"')
-        body.append(b'')
-        body.append(bucket.encode())
+        def send():
+            add_timing(metrics, 'rate_limit_wait', limiter.before_request())
+            if not chunked:
+                add_timing(metrics, 'rate_limit_wait', limiter.consume_bytes(len(body_bytes)))
+            timeout = ranged_transfer.chunk_timeout if chunked else 60
+            with http_pool.urlopen(new_request(), timeout=timeout) as response:
+                add_response_timings(metrics, 'upload', response)
+                if metrics is not None and not chunked:
+                    metrics['bytes_uploaded'] += len(body_bytes)
+                return response.status, response.read().decode()
 
-        # Add file field
-        body.append(f'--{boundary}'.encode())
-        filename = os.path.basename(clean_path)
-        content_type = get_content_type(filename)
-        body.append(f'Content-Disposition: form-data; name="file"; filename="{filename}"'.encode())
-        body.append(f'Content-Type: {content_type}'.encode())
-        body.append(b'')
-        body.append(file_content)
+        endpoint = target.endpoint if target else 'nhost-storage'
+        status, response_data = request_executor.run(endpoint, send, idempotent=False, track_latency=False)
+        return status in [200, 201], response_data
+    except urllib.error.HTTPError as e:
+        error_body = e.read().decode() if e.fp else str(e)
+        return False, f"HTTP {e.code}: {error_body}"
+    except Exception as e:
+        return False, str(e)
+
+def iter_multipart_body(head, source, tail, chunk_size, source_limiter=UNLIMITED, target_limiter=UNLIMITED,
+                        metrics=None):
+    """Yield an upload body as head, fixed-size chunks read from `source`, then tail
+
+    Only one chunk is held at a time, so memory per transfer is bounded by
+    chunk_size regardless of object size.
+    """
+    yield head
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        add_timing(metrics, 'rate_limit_wait', source_limiter.consume_bytes(len(chunk)))
+        add_timing(metrics, 'rate_limit_wait', target_limiter.consume_bytes(len(chunk)))
+        if metrics is not None:
+            metrics['bytes_downloaded'] += len(chunk)
+            metrics['bytes_uploaded'] += len(chunk)
+        yield chunk
+    yield tail
+
+class SourceError(Exception):
+    """Wraps a failure to open the Supabase object so stream errors are attributed to the download stage"""
+
+    def __init__(self, cause):
+        super().__init__(str(cause))
+        self.cause = cause
+
+def stream_file_to_nhost(download_url, bucket, file_path, chunk_size=DEFAULT_CHUNK_SIZE, limiters=None,
+                         metrics=None):
+    """Pipe a Supabase object straight into an Nhost upload without touching disk
+
+    Returns (success, result, stage) where stage is 'download' or 'upload'.
+    A partially sent body cannot be replayed, so a retried upload reopens
+    the source and streams it again from the start. Reading the source
+    overlaps sending the upload, so its time is counted as upload_transfer.
+    """
+    limiters = limiters or {'supabase': UNLIMITED, 'nhost': UNLIMITED}
+    clean_path = file_path.lstrip('/')
+    filename = os.path.basename(clean_path)
 
-        # End boundary
-        body.append(f'--{boundary}--'.encode())
-        body.append(b'')
+    def open_source():
+        add_timing(metrics, 'rate_limit_wait', limiters['supabase'].before_request())
+        return http_pool.urlopen(supabase_request(download_url), timeout=30)
 
-        body_bytes = b'\r\n'.join(body)
+    def send():
+        try:
+            source = request_executor.run('supabase-storage', open_source)
+        except Exception as e:
+            raise SourceError(e)
 
-        # Create request - bucket ID is in the form data, not URL
-        nhost_subdomain = os.environ['NHOST_SUBDOMAIN']
-        url = f"https://{nhost_subdomain}.storage.ap-south-1.nhost.run/v1/files"
+        with source:
+            add_response_timings(metrics, 'download', source)
+            boundary = new_boundary()
+            head, tail = multipart_envelope(boundary, bucket, filename, get_content_type(filename))
+            body = iter_multipart_body(head, source, tail, chunk_size, limiters['supabase'], limiters['nhost'],
+                                       metrics)
 
-        req = urllib.request.Request(url, data=body_bytes, method='POST')
-        req.add_header('Content-Type', f'multipart/form-data; boundary={boundary}')
-        req.add_header('Content-Length', str(len(body_bytes)))
+            req = urllib.request.Request(nhost_upload_url(), data=body, method='POST')
+            req.add_header('Content-Type', f'multipart/form-data; boundary={boundary}')
+            # Precompute Content-Length when the source reports its size; otherwise
+            # urllib falls back to chunked transfer encoding for the generator body
+            source_length = source.headers.get('Content-Length')
+            if source_length is not None:
+                req.add_header('Content-Length', str(len(head) + int(source_length) + len(tail)))
+            if os.environ.get('NHOST_ADMIN_SECRET'):
+                req.add_header('x-hasura-admin-secret', os.environ['NHOST_ADMIN_SECRET'])
 
-        if os.environ.get('NHOST_ADMIN_SECRET'):
-            req.add_header('x-hasura-admin-secret', os.environ['NHOST_ADMIN_SECRET'])
+            add_timing(metrics, 'rate_limit_wait', limiters['nhost'].before_request())
+            with http_pool.urlopen(req, timeout=60) as response:
+                add_response_timings(metrics, 'upload', response)
+                return response.status, response.read().decode()
 
-        with urllib.request.urlopen(req, timeout=60) as response:
-            response_data = response.read().decode()
-            return response.status in [200, 201], response_data
+    try:
+        status, response_data = request_executor.run('nhost-storage', send, idempotent=False, track_latency=False)
+        return status in [200, 201], response_data, 'upload'
+    except SourceError as e:
+        if isinstance(e.cause, urllib.error.HTTPError):
+            return False, f"HTTP {e.cause.code}: {e.cause.reason}", 'download'
+        return False, str(e.cause), 'download'
     except urllib.error.HTTPError as e:
         error_body = e.read().decode() if e.fp else str(e)
-        return False, f"HTTP {e.code}: {error_body}"
+        return False, f"HTTP {e.code}: {error_body}", 'upload'
     except Exception as e:
-        return False, str(e)
+        return False, str(e), 'upload'
 
 def get_content_type(filename):
     """Get content type based on file extension"""
@@ -129,7 +347,859 @@ def get_content_type(filename):
     }
     return content_types.get(ext, 'application/octet-stream')
 
-def main():
+def iter_inventory_jobs(inventory):
+    """Yield one migration job per inventory file, mapped to its Nhost bucket"""
+    for bucket_name, bucket_info in inventory['buckets'].items():
+        if bucket_name == "documents/activity_overview":
+            actual_bucket = "documents"
+            files = [f"activity_overview/{f}" for f in bucket_info['files']]
+        else:
+            actual_bucket = bucket_name
+            files = bucket_info['files']
+
+        for file_path in files:
+            yield {'bucket': actual_bucket, 'file_path': file_path}
+
+def inventory_buckets(inventory):
+    """Actual Supabase/Nhost bucket names covered by the inventory"""
+    return sorted({job['bucket'] for job in iter_inventory_jobs(inventory)})
+
+def known_entries(main_journal, journal_path):
+    """Journal entries of earlier runs: the main journal overlaid with a shard's own journal"""
+    entries = read_entries(main_journal)
+    if journal_path != main_journal:
+        entries.update(read_entries(journal_path))
+    return entries
+
+def listing_roots(args, inventory):
+    """(bucket, prefix) pairs to enumerate: --prefix, else --bucket, the inventory's buckets or every Supabase bucket"""
+    if args.prefix:
+        return [tuple(prefix.split('/', 1)) if '/' in prefix else (prefix, '') for prefix in args.prefix]
+    if args.bucket:
+        buckets = args.bucket
+    elif inventory is not None:
+        buckets = inventory_buckets(inventory)
+    else:
+        buckets = list_supabase_buckets(supabase_base_url(), supabase_api_key())
+    return [(bucket, '') for bucket in buckets]
+
+def iter_source_objects(roots, workers=CRAWL_WORKERS):
+    """Stream every Supabase object under `roots`, listing folders in parallel"""
+    return crawl_supabase_objects(supabase_base_url(), supabase_api_key(), roots, workers)
+
+def transformed_uploads(journal_entries):
+    """job key -> journal entry for every object uploaded as re-encoded WebP"""
+    return {key: entry for key, entry in journal_entries.items()
+            if entry['stage'] == STAGE_UPLOADED and entry.get('renamed_to')}
+
+def aliased_uploads(journal_entries):
+    """job key -> journal entry for every object recorded as an alias of an identical upload (--dedup)"""
+    return {key: entry for key, entry in journal_entries.items()
+            if entry['stage'] == STAGE_UPLOADED and entry.get('alias_of')}
+
+def iter_delta_jobs(roots, counts, workers=CRAWL_WORKERS, transforms=None, aliases=None):
+    """Yield jobs only for objects that are new in, or differ from, Nhost
+
+    Indexes every row of Nhost storage.files, then streams the Supabase
+    listing past that hash index. `counts` is updated with the number of
+    new/changed objects found. Objects uploaded as WebP (`transforms`, from
+    the journal) are stored under another name and size, so they are
+    compared with the original size recorded at upload instead. Dedup
+    aliases (`aliases`, from the journal) have no Nhost file of their own;
+    they are unchanged while the file they point at still exists and the
+    size matches.
+    """
+    transforms = transforms or {}
+    aliases = aliases or {}
+    nhost_index, nhost_by_id = {}, {}
+    for nhost_file in iter_nhost_files(run_nhost_sql):
+        nhost_index[(nhost_file['bucket'], nhost_file['name'])] = nhost_file
+        if aliases:
+            nhost_by_id[nhost_file['id']] = nhost_file
+    for obj in iter_source_objects(roots, workers):
+        key = f"{obj['bucket']}/{obj['path'].lstrip('/')}"
+        alias = aliases.get(key)
+        target = nhost_by_id.get(alias['nhost_id']) if alias else None
+        if target is None:
+            # Not an alias, or the file it pointed at is gone: compare by name as usual
+            delta = next(compute_delta([obj], nhost_index), None)
+            if delta is None:
+                continue
+            obj, reason, existing = delta
+            transform = transforms.get(key)
+            if transform:
+                if obj['size'] is None or int(obj['size']) == transform['original_size']:
+                    continue
+                reason, existing = 'changed', {'id': transform['nhost_id']}
+        else:
+            expected = alias.get('original_size', alias.get('size', target['size']))
+            if obj['size'] is None or expected is None or int(obj['size']) == expected:
+                continue
+            reason, existing = 'changed', {'id': alias['nhost_id']}
+        counts[reason] += 1
+        job = {'bucket': obj['bucket'], 'file_path': obj['path'], 'reason': reason}
+        if existing:
+            job['replaces'] = existing['id']
+        yield job
+
+def job_key(job):
+    return f"{job['bucket']}/{job['file_path'].lstrip('/')}"
+
+def migrate_file(job, temp_dir, limiters, chunk_size=None, journal=None, content_index=None, transformer=None,
+                 cache=None):
+    """Download one object from Supabase and upload it to Nhost (runs in a worker thread)
+
+    With chunk_size set the object is streamed straight through instead of
+    being staged in temp_dir. Each completed stage is appended to the journal.
+    With a content_index, an object whose bytes were already uploaded to the
+    same bucket is not uploaded again but aliased to the existing Nhost file.
+    With a transformer, large JPEG/PNG images are uploaded as smaller WebP.
+    With a cache, unchanged objects are read from the persistent object cache.
+    The result carries the file's per-stage timings and byte counts.
+    """
+    started = time.monotonic()
+    metrics = new_job_metrics()
+    result = transfer_file(job, temp_dir, limiters, chunk_size, journal, metrics, content_index, transformer, cache)
+    add_timing(metrics, 'total', time.monotonic() - started)
+    result['metrics'] = metrics
+    return result
+
+def transfer_file(job, temp_dir, limiters, chunk_size, journal, metrics, content_index=None, transformer=None,
+                  cache=None):
+    bucket = job['bucket']
+    file_path = job['file_path']
+    clean_path = file_path.lstrip('/')
+    key = job_key(job)
+
+    download_url = supabase_object_url(bucket, file_path)
+    if chunk_size:
+        success, result, stage = stream_file_to_nhost(download_url, bucket, clean_path, chunk_size, limiters, metrics)
+        return finish_job(journal, key, success, stage, result)
+
+    local_path = os.path.join(temp_dir, bucket, clean_path)
+    webp_output = local_path + '.webp'
+
+    # A resumed run can reuse a file downloaded before the interruption
+    previous = journal.get(key) if journal else None
+    if (previous and previous['stage'] == STAGE_DOWNLOADED
+            and os.path.exists(local_path) and os.path.getsize(local_path) == previous.get('size')):
+        digest = previous.get('sha256')
+    else:
+        success, result = download_file(download_url, local_path, limiters['supabase'], metrics, cache, key)
+        if not success:
+            return finish_job(journal, key, False, 'download', result)
+        digest = result
+        if journal:
+            journal.record(key, STAGE_DOWNLOADED, size=os.path.getsize(local_path), sha256=digest)
+
+    claimed = content_index is not None and digest is not None
+    outcome = None
+    try:
+        if claimed:
+            existing = content_index.claim(bucket, digest)
+            if existing:
+                claimed = False
+                return finish_alias(journal, key, digest, existing, os.path.getsize(local_path))
+        upload_path, upload_name, transform = local_path, clean_path, None
+        if transformer and transformer.applies_to(clean_path):
+            transform = transform_image(transformer, local_path, webp_output, clean_path, metrics)
+            if transform:
+                upload_path, upload_name = webp_output, transform['renamed_to']
+        success, result = upload_file_to_nhost(upload_path, bucket, upload_name, limiters['nhost'], metrics)
+        outcome = finish_job(journal, key, success, 'upload', result, digest, transform)
+        return outcome
+    finally:
+        if claimed:
+            content_index.release(bucket, digest, outcome and outcome.get('nhost_id'), key)
+        for path in (local_path, webp_output):
+            if os.path.exists(path):
+                os.remove(path)
+
+def fan_out_file(job, temp_dir, targets, supabase_limiter, upload_executor, cache=None, transformer=None):
+    """Download one object once and upload it to every target that does not have it yet (worker thread)
+
+    Uploads to the targets run concurrently on upload_executor, each within
+    its target's own concurrency, rate limits and journal. The result holds
+    one finish_job() result per target.
+    """
+    started = time.monotonic()
+    metrics = new_job_metrics()
+    key = job_key(job)
+    clean_path = job['file_path'].lstrip('/')
+    pending = [target for target in targets if not target.journal.is_uploaded(key)]
+    local_path = os.path.join(temp_dir, job['bucket'], clean_path)
+    webp_output = local_path + '.webp'
+    success, digest = download_file(supabase_object_url(job['bucket'], job['file_path']), local_path,
+                                    supabase_limiter, metrics, cache, key)
+    if not success:
+        # A partial large download stays in temp_dir for the next run to resume
+        add_timing(metrics, 'total', time.monotonic() - started)
+        results = {target.name: finish_job(target.journal, key, False, 'download', digest) for target in pending}
+        return {'success': False, 'targets': results, 'metrics': metrics}
+
+    results = {}
+    try:
+        upload_path, upload_name, transform = local_path, clean_path, None
+        if transformer and transformer.applies_to(clean_path):
+            transform = transform_image(transformer, local_path, webp_output, clean_path, metrics)
+            if transform:
+                upload_path, upload_name = webp_output, transform['renamed_to']
+
+        def upload(target):
+            target_metrics = new_job_metrics()
+            with target.slots:
+                ok, response = upload_file_to_nhost(upload_path, job['bucket'], upload_name, target.limiter,
+                                                    target_metrics, target)
+            return finish_job(target.journal, key, ok, 'upload', response, digest, transform), target_metrics
+
+        futures = {target.name: upload_executor.submit(upload, target) for target in pending}
+        for name, future in futures.items():
+            results[name], target_metrics = future.result()
+            # Time spent uploading to every target; bytes count once per target
+            for stage, seconds in target_metrics['timings'].items():
+                add_timing(metrics, stage, seconds)
+            metrics['bytes_uploaded'] += target_metrics['bytes_uploaded']
+        return {'success': all(result['success'] for result in results.values()), 'targets': results,
+                'transform': transform, 'metrics': metrics}
+    finally:
+        add_timing(metrics, 'total', time.monotonic() - started)
+        for path in (local_path, webp_output):
+            if os.path.exists(path):
+                os.remove(path)
+
+def transform_image(transformer, local_path, output_path, clean_path, metrics=None):
+    """Re-encode a downloaded image to WebP in the process pool
+
+    Returns the journal fields of the re-encoded upload, or None when the
+    original should be uploaded unchanged.
+    """
+    started = time.monotonic()
+    try:
+        report = transformer.transform(local_path, output_path)
+    except Exception:
+        # e.g. a pool process killed by a decoder crash - the original still migrates
+        report = {'transformed': False}
+    add_timing(metrics, 'transform', time.monotonic() - started)
+    if not report['transformed']:
+        return None
+    return {
+        'renamed_to': image_transform.webp_path(clean_path),
+        'original_size': report['original_size'],
+        'webp_size': report['size'],
+        'webp_sha256': report['sha256'],
+    }
+
+def finish_job(journal, key, success, stage, result, sha256=None, transform=None):
+    """Build the worker result and journal the outcome"""
+    if not success:
+        if journal:
+            journal.record(key, STAGE_FAILED, failed_stage=stage, error=result)
+        return {'success': False, 'stage': stage, 'error': result}
+
+    nhost_id = parse_nhost_file_id(result)
+    if journal:
+        fields = {'sha256': sha256} if sha256 else {}
+        journal.record(key, STAGE_UPLOADED, nhost_id=nhost_id, **fields, **(transform or {}))
+    return {'success': True, 'response': result, 'nhost_id': nhost_id, 'transform': transform}
+
+def finish_alias(journal, key, sha256, existing, size):
+    """Record an object whose content is already in Nhost as an alias of that file (no upload)"""
+    transform = None
+    if journal:
+        # An alias of a re-encoded upload points at that WebP too
+        source = journal.get(existing['key']) or {}
+        transform = {field: source[field] for field in TRANSFORM_FIELDS if field in source} or None
+        journal.record(key, STAGE_UPLOADED, nhost_id=existing['nhost_id'], sha256=sha256, alias_of=existing['key'],
+                       size=size, **(transform or {}))
+    return {'success': True, 'response': None, 'nhost_id': existing['nhost_id'], 'alias_of': existing['key'],
+            'size': size, 'transform': transform}
+
+def iter_pending_jobs(jobs, journal, bucket_stats):
+    """Yield jobs the journal does not record as uploaded, counting every job into bucket_stats"""
+    for job in jobs:
+        stats = bucket_stats.setdefault(job['bucket'], {'total': 0, 'successful': 0, 'failed': 0, 'skipped': 0})
+        stats['total'] += 1
+        if journal.is_uploaded(job_key(job)):
+            stats['skipped'] += 1
+            continue
+        yield job
+
+def run_bounded(executor, jobs, fn, max_pending):
+    """Submit fn(job) for each job keeping at most max_pending in flight; yield (job, result) as they finish"""
+    pending = {}
+    jobs = iter(jobs)
+    exhausted = False
+    while pending or not exhausted:
+        while not exhausted and len(pending) < max_pending:
+            job = next(jobs, None)
+            if job is None:
+                exhausted = True
+                break
+            pending[executor.submit(fn, job)] = job
+        if not pending:
+            break
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future.result()
+
+def iter_listing_jobs(roots, workers=CRAWL_WORKERS):
+    """Yield a job for every object currently in Supabase under `roots`"""
+    for obj in iter_source_objects(roots, workers):
+        yield {'bucket': obj['bucket'], 'file_path': obj['path']}
+
+def hash_streams(source, target, chunk_size, limiters):
+    """Hash two responses chunk by chunk in lockstep, never holding more than one chunk of each
+
+    Returns [(size, sha256 hex), (size, sha256 hex)] for source and target.
+    """
+    streams = [(source, limiters['supabase'], new_hasher()), (target, limiters['nhost'], new_hasher())]
+    sizes = [0, 0]
+    open_streams = [True, True]
+    while any(open_streams):
+        for i, (stream, limiter, hasher) in enumerate(streams):
+            if not open_streams[i]:
+                continue
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                open_streams[i] = False
+                continue
+            limiter.consume_bytes(len(chunk))
+            hasher.update(chunk)
+            sizes[i] += len(chunk)
+    return [(sizes[i], streams[i][2].hexdigest()) for i in range(2)]
+
+def verify_object(job, nhost_id, chunk_size, limiters, transform=None):
+    """Compare one Supabase object with its Nhost copy by size and streamed SHA-256
+
+    Returns a report dict with status 'ok', 'mismatch', 'missing' (no Nhost
+    copy) or 'error', plus the Nhost Content-Type and the type
+    get_content_type() expects for the name. An object uploaded as WebP
+    (journal `transform` fields) is checked against the recorded WebP instead.
+    """
+    clean_path = job['file_path'].lstrip('/')
+    report = {'file': job_key(job), 'nhost_id': nhost_id,
+              'expected_content_type': get_content_type(os.path.basename(clean_path))}
+    if not nhost_id:
+        return {**report, 'status': 'missing', 'error': 'no Nhost file id in the journal or storage.files'}
+
+    def open_source():
+        limiters['supabase'].before_request()
+        return http_pool.urlopen(supabase_request(supabase_object_url(job['bucket'], job['file_path'])), timeout=30)
+
+    def open_target():
+        limiters['nhost'].before_request()
+        return http_pool.urlopen(nhost_request(nhost_file_url(nhost_id)), timeout=30)
+
+    if transform:
+        return verify_transformed(report, open_target, transform, chunk_size, limiters)
+
+    try:
+        source = request_executor.run('supabase-storage', open_source)
+    except urllib.error.HTTPError as e:
+        return {**report, 'status': 'error', 'error': f"Supabase HTTP {e.code}"}
+    except Exception as e:
+        return {**report, 'status': 'error', 'error': str(e)}
+
+    with source:
+        try:
+            target = request_executor.run('nhost-storage', open_target)
+        except urllib.error.HTTPError as e:
+            status = 'missing' if e.code == 404 else 'error'
+            return {**report, 'status': status, 'error': f"Nhost HTTP {e.code}"}
+        except Exception as e:
+            return {**report, 'status': 'error', 'error': str(e)}
+
+        with target:
+            report['content_type'] = (target.headers.get('Content-Type') or '').split(';')[0].strip() or None
+            source_length = source.headers.get('Content-Length')
+            target_length = target.headers.get('Content-Length')
+            if source_length is not None and target_length is not None and source_length != target_length:
+                # Sizes already differ - no need to read either body
+                return {**report, 'status': 'mismatch',
+                        'source_size': int(source_length), 'target_size': int(target_length)}
+            try:
+                (source_size, source_hash), (target_size, target_hash) = hash_streams(
+                    source, target, chunk_size, limiters)
+            except Exception as e:
+                return {**report, 'status': 'error', 'error': f"Reading bodies failed: {e}"}
+
+    report.update(source_size=source_size, target_size=target_size, sha256=source_hash)
+    if source_size != target_size or source_hash != target_hash:
+        report.update(status='mismatch', target_sha256=target_hash)
+    else:
+        report['status'] = 'ok'
+    return report
+
+def verify_transformed(report, open_target, transform, chunk_size, limiters):
+    """Check a re-encoded object's Nhost copy against the size and SHA-256 recorded when it was uploaded"""
+    report.update(renamed_to=transform['renamed_to'],
+                  expected_content_type=get_content_type(os.path.basename(transform['renamed_to'])))
+    try:
+        target = request_executor.run('nhost-storage', open_target)
+    except urllib.error.HTTPError as e:
+        status = 'missing' if e.code == 404 else 'error'
+        return {**report, 'status': status, 'error': f"Nhost HTTP {e.code}"}
+    except Exception as e:
+        return {**report, 'status': 'error', 'error': str(e)}
+
+    hasher = new_hasher()
+    size = 0
+    with target:
+        report['content_type'] = (target.headers.get('Content-Type') or '').split(';')[0].strip() or None
+        try:
+            for chunk in iter(lambda: target.read(chunk_size), b''):
+                limiters['nhost'].consume_bytes(len(chunk))
+                hasher.update(chunk)
+                size += len(chunk)
+        except Exception as e:
+            return {**report, 'status': 'error', 'error': f"Reading body failed: {e}"}
+
+    report.update(target_size=size, sha256=transform['webp_sha256'])
+    if size != transform['webp_size'] or hasher.hexdigest() != transform['webp_sha256']:
+        report.update(status='mismatch', target_sha256=hasher.hexdigest())
+    else:
+        report['status'] = 'ok'
+    return report
+
+def nhost_ids_for(jobs, migration_journal):
+    """job key -> Nhost file id, from the migration journal, else storage.files by (bucket, basename)"""
+    ids = {}
+    unresolved = []
+    for job in jobs:
+        key = job_key(job)
+        entry = migration_journal.get(key)
+        if entry and entry['stage'] == STAGE_UPLOADED and entry.get('nhost_id'):
+            ids[key] = entry['nhost_id']
+        else:
+            unresolved.append(job)
+    if unresolved:
+        nhost_index = build_nhost_index(iter_nhost_files(run_nhost_sql))
+        for job in unresolved:
+            existing = nhost_index.get((job['bucket'], os.path.basename(job['file_path'].lstrip('/'))))
+            ids[job_key(job)] = existing['id'] if existing else None
+    return ids
+
+def run_verify(args, jobs, limiters):
+    """Verify mode: compare every job's Supabase object with its Nhost copy; returns the exit code"""
+    with MigrationJournal(args.journal, load=True) as migration_journal:
+        nhost_ids = nhost_ids_for(jobs, migration_journal)
+        transforms = transformed_uploads(migration_journal.entries)
+
+    # Verification progress has its own journal, so --resume skips objects already verified
+    verify_journal = MigrationJournal(args.verify_journal, load=args.resume)
+    pending = [job for job in jobs if (verify_journal.get(job_key(job)) or {}).get('stage') != 'ok']
+    print(f"🔎 Verifying {len(pending)} objects ({len(jobs) - len(pending)} already verified)")
+    print()
+
+    metrics = MigrationMetrics(len(pending))
+    counts = {'ok': 0, 'mismatch': 0, 'missing': 0, 'error': 0}
+    problems = {'mismatch': [], 'missing': [], 'error': []}
+    content_type_drift = []
+    verify = lambda job: verify_object(job, nhost_ids.get(job_key(job)), args.chunk_size, limiters,
+                                       transforms.get(job_key(job)))
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            for job, report in run_bounded(executor, pending, verify, max_pending=args.workers * 2):
+                status = report['status']
+                counts[status] += 1
+                verify_journal.record(report['file'], status, **{k: v for k, v in report.items() if k != 'file'})
+                if status != 'ok':
+                    problems[status].append(report)
+                    print(f"✗ {report['file'][:60]} - {status}: {report.get('error') or 'size/hash differ'}")
+                if report.get('content_type') and report['content_type'] != report['expected_content_type']:
+                    content_type_drift.append({'file': report['file'], 'content_type': report['content_type'],
+                                               'expected': report['expected_content_type']})
+                sizes = {'timings': {}, 'bytes_downloaded': report.get('source_size') or 0,
+                         'bytes_uploaded': report.get('target_size') or 0}
+                metrics.record(job['bucket'], sizes, status == 'ok')
+                progress = metrics.progress_line()
+                if progress:
+                    print(progress)
+    finally:
+        verify_journal.close()
+
+    report = {
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'verified': len(pending),
+        'already_verified': len(jobs) - len(pending),
+        'counts': counts,
+        'throughput': metrics.throughput(),
+        **problems,
+        'content_type_drift': content_type_drift,
+    }
+    with open(VERIFY_REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print("\n" + "=" * 70)
+    print("🔎 Verification Complete")
+    print("=" * 70)
+    print(f"✓ Matching: {counts['ok']}")
+    if report['already_verified']:
+        print(f"↷ Already verified: {report['already_verified']}")
+    print(f"✗ Mismatched: {counts['mismatch']}")
+    print(f"✗ Missing in Nhost: {counts['missing']}")
+    print(f"✗ Errors: {counts['error']}")
+    print(f"⚠ Content-type drift: {len(content_type_drift)}")
+    if metrics.files:
+        print(metrics.progress_line(force=True))
+    print()
+    print("📝 Files created:")
+    print(f"   • {VERIFY_REPORT_PATH}")
+    print(f"   • {args.verify_journal}")
+    return 0 if counts['ok'] == len(pending) else 1
+
+def open_cache(args):
+    """The --cache-dir object cache, or None"""
+    if not args.cache_dir:
+        return None
+    cache = ObjectCache(args.cache_dir, args.cache_max_bytes)
+    print(f"🗄  Object cache: {args.cache_dir} ({len(cache)} objects, "
+          f"{cache.total_bytes() / 1e6:.1f} of {args.cache_max_bytes / 1e6:.1f} MB)")
+    return cache
+
+def open_transformer(args):
+    """The --webp process pool, or None"""
+    if not args.webp:
+        return None
+    print(f"🗜  Re-encoding JPEG/PNG over {args.webp_min_bytes} bytes or {args.webp_max_dimension}px "
+          f"to WebP (quality {args.webp_quality})")
+    return image_transform.ImageTransformer(args.webp_processes, args.webp_quality,
+                                            args.webp_max_dimension, args.webp_min_bytes)
+
+def cleanup_temp_dir(temp_dir):
+    """Remove the temp dir unless it holds partial large downloads for the next run to resume"""
+    import shutil
+    partial = list(Path(temp_dir).rglob('*' + ranged_transfer.STATE_SUFFIX))
+    if partial:
+        print(f"♻️  {len(partial)} partial downloads kept in {temp_dir}/ - a rerun resumes them")
+    else:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def run_fanout(args, jobs, supabase_limiter, temp_dir):
+    """Migrate every job to all --targets, downloading each object once
+
+    Every target has its own journal (resumable per target), log and URL
+    rewrite SQL; an object is skipped only once every target has it.
+    """
+    targets = [NhostTarget(spec, args.nhost_rps, args.nhost_bps, args.workers) for spec in args.targets]
+    print(f"🎯 Fan-out to {len(targets)} Nhost targets:")
+    for target in targets:
+        journal = target.open_journal(args.journal, args.resume)
+        recorded = f", {len(journal.entries)} objects recorded" if args.resume else ''
+        print(f"   • {target.name}: {target.storage_url} ({target.concurrency} uploads at a time, "
+              f"journal {journal.path}{recorded})")
+    cache = open_cache(args)
+    transformer = open_transformer(args)
+
+    bucket_stats = {}
+    streamed = not isinstance(jobs, list)
+    pending_jobs = iter_pending_jobs(jobs, FanOutJournals(targets), bucket_stats)
+    if not streamed:
+        pending_jobs = list(pending_jobs)
+        for bucket, stats in bucket_stats.items():
+            print(f"📦 Bucket: {bucket} ({stats['total']} files, {stats['skipped']} already on every target)")
+    print()
+
+    metrics = MigrationMetrics(None if streamed else len(pending_jobs))
+    worker_count = args.workers
+    try:
+        with ThreadPoolExecutor(max_workers=sum(target.concurrency for target in targets)) as upload_executor, \
+                ThreadPoolExecutor(max_workers=worker_count) as executor:
+            worker = lambda job: fan_out_file(job, temp_dir, targets, supabase_limiter, upload_executor, cache,
+                                              transformer)
+            for job, result in run_bounded(executor, pending_jobs, worker, max_pending=worker_count * 2):
+                clean_path = job['file_path'].lstrip('/')
+                stats = bucket_stats[job['bucket']]
+                done = stats['successful'] + stats['failed'] + stats['skipped'] + 1
+                prefix = f"[{job['bucket']} {done}]" if streamed else f"[{job['bucket']} {done}/{stats['total']}]"
+
+                failures = []
+                for target in targets:
+                    target_result = result['targets'].get(target.name)
+                    if target_result is None:
+                        continue
+                    if target_result['success']:
+                        target.stats['successful'] += 1
+                    else:
+                        target.stats['failed'] += 1
+                        target.failed_files.append({'file': clean_path, 'error': target_result['error'],
+                                                    'stage': target_result['stage']})
+                        failures.append(f"{target.name}: {target_result['stage'].capitalize()} failed: "
+                                        f"{target_result['error']}")
+                uploaded_to = ', '.join(name for name, r in result['targets'].items() if r['success'])
+                if result['success']:
+                    stats['successful'] += 1
+                    print(f"{prefix} ✓ {clean_path[:50]} → {uploaded_to}")
+                else:
+                    stats['failed'] += 1
+                    print(f"{prefix} ✗ {clean_path[:50]} - {'; '.join(failures)}")
+
+                metrics.record(job['bucket'], result.get('metrics'), result['success'])
+                progress = metrics.progress_line()
+                if progress:
+                    print(progress)
+                    if args.metrics_prom:
+                        metrics.write_prometheus(args.metrics_prom)
+    finally:
+        for target in targets:
+            target.journal.close()
+        if transformer:
+            transformer.close()
+        if cache is not None:
+            cache.close()
+
+    # One log and URL rewrite SQL per target, plus the combined log
+    total = sum(stats['total'] for stats in bucket_stats.values())
+    endpoints = request_executor.default_executor.snapshot()
+    outputs = []
+    for target in targets:
+        journal_path, log_path, sql_path = target.paths(args.journal, LOG_PATH, URL_REWRITE_SQL_PATH)
+        target.stats['skipped'] = total - target.stats['successful'] - target.stats['failed']
+        with open(log_path, 'w') as f:
+            json.dump({
+                'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'target': target.name,
+                'storage_url': target.storage_url,
+                'total_files': target.stats['successful'] + target.stats['failed'],
+                **target.stats,
+                'endpoint': endpoints.get(target.endpoint),
+                'failed_files': target.failed_files,
+            }, f, indent=2)
+        target.stats['url_rewrites'] = write_url_rewrites(journal_path, sql_path, target.subdomain or '')
+        outputs += [log_path, sql_path, journal_path]
+
+    log_data = {
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'total_files': sum(stats['successful'] + stats['failed'] for stats in bucket_stats.values()),
+        'successful': sum(stats['successful'] for stats in bucket_stats.values()),
+        'failed': sum(stats['failed'] for stats in bucket_stats.values()),
+        'skipped': sum(stats['skipped'] for stats in bucket_stats.values()),
+        'buckets': bucket_stats,
+        'targets': {target.name: target.stats for target in targets},
+        'endpoints': endpoints,
+        'metrics': metrics.to_dict(),
+    }
+    if cache is not None:
+        log_data['cache'] = {'directory': args.cache_dir, 'max_bytes': args.cache_max_bytes, **cache.stats}
+    with open(LOG_PATH, 'w') as f:
+        json.dump(log_data, f, indent=2)
+    if args.metrics_prom:
+        metrics.write_prometheus(args.metrics_prom)
+    cleanup_temp_dir(temp_dir)
+
+    print("\n" + "=" * 70)
+    print("✅ Fan-out Migration Complete!")
+    print("=" * 70)
+    print(f"Total files: {log_data['total_files']} ({log_data['skipped']} already on every target)")
+    for target in targets:
+        stats = target.stats
+        print(f"   • {target.name}: ✓ {stats['successful']}  ✗ {stats['failed']}  ↷ {stats['skipped']}  "
+              f"🔗 {stats['url_rewrites']} URL rewrites")
+    if metrics.files:
+        print(metrics.progress_line(force=True))
+    print()
+    print("📝 Files created:")
+    for path in [LOG_PATH] + outputs:
+        print(f"   • {path}")
+    return 0 if not any(target.stats['failed'] for target in targets) else 1
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate files from Supabase Storage to Nhost Storage")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of files transferred concurrently (default: 1)")
+    parser.add_argument('--supabase-rps', type=float, default=3.0,
+                        help="Max Supabase requests per second, shared by all workers (0 = unlimited)")
+    parser.add_argument('--supabase-bps', type=float, default=0,
+                        help="Max Supabase download bytes per second (0 = unlimited)")
+    parser.add_argument('--nhost-rps', type=float, default=3.0,
+                        help="Max Nhost requests per second, shared by all workers (0 = unlimited)")
+    parser.add_argument('--nhost-bps', type=float, default=0,
+                        help="Max Nhost upload bytes per second (0 = unlimited)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Pipe each object from Supabase to Nhost in fixed-size chunks (no temp files)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Chunk size in bytes for --stream (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument('--segment-size', type=int, default=ranged_transfer.DEFAULT_SEGMENT_SIZE,
+                        help="Objects larger than this are downloaded as parallel Range segments and uploaded "
+                             f"in chunks (default: {ranged_transfer.DEFAULT_SEGMENT_SIZE})")
+    parser.add_argument('--segment-workers', type=int, default=ranged_transfer.DEFAULT_SEGMENT_WORKERS,
+                        help=f"Segments of one object downloaded in parallel (default: {ranged_transfer.DEFAULT_SEGMENT_WORKERS})")
+    parser.add_argument('--chunk-timeout', type=float, default=ranged_transfer.DEFAULT_CHUNK_TIMEOUT,
+                        help="Seconds a segment read or upload chunk may stall before it is retried "
+                             f"(default: {ranged_transfer.DEFAULT_CHUNK_TIMEOUT})")
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help="Keep downloaded objects in this persistent cache; later runs revalidate them with "
+                             "conditional GETs and read unchanged objects from disk")
+    parser.add_argument('--cache-max-bytes', type=byte_size_arg, default=DEFAULT_CACHE_MAX_BYTES, metavar='SIZE',
+                        help="Evict least recently used objects beyond this cache size, e.g. 500M or 20G "
+                             f"(default: {DEFAULT_CACHE_MAX_BYTES // 1024 ** 3}G)")
+    parser.add_argument('--delta', action='store_true',
+                        help="List Supabase and Nhost storage and transfer only new or changed objects")
+    parser.add_argument('--from-listing', action='store_true',
+                        help="Enumerate objects from the live Supabase listing while migrating, instead of "
+                             f"reading {INVENTORY_PATH}")
+    parser.add_argument('--bucket', action='append', metavar='NAME',
+                        help="Bucket to enumerate with --from-listing/--delta (repeatable; default: the "
+                             "inventory's buckets, or every Supabase bucket without an inventory)")
+    parser.add_argument('--prefix', action='append', metavar='BUCKET/PREFIX',
+                        help="Only enumerate objects under this folder, e.g. documents/activity_overview (repeatable)")
+    parser.add_argument('--list-workers', type=int, default=CRAWL_WORKERS,
+                        help=f"Folders listed in parallel when enumerating Supabase (default: {CRAWL_WORKERS})")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip objects the journal records as uploaded by an earlier run")
+    parser.add_argument('--journal', default=JOURNAL_PATH,
+                        help=f"Checkpoint journal path (default: {JOURNAL_PATH})")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Upload identical content once per bucket; later copies become aliases of the first "
+                             "(not with --shard/--processes)")
+    parser.add_argument('--webp', action='store_true',
+                        help="Re-encode large JPEG/PNG images to WebP before uploading (needs Pillow)")
+    parser.add_argument('--webp-quality', type=int, default=image_transform.DEFAULT_QUALITY,
+                        help=f"WebP quality 1-100 (default: {image_transform.DEFAULT_QUALITY})")
+    parser.add_argument('--webp-max-dimension', type=int, default=image_transform.DEFAULT_MAX_DIMENSION,
+                        help="Re-encode images wider or taller than this and downscale them to fit "
+                             f"(default: {image_transform.DEFAULT_MAX_DIMENSION})")
+    parser.add_argument('--webp-min-bytes', type=int, default=image_transform.DEFAULT_MIN_BYTES,
+                        help=f"Re-encode images larger than this many bytes (default: {image_transform.DEFAULT_MIN_BYTES})")
+    parser.add_argument('--webp-processes', type=int, default=None,
+                        help="Processes re-encoding images (default: one per CPU)")
+    parser.add_argument('--targets', metavar='PATH',
+                        help="JSON file of Nhost projects to upload every object to, each downloaded once "
+                             "(see nhost_targets.py)")
+    parser.add_argument('--shard', type=shard_arg, metavar='I/N',
+                        help="Only migrate shard I of N (0-based): objects are split by a stable hash of their "
+                             "path, so N processes or machines can each run one shard")
+    parser.add_argument('--processes', type=int, metavar='N',
+                        help="Run N shards as local child processes, then merge their results")
+    parser.add_argument('--merge-shards', type=int, metavar='N',
+                        help="Merge the journals and logs of shards 0..N-1 and write the URL rewrite SQL")
+    parser.add_argument('--max-retries', type=int, default=request_executor.DEFAULT_MAX_RETRIES,
+                        help="Retries per request on 429/5xx/timeouts, with backoff and Retry-After "
+                             f"(default: {request_executor.DEFAULT_MAX_RETRIES})")
+    parser.add_argument('--pool-size', type=int, default=None,
+                        help="Idle keep-alive connections kept per host (default: --workers, at least 2)")
+    parser.add_argument('--pool-idle-timeout', type=float, default=http_pool.DEFAULT_IDLE_TIMEOUT,
+                        help=f"Seconds an idle connection may be reused (default: {http_pool.DEFAULT_IDLE_TIMEOUT:g})")
+    parser.add_argument('--verify', action='store_true',
+                        help="Instead of migrating, compare each object in Supabase and Nhost by size and "
+                             "streamed SHA-256 (with --delta: every object in the live Supabase listing)")
+    parser.add_argument('--verify-journal', default=VERIFY_JOURNAL_PATH,
+                        help=f"Progress journal for --verify, resumable with --resume (default: {VERIFY_JOURNAL_PATH})")
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help="Also write run metrics in Prometheus text format to PATH (refreshed with each progress line)")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Profile the run with cProfile and tracemalloc; reports are saved as {PROFILE_PREFIX}*")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+    if args.segment_size < 1 or args.segment_workers < 1 or args.chunk_timeout <= 0:
+        parser.error("--segment-size, --segment-workers and --chunk-timeout must be positive")
+    if args.cache_dir and args.stream:
+        parser.error("--cache-dir keeps downloaded files and cannot be combined with --stream")
+    if args.dedup and args.stream:
+        parser.error("--dedup needs each object's hash before uploading it and cannot be combined with --stream")
+    if args.list_workers < 1:
+        parser.error("--list-workers must be at least 1")
+    if args.webp:
+        if args.stream:
+            parser.error("--webp re-encodes the downloaded file and cannot be combined with --stream")
+        if not image_transform.webp_available():
+            parser.error("--webp needs Pillow with WebP support (pip install Pillow)")
+        if not 1 <= args.webp_quality <= 100:
+            parser.error("--webp-quality must be between 1 and 100")
+        if args.webp_max_dimension < 1 or (args.webp_processes is not None and args.webp_processes < 1):
+            parser.error("--webp-max-dimension and --webp-processes must be positive")
+    if (args.bucket or args.prefix) and not (args.from_listing or args.delta):
+        parser.error("--bucket and --prefix select what --from-listing or --delta enumerate")
+    if args.processes is not None and args.processes < 1 or args.merge_shards is not None and args.merge_shards < 1:
+        parser.error("--processes and --merge-shards must be at least 1")
+    if sum(option is not None for option in (args.shard, args.processes, args.merge_shards)) > 1:
+        parser.error("--shard, --processes and --merge-shards are separate steps; use one per run")
+    if args.verify and (args.shard or args.processes or args.merge_shards):
+        parser.error("--verify runs unsharded, after the shards have been merged")
+    if args.dedup and (args.shard or args.processes):
+        parser.error("--dedup needs one content index over every object; shards each see only their own slice, "
+                     "so run it unsharded")
+    if args.targets:
+        conflicts = [option for option, value in (('--stream', args.stream), ('--dedup', args.dedup),
+                                                  ('--delta', args.delta), ('--verify', args.verify),
+                                                  ('--shard', args.shard), ('--processes', args.processes),
+                                                  ('--merge-shards', args.merge_shards)) if value]
+        if conflicts:
+            parser.error(f"--targets cannot be combined with {', '.join(conflicts)}")
+        try:
+            args.targets = load_targets(args.targets)
+        except (OSError, ValueError) as e:
+            parser.error(f"--targets: {e}")
+    return args
+
+def byte_size_arg(value):
+    try:
+        return parse_byte_size(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def shard_arg(value):
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def write_url_rewrites(journal_path, sql_path=URL_REWRITE_SQL_PATH, nhost_subdomain=None):
+    """Generate 00012 from the journal - it is the source path -> Nhost file id index,
+    so every reference is rewritten to its exact file id without a storage.files lookup"""
+    if nhost_subdomain is None:
+        nhost_subdomain = os.environ.get('NHOST_SUBDOMAIN')
+    mappings = iter_url_mappings(read_entries(journal_path), source_url_prefixes(supabase_base_url(), nhost_subdomain))
+    return write_url_rewrite_sql(sql_path, mappings, header=[
+        "Rewrite storage URLs from Supabase to Nhost file ids",
+        f"Generated: {time.strftime('%Y-%m-%d %H:%M:%S')} from {journal_path}",
+    ])
+
+def merge_shards(journal_path, count):
+    """Fold the journals and logs of shards 0..count-1 into the main journal, log and URL rewrite SQL"""
+    print(f"🧩 Merging {count} shards...")
+    try:
+        logs = load_shard_logs(LOG_PATH, count)
+    except FileNotFoundError as e:
+        print(f"✗ {e}")
+        return 1
+    shard_journals = [shard_path(journal_path, (i, count)) for i in range(count)
+                      if os.path.exists(shard_path(journal_path, (i, count)))]
+    copied = merge_journals(shard_journals, journal_path)
+    # The records now live in the main journal, which seeds a resumed shard
+    for path in shard_journals:
+        os.remove(path)
+    print(f"✓ {copied} journal records merged into {journal_path}")
+
+    log_data = merge_logs(logs)
+    with open(LOG_PATH, 'w') as f:
+        json.dump(log_data, f, indent=2)
+    rewrite_count = write_url_rewrites(journal_path)
+    print(f"🔗 URL rewrites: {rewrite_count} URLs mapped to Nhost file ids")
+
+    print("\n" + "=" * 70)
+    print("✅ Shards merged!" if log_data['failed'] == 0 else "⚠️  Shards merged with failures")
+    print("=" * 70)
+    print(f"Total files: {log_data['total_files']}")
+    print(f"✓ Successful: {log_data['successful']}")
+    print(f"✗ Failed: {log_data['failed']}")
+    if log_data['skipped']:
+        print(f"↷ Skipped (already migrated): {log_data['skipped']}")
+    for bucket, stats in log_data['buckets'].items():
+        print(f"   • {bucket}: {stats['successful'] + stats['skipped']}/{stats['total']} migrated")
+    print()
+    print("📝 Files created:")
+    print(f"   • {LOG_PATH}")
+    print(f"   • {URL_REWRITE_SQL_PATH}")
+    print(f"   • {journal_path}")
+    return 0 if log_data['failed'] == 0 else 1
+
+def main(argv=None):
+    args = parse_args(argv)
+
     print("=" * 70)
     print("🚀 Storage Migration: Supabase → Nhost")
     print("=" * 70)
@@ -142,64 +1212,203 @@ def main():
     print(f"✓ Nhost Subdomain: {os.environ.get('NHOST_SUBDOMAIN')}")
     print()
 
-    # Load inventory
-    inventory_path = 'nhost/migrations/storage_migration_inventory.json'
-    with open(inventory_path, 'r') as f:
-        inventory = json.load(f)
+    if args.merge_shards:
+        return merge_shards(args.journal, args.merge_shards)
+    if args.processes:
+        # Each child runs one --shard of the same command line, then the results are merged
+        child_argv = without_option(sys.argv[1:] if argv is None else argv, '--processes')
+        exit_codes = run_local_shards(os.path.abspath(__file__), child_argv, args.processes, SHARD_OUTPUT_PATH)
+        print()
+        merged = merge_shards(args.journal, args.processes)
+        return 0 if merged == 0 and not any(exit_codes) else 1
+
+    # A shard keeps its own journal and log; --merge-shards folds them back together
+    shard = args.shard
+    main_journal = args.journal
+    log_path = LOG_PATH
+    if shard:
+        args.journal = shard_path(main_journal, shard)
+        log_path = shard_path(LOG_PATH, shard)
+        if args.metrics_prom:
+            args.metrics_prom = shard_path(args.metrics_prom, shard)
+        print(f"🧩 Shard {shard[0]}/{shard[1]} (journal: {args.journal})")
+
+    # Load inventory (optional when enumerating the live listing)
+    live_listing = args.from_listing or args.delta
+    inventory = None
+    if not live_listing or (os.path.exists(INVENTORY_PATH) and not (args.bucket or args.prefix)):
+        with open(INVENTORY_PATH, 'r') as f:
+            inventory = json.load(f)
+    roots = listing_roots(args, inventory) if live_listing else None
 
-    print(f"📊 Files to migrate: {inventory['summary']['total_files']}")
+    delta_counts = {'new': 0, 'changed': 0}
+    if args.verify and live_listing:
+        print("🔍 Listing Supabase storage...")
+        jobs = list(iter_listing_jobs(roots, args.list_workers))
+        print(f"📊 Objects to verify: {len(jobs)}")
+    elif args.from_listing:
+        # Jobs stream from the listing into the worker pool; totals are only known at the end
+        sources = ', '.join(f"{bucket}/{prefix}" for bucket, prefix in roots)
+        if args.delta:
+            print(f"🔍 Streaming the Supabase listing of {sources} past the Nhost index (delta sync)...")
+            entries = known_entries(main_journal, args.journal)
+            jobs = iter_delta_jobs(roots, delta_counts, args.list_workers, transformed_uploads(entries),
+                                   aliased_uploads(entries))
+        else:
+            print(f"🔍 Streaming the Supabase listing of {sources}...")
+            jobs = iter_listing_jobs(roots, args.list_workers)
+    elif args.delta:
+        print("🔍 Listing Supabase and Nhost storage for delta sync...")
+        entries = known_entries(main_journal, args.journal)
+        jobs = list(iter_delta_jobs(roots, delta_counts, args.list_workers, transformed_uploads(entries),
+                                    aliased_uploads(entries)))
+        print(f"📊 Delta: {delta_counts['new']} new, {delta_counts['changed']} changed")
+    else:
+        jobs = list(iter_inventory_jobs(inventory))
+        print(f"📊 Files to migrate: {inventory['summary']['total_files']}")
+    if shard:
+        in_shard = lambda job: shard_of(job_key(job), shard[1]) == shard[0]
+        if isinstance(jobs, list):
+            total = len(jobs)
+            jobs = [job for job in jobs if in_shard(job)]
+            print(f"🧩 {len(jobs)} of {total} objects in this shard")
+        else:
+            jobs = filter(in_shard, jobs)
+    print(f"⚙️  Workers: {args.workers}")
+    if args.stream:
+        print(f"⚙️  Streaming transfers ({args.chunk_size} byte chunks, no temp files)")
     print()
 
-    # Create temp directory
-    temp_dir = 'temp_storage_migration'
-    Path(temp_dir).mkdir(parents=True, exist_ok=True)
+    # Reuse connections per host across all workers; streaming holds a
+    # Supabase and an Nhost connection per worker at once
+    http_pool.configure(args.pool_size or max(args.workers, 2), args.pool_idle_timeout)
+    ranged_transfer.configure(args.segment_size, args.segment_workers, args.chunk_timeout)
 
-    # Track results
-    success_count = 0
-    failed_count = 0
-    failed_files = []
+    # Retries plus adaptive per-endpoint concurrency, capped at --workers
+    request_executor.configure(max_retries=args.max_retries, max_concurrency=args.workers)
 
-    # Migrate files from each bucket
-    for bucket_name, bucket_info in inventory['buckets'].items():
-        if bucket_name == "documents/activity_overview":
-            actual_bucket = "documents"
-            files = [f"activity_overview/{f}" for f in bucket_info['files']]
-        else:
-            actual_bucket = bucket_name
-            files = bucket_info['files']
+    # Shared rate limits replace the old fixed sleep between files
+    limiters = {
+        'supabase': EndpointLimiter(args.supabase_rps, args.supabase_bps),
+        'nhost': EndpointLimiter(args.nhost_rps, args.nhost_bps),
+    }
 
-        print(f"\n📦 Migrating bucket: {actual_bucket} ({len(files)} files)")
+    if args.verify:
+        return run_verify(args, jobs, limiters)
 
-        for i, file_path in enumerate(files, 1):
-            # Clean file path
-            clean_path = file_path.lstrip('/')
+    # Create temp directory (streaming mode never writes to it); each shard stages and cleans up its own
+    temp_dir = shard_path(TEMP_DIR, shard) if shard else TEMP_DIR
+    if not args.stream:
+        Path(temp_dir).mkdir(parents=True, exist_ok=True)
+    chunk_size = args.chunk_size if args.stream else None
+    if args.targets:
+        return run_fanout(args, jobs, limiters['supabase'], temp_dir)
 
-            print(f"[{i}/{len(files)}] {clean_path[:50]}...")
+    # Checkpoint journal - always appended to, only consulted with --resume
+    journal = MigrationJournal(args.journal, load=args.resume)
+    if args.resume and shard:
+        # Earlier runs of this shard may already have been merged into the main journal
+        for key, entry in read_entries(main_journal).items():
+            if shard_of(key, shard[1]) == shard[0]:
+                journal.entries.setdefault(key, entry)
+    if args.resume:
+        print(f"♻️  Resuming from journal: {args.journal} ({len(journal.entries)} objects recorded)")
 
-            # Download
-            download_url = f"https://{os.environ['SUPABASE_PROJECT_ID']}.supabase.co/storage/v1/object/public/{actual_bucket}/{file_path}"
-            local_path = os.path.join(temp_dir, actual_bucket, clean_path)
+    # Content hash -> Nhost file index; a resumed run also knows earlier uploads
+    content_index = None
+    if args.dedup:
+        content_index = ContentIndex()
+        seeded = content_index.seed_from_journal(journal)
+        print(f"🧬 Deduplicating by SHA-256 ({seeded} known uploads from the journal)")
 
-            success, error = download_file(download_url, local_path)
-            if not success:
-                print(f"   ✗ Download failed: {error}")
-                failed_count += 1
-                failed_files.append({'file': clean_path, 'error': error, 'stage': 'download'})
-                continue
+    # Objects downloaded by earlier runs, revalidated before reuse
+    cache = open_cache(args)
 
-            print(f"   ✓ Downloaded")
+    # CPU-bound image re-encoding runs in its own process pool
+    transformer = open_transformer(args)
 
-            # Upload
-            success, result = upload_file_to_nhost(local_path, actual_bucket, clean_path)
-            if success:
-                print(f"   ✓ Uploaded")
-                success_count += 1
-            else:
-                print(f"   ✗ Upload failed: {result}")
-                failed_count += 1
-                failed_files.append({'file': clean_path, 'error': result, 'stage': 'upload'})
+    # Track results - only the main thread touches these
+    success_count = 0
+    failed_count = 0
+    failed_files = []
+    bucket_stats = {}
+    replaced_files = []
+    aliases = []
+    dedup_bytes_saved = 0
+    renamed_files = []
+    streamed = not isinstance(jobs, list)
+    pending_jobs = iter_pending_jobs(jobs, journal, bucket_stats)
+    if not streamed:
+        # Known job list: count everything up front for per-bucket totals and an ETA
+        pending_jobs = list(pending_jobs)
+        for bucket, stats in bucket_stats.items():
+            print(f"📦 Bucket: {bucket} ({stats['total']} files, {stats['skipped']} already migrated)")
+        print()
+    metrics = MigrationMetrics(None if streamed else len(pending_jobs))
+    worker = lambda job: migrate_file(job, temp_dir, limiters, chunk_size, journal, content_index, transformer, cache)
+    profiler = None
+    if args.profile:
+        profiler = RunProfiler()
+        worker = profiler.wrap(worker)
+        profiler.start()
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            results = run_bounded(executor, pending_jobs, worker, max_pending=args.workers * 2)
+            for job, result in results:
+                clean_path = job['file_path'].lstrip('/')
+                stats = bucket_stats[job['bucket']]
+                done = stats['successful'] + stats['failed'] + stats['skipped'] + 1
+                prefix = f"[{job['bucket']} {done}]" if streamed else f"[{job['bucket']} {done}/{stats['total']}]"
 
-            time.sleep(0.3)  # Rate limiting
+                if result['success']:
+                    success_count += 1
+                    stats['successful'] += 1
+                    if result.get('alias_of'):
+                        print(f"{prefix} ≡ {clean_path[:50]} (same content as {result['alias_of']})")
+                        aliases.append({
+                            'file': job_key(job),
+                            'nhost_id': result['nhost_id'],
+                            'same_as': result['alias_of'],
+                        })
+                        dedup_bytes_saved += result['size']
+                    elif result.get('transform'):
+                        transform = result['transform']
+                        print(f"{prefix} ✓ {clean_path[:50]} → {os.path.basename(transform['renamed_to'])} "
+                              f"({transform['original_size'] // 1024} KB → {transform['webp_size'] // 1024} KB)")
+                    else:
+                        print(f"{prefix} ✓ {clean_path[:50]}")
+                    if result.get('transform'):
+                        renamed_files.append({'file': job_key(job), 'nhost_id': result['nhost_id'], **result['transform']})
+                    if job.get('replaces'):
+                        replaced_files.append({
+                            'file': clean_path,
+                            'old_nhost_id': job['replaces'],
+                            'new_nhost_id': result['nhost_id'],
+                        })
+                else:
+                    print(f"{prefix} ✗ {clean_path[:50]} - {result['stage'].capitalize()} failed: {result['error']}")
+                    failed_count += 1
+                    stats['failed'] += 1
+                    failed_files.append({'file': clean_path, 'error': result['error'], 'stage': result['stage']})
+
+                metrics.record(job['bucket'], result.get('metrics'), result['success'])
+                progress = metrics.progress_line()
+                if progress:
+                    print(progress)
+                    if args.metrics_prom:
+                        metrics.write_prometheus(args.metrics_prom)
+    finally:
+        journal.close()
+        if transformer:
+            transformer.close()
+        if cache is not None:
+            cache.close()
+        if profiler:
+            profiler.stop()
+
+    skipped_count = sum(stats['skipped'] for stats in bucket_stats.values())
+    if streamed and args.delta:
+        print(f"📊 Delta: {delta_counts['new']} new, {delta_counts['changed']} changed")
 
     # Save log
     log_data = {
@@ -207,26 +1416,53 @@ def main():
         'total_files': success_count + failed_count,
         'successful': success_count,
         'failed': failed_count,
+        'skipped': skipped_count,
+        'buckets': bucket_stats,
+        'endpoints': request_executor.default_executor.snapshot(),
+        'metrics': metrics.to_dict(),
         'failed_files': failed_files
     }
+    if args.delta:
+        # Changed objects are uploaded as new files; the superseded ones are
+        # listed so they can be removed once references point at the new ids
+        log_data['delta'] = delta_counts
+        log_data['replaced_files'] = replaced_files
+    if args.dedup:
+        # Aliased objects share the Nhost file of `same_as`; URL rewriting must
+        # map them to that nhost_id
+        log_data['dedup'] = {
+            'duplicates': len(aliases),
+            'upload_bytes_saved': dedup_bytes_saved,
+            'aliases': aliases,
+        }
+    if shard:
+        log_data['shard'] = f"{shard[0]}/{shard[1]}"
+    if cache is not None:
+        log_data['cache'] = {'directory': args.cache_dir, 'max_bytes': args.cache_max_bytes, **cache.stats}
+    if args.webp:
+        # Old -> new object names; references are rewritten by nhost_id, so URLs need no extra step
+        log_data['webp'] = {
+            'reencoded': len(renamed_files),
+            'bytes_before': sum(f['original_size'] for f in renamed_files),
+            'bytes_after': sum(f['webp_size'] for f in renamed_files),
+            'renamed_files': renamed_files,
+        }
 
-    with open('nhost/migrations/storage_migration_log.json', 'w') as f:
+    with open(log_path, 'w') as f:
         json.dump(log_data, f, indent=2)
+    if args.metrics_prom:
+        metrics.write_prometheus(args.metrics_prom)
+    profile_reports = profiler.save(shard_path(PROFILE_PREFIX, shard) if shard else PROFILE_PREFIX) if profiler else []
 
-    # Generate SQL
-    with open('nhost/migrations/00012_update_storage_urls.sql', 'w') as f:
-        f.write("-- Update storage URLs from Supabase to Nhost\n")
-        f.write(f"-- Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        f.write("-- Update member.profile_image URLs\n")
-        f.write("UPDATE member SET profile_image = REPLACE(\n")
-        f.write(f"  profile_image,\n")
-        f.write(f"  'https://{os.environ['SUPABASE_PROJECT_ID']}.supabase.co/storage/v1/object/public/',\n")
-        f.write(f"  'https://{os.environ['NHOST_SUBDOMAIN']}.storage.run.app/v1/files/'\n")
-        f.write(") WHERE profile_image IS NOT NULL AND profile_image != '';\n")
-
-    # Cleanup
-    import shutil
-    shutil.rmtree(temp_dir)
+    # The URL rewrite needs every shard's file ids, so a shard leaves it to the merge
+    if shard:
+        print(f"🧩 Shard {shard[0]}/{shard[1]} done - run with --merge-shards {shard[1]} once every shard has finished")
+    else:
+        rewrite_count = write_url_rewrites(args.journal)
+        print(f"🔗 URL rewrites: {rewrite_count} URLs mapped to Nhost file ids")
+
+    # Cleanup - partially downloaded large objects are kept for the next run to resume
+    cleanup_temp_dir(temp_dir)
 
     # Summary
     print("\n" + "=" * 70)
@@ -235,10 +1471,31 @@ def main():
     print(f"Total files: {success_count + failed_count}")
     print(f"✓ Successful: {success_count}")
     print(f"✗ Failed: {failed_count}")
+    if skipped_count:
+        print(f"↷ Skipped (already migrated): {skipped_count}")
+    if args.dedup:
+        print(f"≡ Deduplicated: {len(aliases)} ({dedup_bytes_saved / 1e6:.1f} MB not uploaded)")
+    if args.webp:
+        print(f"🗜  Re-encoded to WebP: {log_data['webp']['reencoded']} "
+              f"({log_data['webp']['bytes_before'] / 1e6:.1f} MB → {log_data['webp']['bytes_after'] / 1e6:.1f} MB)")
+    if cache is not None:
+        print(f"🗄  Object cache: {cache.stats['hits']} unchanged objects read from disk "
+              f"({cache.stats['bytes_from_cache'] / 1e6:.1f} MB), {cache.stats['stored']} added, "
+              f"{cache.stats['evicted']} evicted")
+    for bucket, stats in bucket_stats.items():
+        print(f"   • {bucket}: {stats['successful'] + stats['skipped']}/{stats['total']} migrated")
+    if metrics.files:
+        print(metrics.progress_line(force=True))
     print()
     print("📝 Files created:")
-    print("   • nhost/migrations/storage_migration_log.json")
-    print("   • nhost/migrations/00012_update_storage_urls.sql")
+    print(f"   • {log_path}")
+    if not shard:
+        print(f"   • {URL_REWRITE_SQL_PATH}")
+    print(f"   • {args.journal}")
+    if args.metrics_prom:
+        print(f"   • {args.metrics_prom}")
+    for path in profile_reports:
+        print(f"   • {path}")
 
     return 0 if failed_count == 0 else 1
 
@@ -253,4 +1510,3 @@ if __name__ == "__main__":
         import traceback
         traceback.print_exc()
         sys.exit(1)
-
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark for the migration scripts (standard library only)
+
+Starts the local Supabase/Nhost stand-ins from stand_in_servers.py, then runs
+each scenario in its own process against them and reports wall time,
+files/sec or rows/sec, MB/sec, peak RSS and request counts per endpoint:
+
+    python3 scripts/migration_bench.py --files 500 --workers 8 --latency 0.02
+    python3 scripts/migration_bench.py --scenario recovery-simplified --table-rows 50000
+
+Scenarios run in a scratch directory, so the real nhost/migrations files are
+never touched. Script output goes to <scenario>.log in that directory.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from stand_in_servers import StandInConfig, StandIns
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+INVENTORY_PATH = 'nhost/migrations/storage_migration_inventory.json'
+JOURNAL_PATH = 'nhost/migrations/storage_migration_journal.jsonl'
+
+SCENARIOS = {
+    # scenario: what one counted item is
+    'migrate': 'files',
+    'migrate-stream': 'files',
+    'migrate-listing': 'files',
+    # Re-syncs with --delta after the migrate scenarios; nothing changed, so nothing is transferred
+    'migrate-delta': 'files',
+    # Compares the uploads of the migrate scenarios with the source, so runs after them
+    'verify': 'files',
+    'bucket-fix': 'files',
+    'bucket-fix-bulk': 'files',
+    'recovery-simplified': 'rows',
+    'emergency-recovery': 'rows',
+}
+# Tables each recovery script reads from Supabase
+RECOVERY_TABLES = {
+    'recovery-simplified': ('member', 'activities', 'family_member'),
+    'emergency-recovery': ('member', 'activities', 'family_member'),
+}
+
+
+def build_inventory(files):
+    """Synthetic inventory shaped like storage_migration_inventory.json, with `files` objects"""
+    split = {
+        'profile_image': files * 2 // 10,
+        'documents/activity_overview': files // 10,
+    }
+    split['documents'] = files - sum(split.values())
+    buckets = {}
+    for bucket, count in split.items():
+        prefix = 'activity' if 'activity' in bucket else 'profile'
+        names = [f'{prefix}_{1700000000 + i}.jpg' for i in range(count)]
+        buckets[bucket] = {'description': 'benchmark objects', 'file_count': count, 'files': names}
+    return {'summary': {'total_files': files}, 'buckets': buckets}
+
+
+def supabase_objects(inventory):
+    """bucket -> object paths, as the Supabase stand-in should list them"""
+    objects = {}
+    for bucket, info in inventory['buckets'].items():
+        if bucket == 'documents/activity_overview':
+            objects.setdefault('documents', []).extend(f'activity_overview/{f}' for f in info['files'])
+        else:
+            objects.setdefault(bucket, []).extend(info['files'])
+    return objects
+
+
+def run_scenario(scenario, workers):
+    """Child-process side: run one scenario in the current (scratch) directory"""
+    if scenario.startswith('migrate'):
+        import migrate_storage_stdlib
+        # Credentials come from the stand-in environment, not the developer's config files
+        migrate_storage_stdlib.load_credentials = lambda: None
+        argv = ['--workers', str(workers), '--supabase-rps', '0', '--nhost-rps', '0']
+        if scenario == 'migrate-stream':
+            argv.append('--stream')
+        elif scenario == 'migrate-listing':
+            # Jobs stream from the Supabase listing instead of the inventory
+            argv.append('--from-listing')
+        elif scenario == 'migrate-delta':
+            argv.append('--delta')
+        exit_code = migrate_storage_stdlib.main(argv)
+        if scenario == 'migrate-delta' and exit_code == 0:
+            # A re-sync right after a full migration must find nothing new or changed
+            with open(migrate_storage_stdlib.LOG_PATH) as f:
+                delta = json.load(f).get('delta', {})
+            if delta.get('new') or delta.get('changed'):
+                print(f"✗ Delta re-sync found {delta.get('new', 0)} new, {delta.get('changed', 0)} changed objects")
+                return 1
+        return exit_code
+
+    if scenario == 'verify':
+        import migrate_storage_stdlib
+        migrate_storage_stdlib.load_credentials = lambda: None
+        return migrate_storage_stdlib.main(['--verify', '--workers', str(workers),
+                                            '--supabase-rps', '0', '--nhost-rps', '0'])
+
+    if scenario.startswith('bucket-fix'):
+        import simple_bucket_fix
+        simple_bucket_fix.load_credentials = lambda: None
+        argv = ['--yes', '--inventory', INVENTORY_PATH, '--journal', JOURNAL_PATH]
+        if scenario == 'bucket-fix-bulk':
+            argv.append('--bulk')
+        simple_bucket_fix.main(argv)
+        return 0
+
+    import recover_columns
+    argv = ['--workers', str(workers)]
+    if scenario == 'recovery-simplified':
+        argv.append('--skip-schema')
+    return recover_columns.main(argv)
+
+
+def peak_rss_mb(usage):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_child(scenario, stand_ins, workdir, workers):
+    """Run one scenario in a child process; returns its result row"""
+    stand_ins.stats.reset()
+    uploads_before = len(stand_ins.nhost.uploads)
+    env = {**os.environ, **stand_ins.environment()}
+    log_path = os.path.join(workdir, f'{scenario}.log')
+
+    started = time.monotonic()
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--child', scenario, '--workers', str(workers)],
+            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        # wait4 gives this child's own resource usage (peak RSS), unlike getrusage(RUSAGE_CHILDREN)
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.monotonic() - started
+
+    endpoints = stand_ins.stats.snapshot()
+    moved = sum(stats['bytes_in'] + stats['bytes_out'] for stats in endpoints.values())
+    unit = SCENARIOS[scenario]
+    if scenario.startswith('migrate') and scenario != 'migrate-delta':
+        items = len(stand_ins.nhost.uploads) - uploads_before
+    elif scenario == 'verify':
+        items = stand_ins.stats.snapshot().get('supabase-storage', {}).get('requests', 0)
+    elif unit == 'rows':
+        items = stand_ins.config.table_rows * len(RECOVERY_TABLES[scenario])
+    else:
+        # Files processed: for migrate-delta, the objects compared with the Nhost index
+        with open(os.path.join(workdir, INVENTORY_PATH)) as f:
+            items = json.load(f)['summary']['total_files']
+
+    return {
+        'scenario': scenario,
+        'exit_code': process.returncode,
+        'elapsed_seconds': round(elapsed, 3),
+        'items': items,
+        'unit': unit,
+        'items_per_sec': round(items / elapsed, 1) if elapsed else None,
+        'mb_per_sec': round(moved / elapsed / 1e6, 2) if elapsed else None,
+        'peak_rss_mb': round(peak_rss_mb(usage), 1),
+        'requests': sum(stats['requests'] for stats in endpoints.values()),
+        'endpoints': endpoints,
+        'log': log_path,
+    }
+
+
+def print_results(results):
+    print(f"{'scenario':<22}{'exit':>5}{'seconds':>10}{'items/s':>12}{'MB/s':>9}{'peak RSS':>11}{'requests':>10}")
+    for row in results:
+        print(f"{row['scenario']:<22}{row['exit_code']:>5}{row['elapsed_seconds']:>10.2f}"
+              f"{row['items_per_sec']:>8} {row['unit']:<4}{row['mb_per_sec']:>8}"
+              f"{row['peak_rss_mb']:>8} MB{row['requests']:>10}")
+        for endpoint, stats in sorted(row['endpoints'].items()):
+            errors = f", {stats['injected_errors']} injected 503s" if stats['injected_errors'] else ''
+            print(f"    {endpoint}: {stats['requests']} requests{errors}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the migration scripts against local Supabase/Nhost stand-ins")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument('--files', type=int, default=200, help="Objects in the synthetic inventory (default: 200)")
+    parser.add_argument('--table-rows', type=int, default=5000, help="Rows per Supabase table (default: 5000)")
+    parser.add_argument('--workers', type=int, default=4, help="--workers passed to the migrator (default: 4)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every stand-in response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra uniform random latency, seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument('--object-size', type=int, default=256 * 1024, help="Median object size in bytes")
+    parser.add_argument('--size-spread', type=float, default=0.0,
+                        help="Log-normal sigma of object sizes (0 = all objects --object-size)")
+    parser.add_argument('--max-object-size', type=int, default=64 * 1024 * 1024, help="Largest object size in bytes")
+    parser.add_argument('--json', metavar='PATH', help="Also write the results as JSON")
+    parser.add_argument('--keep-workdir', action='store_true', help="Keep the scratch directory and script logs")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        return run_scenario(args.child, args.workers)
+
+    inventory = build_inventory(args.files)
+    config = StandInConfig(args.latency, args.jitter, args.error_rate, args.object_size,
+                           args.size_spread, args.max_object_size, args.table_rows)
+    workdir = tempfile.mkdtemp(prefix='migration_bench_')
+    os.makedirs(os.path.join(workdir, os.path.dirname(INVENTORY_PATH)))
+    os.makedirs(os.path.join(workdir, 'nhost_uploads'))
+    with open(os.path.join(workdir, INVENTORY_PATH), 'w') as f:
+        json.dump(inventory, f)
+
+    print(f"🏁 Benchmark: {args.files} objects (median {args.object_size} bytes), {args.table_rows} rows/table, "
+          f"latency {args.latency * 1000:.0f} ms, error rate {args.error_rate:.0%}")
+    results = []
+    try:
+        with StandIns(config, supabase_objects(inventory), os.path.join(workdir, 'nhost_uploads')) as stand_ins:
+            for scenario in args.scenario or list(SCENARIOS):
+                print(f"▶ {scenario}...")
+                results.append(run_child(scenario, stand_ins, workdir, args.workers))
+    finally:
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print_results(results)
+    if args.keep_workdir:
+        print(f"\n📝 Logs kept in {workdir}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(row['exit_code'] == 0 for row in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Run metrics and profiling for the storage migration (standard library only)
+
+Each migrated file reports how long it spent in every stage (rate-limit
+waits, connect, time to first byte, body transfer, optional re-encode,
+upload response) and how many bytes it moved. MigrationMetrics aggregates
+those on the main thread into per-bucket latency histograms (p50/p95/p99)
+and running throughput/ETA, for the migration log and optionally a
+Prometheus text file.
+"""
+
+import cProfile
+import io
+import math
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+# Per-file stages, in pipeline order
+STAGES = (
+    'rate_limit_wait',
+    'download_connect',
+    'download_ttfb',
+    'download_transfer',
+    'transform',
+    'upload_connect',
+    'upload_transfer',
+    'upload_response',
+    'total',
+)
+PERCENTILES = (50, 95, 99)
+PROGRESS_INTERVAL = 10.0
+
+
+def new_job_metrics():
+    """Per-file accumulator filled in by the worker that transfers the file"""
+    return {'timings': {}, 'bytes_downloaded': 0, 'bytes_uploaded': 0}
+
+
+def add_timing(job_metrics, stage, seconds):
+    if job_metrics is not None and seconds:
+        timings = job_metrics['timings']
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def add_response_timings(job_metrics, direction, response):
+    """Copy a pooled response's connect/send/wait times into the download_* or upload_* stages"""
+    timings = getattr(response, 'timings', {})
+    add_timing(job_metrics, f'{direction}_connect', timings.get('connect'))
+    if direction == 'upload':
+        add_timing(job_metrics, 'upload_transfer', timings.get('send'))
+        add_timing(job_metrics, 'upload_response', timings.get('ttfb'))
+    else:
+        add_timing(job_metrics, 'download_ttfb', timings.get('send', 0.0) + timings.get('ttfb', 0.0))
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram: constant memory, percentiles within ~9%"""
+
+    BASE = 0.0001  # 0.1 ms
+    GROWTH = 2 ** 0.125
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        index = 0 if seconds <= self.BASE else int(math.log(seconds / self.BASE, self.GROWTH)) + 1
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (capped at the observed max)"""
+        if not self.count:
+            return None
+        rank = math.ceil(p / 100 * self.count)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.max, self.BASE * self.GROWTH ** index)
+        return self.max
+
+    def summary(self):
+        result = {'count': self.count, 'mean_ms': _ms(self.sum / self.count) if self.count else None}
+        for p in PERCENTILES:
+            result[f'p{p}_ms'] = _ms(self.percentile(p))
+        result['max_ms'] = _ms(self.max)
+        return result
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m {seconds % 60:02d}s"
+
+
+class MigrationMetrics:
+    """Aggregates per-file job metrics; only the main thread calls record()
+
+    total_files is None when jobs stream in from a live listing; there is
+    then no ETA.
+    """
+
+    def __init__(self, total_files):
+        self.total_files = total_files
+        self.started = time.monotonic()
+        self.last_progress = self.started
+        self.files = 0
+        self.failed = 0
+        self.bytes_downloaded = 0
+        self.bytes_uploaded = 0
+        self.stages = {}
+        self.buckets = {}
+
+    def record(self, bucket, job_metrics, success):
+        self.files += 1
+        if not success:
+            self.failed += 1
+        if job_metrics is None:
+            return
+        bucket_metrics = self.buckets.setdefault(bucket, {'bytes_downloaded': 0, 'bytes_uploaded': 0, 'stages': {}})
+        for key in ('bytes_downloaded', 'bytes_uploaded'):
+            bucket_metrics[key] += job_metrics[key]
+            setattr(self, key, getattr(self, key) + job_metrics[key])
+        for stage, seconds in job_metrics['timings'].items():
+            self.stages.setdefault(stage, LatencyHistogram()).record(seconds)
+            bucket_metrics['stages'].setdefault(stage, LatencyHistogram()).record(seconds)
+
+    def throughput(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        files_per_sec = self.files / elapsed
+        eta = None
+        if self.total_files is not None:
+            remaining = max(self.total_files - self.files, 0)
+            eta = round(remaining / files_per_sec) if files_per_sec and remaining else 0
+        return {
+            'elapsed_seconds': round(elapsed, 1),
+            'files_per_sec': round(files_per_sec, 2),
+            'download_mb_per_sec': round(self.bytes_downloaded / elapsed / 1e6, 2),
+            'upload_mb_per_sec': round(self.bytes_uploaded / elapsed / 1e6, 2),
+            'eta_seconds': eta,
+        }
+
+    def progress_line(self, force=False):
+        """A throughput/ETA line every PROGRESS_INTERVAL seconds, else None"""
+        now = time.monotonic()
+        if not force and now - self.last_progress < PROGRESS_INTERVAL:
+            return None
+        self.last_progress = now
+        rates = self.throughput()
+        if self.total_files is None:
+            return (f"📈 {self.files} files | {rates['files_per_sec']:.1f} files/s | "
+                    f"{rates['download_mb_per_sec']:.2f} MB/s down | {rates['upload_mb_per_sec']:.2f} MB/s up")
+        return (f"📈 {self.files}/{self.total_files} files | {rates['files_per_sec']:.1f} files/s | "
+                f"{rates['download_mb_per_sec']:.2f} MB/s down | {rates['upload_mb_per_sec']:.2f} MB/s up | "
+                f"ETA {format_duration(rates['eta_seconds'])}")
+
+    def to_dict(self):
+        return {
+            **self.throughput(),
+            'files_completed': self.files,
+            'files_failed': self.failed,
+            'bytes_downloaded': self.bytes_downloaded,
+            'bytes_uploaded': self.bytes_uploaded,
+            'stages': _stage_summaries(self.stages),
+            'buckets': {
+                bucket: {
+                    'bytes_downloaded': data['bytes_downloaded'],
+                    'bytes_uploaded': data['bytes_uploaded'],
+                    'stages': _stage_summaries(data['stages']),
+                }
+                for bucket, data in self.buckets.items()
+            },
+        }
+
+    def write_prometheus(self, path):
+        """Write the metrics in the Prometheus text exposition format (e.g. for node_exporter's textfile collector)"""
+        lines = [
+            '# HELP storage_migration_files_total Files processed by the migration, by outcome',
+            '# TYPE storage_migration_files_total counter',
+            f'storage_migration_files_total{{outcome="success"}} {self.files - self.failed}',
+            f'storage_migration_files_total{{outcome="failed"}} {self.failed}',
+            '# HELP storage_migration_bytes_total Bytes transferred, by bucket and direction',
+            '# TYPE storage_migration_bytes_total counter',
+        ]
+        for bucket, data in sorted(self.buckets.items()):
+            label = _label(bucket)
+            lines.append(f'storage_migration_bytes_total{{bucket="{label}",direction="download"}} {data["bytes_downloaded"]}')
+            lines.append(f'storage_migration_bytes_total{{bucket="{label}",direction="upload"}} {data["bytes_uploaded"]}')
+        lines += [
+            '# HELP storage_migration_stage_seconds Per-file time spent in each stage, by bucket',
+            '# TYPE storage_migration_stage_seconds summary',
+        ]
+        for bucket, data in sorted(self.buckets.items()):
+            for stage in _ordered(data['stages']):
+                histogram = data['stages'][stage]
+                labels = f'bucket="{_label(bucket)}",stage="{stage}"'
+                for p in PERCENTILES:
+                    lines.append(f'storage_migration_stage_seconds{{{labels},quantile="{p / 100}"}} '
+                                 f'{histogram.percentile(p):.6f}')
+                lines.append(f'storage_migration_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+                lines.append(f'storage_migration_stage_seconds_count{{{labels}}} {histogram.count}')
+        lines += [
+            '# HELP storage_migration_elapsed_seconds Wall-clock duration of the run',
+            '# TYPE storage_migration_elapsed_seconds gauge',
+            f'storage_migration_elapsed_seconds {time.monotonic() - self.started:.3f}',
+        ]
+        # Write then rename so a scraper never reads a half-written file
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+
+def _ordered(stages):
+    return sorted(stages, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES))
+
+
+def _stage_summaries(histograms):
+    return {stage: histograms[stage].summary() for stage in _ordered(histograms)}
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RunProfiler:
+    """cProfile + tracemalloc over a whole run, including the worker threads
+
+    cProfile only sees the thread that enabled it, so wrap() gives each
+    worker thread its own profiler and the reports merge them. On Python
+    3.12+ only one profiler may be active, but that one sees every thread,
+    so workers simply run unwrapped.
+    """
+
+    def __init__(self, traceback_depth=10):
+        self.main = cProfile.Profile()
+        self.traceback_depth = traceback_depth
+        self._profiles = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._peak = 0
+
+    def start(self):
+        tracemalloc.start(self.traceback_depth)
+        self.main.enable()
+
+    def wrap(self, fn):
+        def profiled(*args, **kwargs):
+            profile = getattr(self._local, 'profile', None)
+            if profile is None:
+                profile = self._local.profile = cProfile.Profile()
+                with self._lock:
+                    self._profiles.append(profile)
+            try:
+                profile.enable()
+            except ValueError:
+                return fn(*args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+        return profiled
+
+    def stop(self):
+        self.main.disable()
+        self._snapshot = tracemalloc.take_snapshot()
+        self._peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    def save(self, prefix, top=40):
+        """Write {prefix}.pstats, {prefix}.txt and {prefix}_tracemalloc.txt; returns the paths"""
+        stats = pstats.Stats(self.main)
+        for profile in self._profiles:
+            stats.add(profile)
+
+        stats_path = f'{prefix}.pstats'
+        stats.dump_stats(stats_path)
+
+        report_path = f'{prefix}.txt'
+        report = io.StringIO()
+        stats.stream = report
+        stats.sort_stats('cumulative').print_stats(top)
+        stats.sort_stats('tottime').print_stats(top)
+        with open(report_path, 'w') as f:
+            f.write(report.getvalue())
+
+        memory_path = f'{prefix}_tracemalloc.txt'
+        with open(memory_path, 'w') as f:
+            f.write(f"Peak traced memory: {self._peak / 1e6:.1f} MB\n\n")
+            f.write(f"Top {top} allocation sites still held at the end of the run:\n")
+            for stat in self._snapshot.statistics('lineno')[:top]:
+                f.write(f"{stat}\n")
+        return [stats_path, report_path, memory_path]
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Deterministic sharding of the storage migration (standard library only)
+
+Every object is assigned to shard blake2b(key) mod N, so any number of
+processes or machines can each run `--shard i/N` over the same inventory or
+listing and take a disjoint slice, with no coordination. Each shard keeps its
+own journal and log next to the normal ones (`*.shard-i-of-N.*`). The merge
+step folds the shard journals into the main journal and combines the shard
+logs into the single migration log. Deduplication (--dedup) needs one index
+over every object, so it only runs unsharded.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def parse_shard(value):
+    """'i/N' -> (i, N) with 0 <= i < N; raises ValueError otherwise"""
+    index, _, count = value.partition('/')
+    index, count = int(index), int(count)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"shard must be i/N with 0 <= i < N, got {value!r}")
+    return index, count
+
+
+def shard_of(key, count):
+    """Stable shard of an object key - identical on every host and run, unlike hash()"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big') % count
+
+
+def shard_path(path, shard):
+    """nhost/migrations/x.json -> nhost/migrations/x.shard-i-of-N.json"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard-{shard[0]}-of-{shard[1]}{ext}"
+
+
+def without_option(argv, option):
+    """argv with `option VALUE` / `option=VALUE` removed"""
+    result = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == option:
+            skip = True
+        elif not arg.startswith(option + '='):
+            result.append(arg)
+    return result
+
+
+def run_local_shards(script, argv, count, output_path):
+    """Run `script argv --shard k/count` for every k as child processes; returns their exit codes
+
+    Each child's output goes to output_path with the shard suffix.
+    """
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    children = []
+    for index in range(count):
+        shard = (index, count)
+        log_path = shard_path(output_path, shard)
+        log = open(log_path, 'w')
+        process = subprocess.Popen([sys.executable, script, *argv, '--shard', f'{index}/{count}'],
+                                   stdout=log, stderr=subprocess.STDOUT)
+        children.append((shard, process, log, log_path))
+        print(f"▶ Shard {index}/{count} started (pid {process.pid}, output: {log_path})")
+
+    exit_codes = []
+    for shard, process, log, log_path in children:
+        exit_codes.append(process.wait())
+        log.close()
+        if process.returncode == 0:
+            print(f"✓ Shard {shard[0]}/{shard[1]} finished")
+        else:
+            print(f"✗ Shard {shard[0]}/{shard[1]} failed (exit code {process.returncode}, see {log_path})")
+    return exit_codes
+
+
+def merge_journals(shard_journal_paths, journal_path):
+    """Append every shard journal's records to the main journal; returns the number of records"""
+    os.makedirs(os.path.dirname(journal_path) or '.', exist_ok=True)
+    copied = 0
+    with open(journal_path, 'a', encoding='utf-8') as out:
+        for path in shard_journal_paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    # Skip a torn final line of a killed shard, as MigrationJournal does
+                    if line.endswith('\n'):
+                        out.write(line)
+                        copied += 1
+        out.flush()
+        os.fsync(out.fileno())
+    return copied
+
+
+def _add_counts(total, counts):
+    for key, value in counts.items():
+        if isinstance(value, dict):
+            _add_counts(total.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)):
+            total[key] = total.get(key, 0) + value
+
+
+def merge_logs(shard_logs):
+    """Combine shard migration logs into one log shaped like an unsharded run's
+
+    Counts and per-bucket stats are summed and file lists concatenated. Each
+    shard's own throughput metrics and endpoint stats are kept under `shards`.
+    """
+    merged = {
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'total_files': 0,
+        'successful': 0,
+        'failed': 0,
+        'skipped': 0,
+        'buckets': {},
+        'failed_files': [],
+    }
+    for log in shard_logs:
+        for key in ('total_files', 'successful', 'failed', 'skipped'):
+            merged[key] += log[key]
+        _add_counts(merged['buckets'], log['buckets'])
+        merged['failed_files'].extend(log['failed_files'])
+        if 'delta' in log:
+            _add_counts(merged.setdefault('delta', {}), log['delta'])
+            merged.setdefault('replaced_files', []).extend(log['replaced_files'])
+        if 'webp' in log:
+            webp = merged.setdefault('webp', {'reencoded': 0, 'bytes_before': 0, 'bytes_after': 0, 'renamed_files': []})
+            for key in ('reencoded', 'bytes_before', 'bytes_after'):
+                webp[key] += log['webp'][key]
+            webp['renamed_files'].extend(log['webp']['renamed_files'])
+    merged['shards'] = [
+        {'shard': log['shard'], 'metrics': log.get('metrics'), 'endpoints': log.get('endpoints')}
+        for log in shard_logs
+    ]
+    return merged
+
+
+def load_shard_logs(log_path, count):
+    """Read the logs of shards 0..count-1; raises FileNotFoundError naming any missing shard"""
+    missing = [shard_path(log_path, (i, count)) for i in range(count)
+               if not os.path.exists(shard_path(log_path, (i, count)))]
+    if missing:
+        raise FileNotFoundError(f"Missing shard logs: {', '.join(missing)}")
+    logs = []
+    for index in range(count):
+        with open(shard_path(log_path, (index, count))) as f:
+            logs.append(json.load(f))
+    return logs
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Nhost projects a fan-out migration uploads to (standard library only)
+
+A targets file lists every project the same Supabase buckets are pushed to:
+
+    {
+      "targets": [
+        {"name": "dev", "subdomain": "abcd", "admin_secret_env": "NHOST_DEV_ADMIN_SECRET"},
+        {"name": "prod", "subdomain": "wxyz", "region": "eu-central-1",
+         "admin_secret_env": "NHOST_PROD_ADMIN_SECRET", "rps": 5, "concurrency": 4}
+      ]
+    }
+
+`storage_url` / `hasura_url` replace the hosted endpoints (e.g. to use the
+local stand-ins), `admin_secret` may be given inline instead of through an
+environment variable, and `rps` / `bps` / `concurrency` override the
+migrator's --nhost-rps / --nhost-bps / --workers for that target. Each target
+keeps its own journal, log and URL rewrite SQL next to the normal ones
+(`*.<name>.*`), so a target that failed can be resumed on its own.
+"""
+
+import json
+import os
+import re
+import threading
+
+from migration_journal import MigrationJournal
+from rate_limit import EndpointLimiter
+
+DEFAULT_REGION = 'ap-south-1'
+TARGET_NAME = re.compile(r'[A-Za-z0-9_-]+')
+
+
+def target_path(path, name):
+    """nhost/migrations/x.json -> nhost/migrations/x.<name>.json"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{name}{ext}"
+
+
+def load_targets(path):
+    """Read and validate a targets file; raises ValueError if it is malformed"""
+    with open(path) as f:
+        data = json.load(f)
+    targets = data.get('targets') if isinstance(data, dict) else data
+    if not targets:
+        raise ValueError("Targets file lists no targets")
+    seen = set()
+    for target in targets:
+        name = target.get('name') or ''
+        if not TARGET_NAME.fullmatch(name):
+            raise ValueError(f"Target name must be letters, digits, '-' or '_': {name!r}")
+        if name in seen:
+            raise ValueError(f"Target {name} is listed twice")
+        seen.add(name)
+        if not target.get('subdomain') and not (target.get('storage_url') and target.get('hasura_url')):
+            raise ValueError(f"Target {name} needs a subdomain, or both storage_url and hasura_url")
+        if 'admin_secret_env' in target and target['admin_secret_env'] not in os.environ:
+            raise ValueError(f"Target {name}: environment variable {target['admin_secret_env']} is not set")
+        for option in ('rps', 'bps', 'concurrency'):
+            if option in target and not (isinstance(target[option], (int, float)) and target[option] >= 0):
+                raise ValueError(f"Target {name}: {option} must be a non-negative number")
+        if target.get('concurrency') == 0:
+            raise ValueError(f"Target {name}: concurrency must be at least 1")
+    return targets
+
+
+class NhostTarget:
+    """One Nhost project: endpoints, credentials, limits and per-target outputs"""
+
+    def __init__(self, spec, rps=0, bps=0, concurrency=1):
+        self.name = spec['name']
+        self.subdomain = spec.get('subdomain')
+        region = spec.get('region', DEFAULT_REGION)
+        self.storage_url = spec.get('storage_url') or f"https://{self.subdomain}.storage.{region}.nhost.run"
+        self.hasura_url = spec.get('hasura_url') or f"https://{self.subdomain}.hasura.{region}.nhost.run"
+        self.admin_secret = spec.get('admin_secret') or os.environ.get(spec.get('admin_secret_env', ''), '')
+        self.limiter = EndpointLimiter(spec.get('rps', rps), spec.get('bps', bps))
+        self.concurrency = int(spec.get('concurrency', concurrency))
+        # Uploads in flight to this target, whatever the number of download workers
+        self.slots = threading.BoundedSemaphore(self.concurrency)
+        # Retries and adaptive concurrency are tracked per target
+        self.endpoint = f"nhost-storage:{self.name}"
+        self.journal = None
+        self.stats = {'successful': 0, 'failed': 0, 'skipped': 0}
+        self.failed_files = []
+
+    @property
+    def upload_url(self):
+        return f"{self.storage_url}/v1/files"
+
+    def paths(self, journal_path, log_path, sql_path):
+        """(journal, log, URL rewrite SQL) paths of this target"""
+        return tuple(target_path(path, self.name) for path in (journal_path, log_path, sql_path))
+
+    def open_journal(self, journal_path, resume):
+        self.journal = MigrationJournal(target_path(journal_path, self.name), load=resume)
+        return self.journal
+
+
+class FanOutJournals:
+    """The journal view iter_pending_jobs needs: an object is done once every target has it"""
+
+    def __init__(self, targets):
+        self.targets = targets
+
+    def is_uploaded(self, key):
+        return all(target.journal.is_uploaded(key) for target in self.targets)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk cache of downloaded Supabase objects (standard library only)
+
+Entries are keyed by the full object key ("bucket/path/to/file") and remember
+the ETag and Last-Modified the object was downloaded with. A later migration
+sends them back as If-None-Match / If-Modified-Since, and a 304 Not Modified
+answer means the object is taken from local disk instead of downloaded again.
+Objects without either validator cannot be revalidated and are not cached.
+
+The index is an SQLite database in the cache directory, so several processes
+(e.g. --processes shards) can share one cache. The cache is kept under a byte
+budget by evicting the least recently used objects. Files are hard-linked into
+and out of the cache where the filesystem allows it, and copied otherwise.
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+INDEX_NAME = 'index.sqlite3'
+
+
+def parse_byte_size(value):
+    """'500M', '10G', '2048' -> bytes (K/M/G/T are powers of 1024)"""
+    text = str(value).strip().upper().removesuffix('B')
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    multiplier = units.get(text[-1:], 1)
+    number = text[:-1] if text[-1:] in units else text
+    try:
+        size = int(float(number) * multiplier)
+    except ValueError:
+        raise ValueError(f"Not a byte size: {value!r}") from None
+    if size < 0:
+        raise ValueError(f"Not a byte size: {value!r}")
+    return size
+
+
+def _link_or_copy(source, target):
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class ObjectCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """Open (or create) the cache in `directory`, keeping at most max_bytes of objects"""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0, 'bytes_from_cache': 0}
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, INDEX_NAME), timeout=60, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS objects (
+                key TEXT PRIMARY KEY,
+                file TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS objects_by_last_used ON objects (last_used);
+        """)
+        # A smaller budget than the cache was filled under applies right away
+        self.evict()
+
+    def _file_for(self, key):
+        name = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join('objects', name[:2], name)
+
+    def lookup(self, key):
+        """The entry for key as a dict, or None; entries whose file has gone missing are dropped"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT file, etag, last_modified, size, sha256 FROM objects WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            entry = dict(zip(('file', 'etag', 'last_modified', 'size', 'sha256'), row), key=key)
+            path = os.path.join(self.directory, entry['file'])
+            if not os.path.exists(path) or os.path.getsize(path) != entry['size']:
+                self._db.execute("DELETE FROM objects WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            return entry
+
+    @staticmethod
+    def validators(entry):
+        """Conditional request headers that revalidate a cached entry"""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def restore(self, entry, local_path):
+        """Put a revalidated entry's content at local_path and mark it as recently used"""
+        os.makedirs(os.path.dirname(local_path) or '.', exist_ok=True)
+        _link_or_copy(os.path.join(self.directory, entry['file']), local_path)
+        with self._lock:
+            self._db.execute("UPDATE objects SET last_used = ? WHERE key = ?", (time.time(), entry['key']))
+            self._db.commit()
+            self.stats['hits'] += 1
+            self.stats['bytes_from_cache'] += entry['size']
+
+    def store(self, key, local_path, sha256, etag=None, last_modified=None):
+        """Cache a freshly downloaded object; returns False if it cannot be revalidated or is over budget"""
+        with self._lock:
+            self.stats['misses'] += 1
+        size = os.path.getsize(local_path)
+        if not (etag or last_modified) or size > self.max_bytes:
+            return False
+        relative = self._file_for(key)
+        path = os.path.join(self.directory, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        _link_or_copy(local_path, temp_path)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO objects (key, file, etag, last_modified, size, sha256, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET etag = excluded.etag, "
+                "last_modified = excluded.last_modified, size = excluded.size, sha256 = excluded.sha256, "
+                "last_used = excluded.last_used",
+                (key, relative, etag, last_modified, size, sha256, time.time()))
+            self._db.commit()
+            self.stats['stored'] += 1
+        self.evict()
+        return True
+
+    def total_bytes(self):
+        with self._lock:
+            return self._db.execute("SELECT coalesce(sum(size), 0) FROM objects").fetchone()[0]
+
+    def evict(self, max_bytes=None):
+        """Drop least recently used objects until the cache fits max_bytes; returns the number dropped"""
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        dropped = 0
+        with self._lock:
+            excess = self._db.execute("SELECT coalesce(sum(size), 0) FROM objects").fetchone()[0] - budget
+            if excess <= 0:
+                return 0
+            victims = []
+            for key, relative, size in self._db.execute(
+                    "SELECT key, file, size FROM objects ORDER BY last_used, key"):
+                if excess <= 0:
+                    break
+                victims.append((key, relative))
+                excess -= size
+            for key, relative in victims:
+                self._db.execute("DELETE FROM objects WHERE key = ?", (key,))
+                try:
+                    os.remove(os.path.join(self.directory, relative))
+                except FileNotFoundError:
+                    pass
+                dropped += 1
+            self._db.commit()
+            self.stats['evicted'] += dropped
+        return dropped
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM objects").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
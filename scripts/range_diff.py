@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Row-level diff of table columns between Supabase and Nhost via range hashes (standard library only)
+
+Both sides summarise a key range as (row count, hash), where the hash is
+the sum of a 64-bit md5 prefix of every row's canonical text
+(`key<TAB>value<TAB>...`, NULL as `\\N`). The sum does not depend on row
+order and needs constant memory, so the whole table is one cheap aggregate.
+Ranges whose summaries differ are split at key quantiles taken from Nhost,
+and the children of all differing ranges are hashed together in one query
+per side and level. Rows are only fetched for ranges small enough to compare
+one by one, so an exact diff of a large table costs a few dozen queries.
+
+Nhost is queried through Hasura run_sql. Supabase either runs the same
+aggregate in the RANGE_HASH_FUNCTION_SQL function over PostgREST RPC, or,
+without it, its rows are paged over REST and hashed locally. Hashing rows
+locally is not one pass: the first level reads the whole table, every later
+level pages every differing range again, and leaf rows are fetched once
+more to compare them, so the cost grows with the depth times the rows in
+differing ranges. Install the function for large tables. Local hashing is
+exact for text and enum columns, whose JSON value is their text form.
+
+Ranges are compared as key text in byte order (COLLATE "C") on Nhost and in
+the function, but PostgREST's gte/lt filters on Supabase use the column's
+own type and collation. The two orders only agree for lowercase UUID text
+keys, so rows fetched over REST must have such keys; any other key is
+refused instead of producing a wrong diff.
+"""
+
+import hashlib
+import json
+import re
+import urllib.request
+
+import http_pool
+import request_executor
+from sql_batch import sql_identifier, sql_literal
+from supabase_rest import iter_table_pages
+
+DEFAULT_FANOUT = 16
+DEFAULT_LEAF_ROWS = 256
+RANGE_HASH_FUNCTION = 'recovery_range_hashes'
+# REST range filters sort like COLLATE "C" only for these keys (see the module docstring)
+UUID_KEY = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+
+# Install on the Supabase database to hash ranges there; callable with the service role key only
+RANGE_HASH_FUNCTION_SQL = r"""
+CREATE OR REPLACE FUNCTION public.recovery_range_hashes(
+    table_name text, key_column text, value_columns text[], lows text[], highs text[])
+RETURNS TABLE (bucket bigint, row_count bigint, hash text)
+LANGUAGE plpgsql STABLE
+AS $$
+DECLARE
+    row_text text := format('t.%I::text', key_column);
+    value_column text;
+BEGIN
+    FOREACH value_column IN ARRAY value_columns LOOP
+        row_text := row_text || format(' || E''\t'' || coalesce(t.%I::text, E''\\N'')', value_column);
+    END LOOP;
+    RETURN QUERY EXECUTE format(
+        'SELECT r.i, count(t.%1$I), coalesce(sum((''x'' || left(md5(%2$s), 16))::bit(64)::bigint), 0)::text '
+        'FROM unnest($1, $2) WITH ORDINALITY AS r(lo, hi, i) '
+        'LEFT JOIN %3$I AS t ON (r.lo IS NULL OR t.%1$I::text COLLATE "C" >= r.lo) '
+        'AND (r.hi IS NULL OR t.%1$I::text COLLATE "C" < r.hi) '
+        'GROUP BY r.i ORDER BY r.i',
+        key_column, row_text, table_name)
+    USING lows, highs;
+END $$;
+REVOKE EXECUTE ON FUNCTION public.recovery_range_hashes(text, text, text[], text[], text[]) FROM PUBLIC, anon, authenticated;
+""".strip()
+
+
+def value_text(value):
+    """Text form of a JSON value as PostgreSQL's ::text renders it (None stays None)"""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(', ', ': '))
+    return str(value)
+
+
+def row_hash(key, values):
+    """Signed 64-bit md5 prefix of the canonical row text, as the SQL aggregate computes it"""
+    text = '\t'.join([str(key)] + ['\\N' if value is None else value for value in values])
+    return int.from_bytes(hashlib.md5(text.encode()).digest()[:8], 'big', signed=True)
+
+
+def _ranges_values(ranges):
+    return ',\n    '.join(f"({i}, {sql_literal(lo)}::text, {sql_literal(hi)}::text)"
+                          for i, (lo, hi) in enumerate(ranges, 1))
+
+
+def _range_join(table, key_column):
+    k = f"t.{sql_identifier(key_column)}::text COLLATE \"C\""
+    return (f"{sql_identifier(table)} AS t ON (r.lo IS NULL OR {k} >= r.lo) "
+            f"AND (r.hi IS NULL OR {k} < r.hi)")
+
+
+def range_hash_sql(table, key_column, columns, ranges):
+    """(bucket, row count, hash) for each [lo, hi) range - the same aggregate as the Supabase function"""
+    row_text = f"t.{sql_identifier(key_column)}::text" + ''.join(
+        f" || E'\\t' || coalesce(t.{sql_identifier(column)}::text, E'\\\\N')" for column in columns)
+    return (
+        f"SELECT r.i, count(t.{sql_identifier(key_column)}), "
+        f"coalesce(sum(('x' || left(md5({row_text}), 16))::bit(64)::bigint), 0)::text\n"
+        f"FROM (VALUES\n    {_ranges_values(ranges)}\n) AS r(i, lo, hi)\n"
+        f"LEFT JOIN {_range_join(table, key_column)}\n"
+        "GROUP BY r.i ORDER BY r.i;"
+    )
+
+
+def split_points_sql(table, key_column, ranges, fanout):
+    """Keys that cut each range into `fanout` parts of about equal row counts"""
+    k = f"t.{sql_identifier(key_column)}::text"
+    return (
+        "SELECT i, key FROM (\n"
+        f"  SELECT r.i, {k} AS key,\n"
+        f"         row_number() OVER (PARTITION BY r.i ORDER BY {k} COLLATE \"C\") AS n,\n"
+        "         count(*) OVER (PARTITION BY r.i) AS total\n"
+        f"  FROM (VALUES\n    {_ranges_values(ranges)}\n  ) AS r(i, lo, hi)\n"
+        f"  JOIN {_range_join(table, key_column)}\n"
+        ") AS s\n"
+        f"WHERE n > 1 AND (n - 1) % greatest(1, ceil(total::numeric / {int(fanout)})::int) = 0\n"
+        "ORDER BY i, key COLLATE \"C\";"
+    )
+
+
+def range_rows_sql(table, key_column, columns, lo, hi):
+    """Rows of one range; NULL comes back as \\N, which run_sql would otherwise render as the text NULL"""
+    selected = ', '.join([f"t.{sql_identifier(key_column)}::text"] +
+                         [f"coalesce(t.{sql_identifier(c)}::text, E'\\\\N')" for c in columns])
+    return (f"SELECT {selected}\nFROM (VALUES (1, {sql_literal(lo)}::text, {sql_literal(hi)}::text)) AS r(i, lo, hi)\n"
+            f"JOIN {_range_join(table, key_column)};")
+
+
+class NhostSide:
+    """Range hashes, split points and rows from Nhost through run_sql"""
+
+    def __init__(self, run_sql):
+        self.run_sql = run_sql
+        self.queries = 0
+
+    def _rows(self, sql):
+        self.queries += 1
+        result = self.run_sql(sql)
+        if 'error' in result or result.get('result_type') != 'TuplesOk':
+            raise RuntimeError(f"Nhost query failed: {result.get('error', result)}")
+        return result['result'][1:]
+
+    def hashes(self, table, key_column, columns, ranges):
+        summaries = {int(i): (int(count), total) for i, count, total in
+                     self._rows(range_hash_sql(table, key_column, columns, ranges))}
+        return [summaries.get(i, (0, '0')) for i in range(1, len(ranges) + 1)]
+
+    def split_points(self, table, key_column, ranges, fanout):
+        points = [[] for _ in ranges]
+        for i, key in self._rows(split_points_sql(table, key_column, ranges, fanout)):
+            points[int(i) - 1].append(key)
+        return points
+
+    def rows(self, table, key_column, columns, lo, hi):
+        return {row[0]: tuple(None if value == '\\N' else value for value in row[1:])
+                for row in self._rows(range_rows_sql(table, key_column, columns, lo, hi))}
+
+
+class SupabaseSide:
+    """Range hashes and rows from Supabase: the hash function over RPC, or rows paged over REST"""
+
+    def __init__(self, supabase_url, api_key, rpc=None, page_size=1000):
+        self.supabase_url = supabase_url
+        self.api_key = api_key
+        self.rpc = rpc
+        self.page_size = page_size
+        self.queries = 0
+
+    def _call_rpc(self, payload):
+        req = urllib.request.Request(f"{self.supabase_url}/rest/v1/rpc/{self.rpc}",
+                                     data=json.dumps(payload).encode(), method='POST')
+        req.add_header('apikey', self.api_key)
+        req.add_header('Authorization', f'Bearer {self.api_key}')
+        req.add_header('Content-Type', 'application/json')
+
+        def send():
+            with http_pool.urlopen(req, timeout=120) as response:
+                return json.loads(response.read())
+
+        self.queries += 1
+        return request_executor.run('supabase-rest', send)
+
+    def hashes(self, table, key_column, columns, ranges):
+        if not self.rpc:
+            summaries = []
+            for lo, hi in ranges:
+                rows = self.rows(table, key_column, columns, lo, hi)
+                summaries.append((len(rows), str(sum(row_hash(key, values) for key, values in rows.items()))))
+            return summaries
+        result = self._call_rpc({
+            'table_name': table, 'key_column': key_column, 'value_columns': list(columns),
+            'lows': [lo for lo, _ in ranges], 'highs': [hi for _, hi in ranges],
+        })
+        summaries = {int(row['bucket']): (int(row['row_count']), str(row['hash'])) for row in result}
+        return [summaries.get(i, (0, '0')) for i in range(1, len(ranges) + 1)]
+
+    def rows(self, table, key_column, columns, lo, hi):
+        rows = {}
+        select_fields = ','.join([key_column] + list(columns))
+        # PostgREST's gte/lt filters select the same rows as Nhost's COLLATE "C" bounds for UUID keys only
+        for page in iter_table_pages(self.supabase_url, self.api_key, table, select_fields, key_column,
+                                     self.page_size, start=lo, before=hi):
+            self.queries += 1
+            for row in page:
+                key = str(row[key_column])
+                if not UUID_KEY.fullmatch(key):
+                    raise ValueError(f"{table}.{key_column} = {key!r} is not a lowercase UUID; "
+                                     "range bounds over REST would not match Nhost's byte order")
+                rows[key] = tuple(value_text(row.get(column)) for column in columns)
+        return rows
+
+
+def diff_rows(source_rows, target_rows, columns):
+    """Compare {key: values} of Supabase (source) and Nhost (target)"""
+    mismatched, missing, extra = [], [], []
+    for key, values in source_rows.items():
+        target = target_rows.get(key)
+        if target is None:
+            missing.append(key)
+        elif target != values:
+            mismatched.append({'key': key, 'columns': {
+                column: {'supabase': a, 'nhost': b} for column, a, b in zip(columns, values, target) if a != b}})
+    extra = [key for key in target_rows if key not in source_rows]
+    return mismatched, missing, extra
+
+
+def diff_table(nhost, supabase, table, key_column, columns, fanout=DEFAULT_FANOUT, leaf_rows=DEFAULT_LEAF_ROWS):
+    """Find every row whose columns differ between Supabase and Nhost
+
+    Returns {'rows', 'ranges_compared', 'rows_fetched', 'mismatched', 'missing_in_nhost', 'extra_in_nhost'}.
+    """
+    columns = list(columns)
+    result = {'rows': None, 'ranges_compared': 0, 'rows_fetched': 0,
+              'mismatched': [], 'missing_in_nhost': [], 'extra_in_nhost': []}
+    pending = [(None, None)]
+    while pending:
+        target_hashes = nhost.hashes(table, key_column, columns, pending)
+        source_hashes = supabase.hashes(table, key_column, columns, pending)
+        result['ranges_compared'] += len(pending)
+        if result['rows'] is None:
+            result['rows'] = source_hashes[0][0]
+
+        parents = []
+        for (lo, hi), target, source in zip(pending, target_hashes, source_hashes):
+            if target == source:
+                continue
+            if target[0] <= leaf_rows:
+                # Small enough on the Nhost side: compare row by row
+                source_rows = supabase.rows(table, key_column, columns, lo, hi)
+                target_rows = nhost.rows(table, key_column, columns, lo, hi)
+                result['rows_fetched'] += len(source_rows) + len(target_rows)
+                mismatched, missing, extra = diff_rows(source_rows, target_rows, columns)
+                result['mismatched'].extend(mismatched)
+                result['missing_in_nhost'].extend(missing)
+                result['extra_in_nhost'].extend(extra)
+            else:
+                parents.append((lo, hi))
+
+        pending = []
+        if parents:
+            for (lo, hi), points in zip(parents, nhost.split_points(table, key_column, parents, fanout)):
+                bounds = [lo] + points + [hi]
+                pending.extend(zip(bounds[:-1], bounds[1:]))
+    return result
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Ranged, segmented and resumable transfer of large objects (standard library only)
+
+download_object() asks for the first segment with an HTTP Range request. An
+object that fits in one segment arrives in that single response, so small
+files still cost one request. For a larger object, that response reports the
+total size. The other segments are then fetched in parallel into a
+preallocated file with positioned writes. Every segment records its progress
+in a `<file>.segments.json` sidecar. After a dropped connection, a segment
+re-requests only its missing bytes, and a later run carries on from the
+sidecar. Each segment request sends `If-Range` with the object's ETag, so an
+object that changed in the meantime is downloaded again from the start.
+The first request can carry conditional headers (If-None-Match), so an
+unchanged object the caller already has costs one 304 response.
+
+Large uploads are streamed from disk in fixed-size chunks. Each chunk is a
+separate socket send, so the timeout bounds one chunk instead of the whole
+object.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import http_pool
+import request_executor
+from content_index import file_hexdigest, new_hasher
+from migration_metrics import add_response_timings, add_timing, new_job_metrics
+from rate_limit import UNLIMITED
+
+DEFAULT_SEGMENT_SIZE = 8 * 1024 * 1024
+DEFAULT_SEGMENT_WORKERS = 4
+DEFAULT_CHUNK_TIMEOUT = 30
+READ_CHUNK_SIZE = 64 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Attempts per segment when the body breaks off; each resumes at the first missing byte
+SEGMENT_ATTEMPTS = 4
+STATE_SUFFIX = '.segments.json'
+# Rewrite a segment's sidecar entry after this many new bytes
+STATE_SAVE_BYTES = 4 * 1024 * 1024
+
+segment_size = DEFAULT_SEGMENT_SIZE
+segment_workers = DEFAULT_SEGMENT_WORKERS
+chunk_timeout = DEFAULT_CHUNK_TIMEOUT
+
+
+def configure(size=None, workers=None, timeout=None):
+    """Objects above `size` bytes use parallel segments (downloads) and chunked bodies (uploads)"""
+    global segment_size, segment_workers, chunk_timeout
+    segment_size = size or segment_size
+    segment_workers = workers or segment_workers
+    chunk_timeout = timeout or chunk_timeout
+
+
+class ObjectChanged(Exception):
+    """The server ignored If-Range because the object's ETag no longer matches"""
+
+
+def parse_content_range(value):
+    """'bytes 0-99/1234' -> (0, 99, 1234); the total is None when the server reports '*'"""
+    unit, _, spec = (value or '').partition(' ')
+    span, _, total = spec.partition('/')
+    start, _, end = span.partition('-')
+    if unit != 'bytes' or not start.isdigit() or not end.isdigit():
+        raise ValueError(f"Unexpected Content-Range: {value!r}")
+    return int(start), int(end), int(total) if total.isdigit() else None
+
+
+def segment_ranges(total, size):
+    """Inclusive (start, end) byte ranges covering `total` bytes in `size` pieces"""
+    return [(start, min(start + size, total) - 1) for start in range(0, total, size)]
+
+
+def open_range(make_request, start, end, limiter=UNLIMITED, metrics=None, if_range=None, headers=None):
+    """GET bytes start..end (end None = to the end of the object) through the shared executor"""
+    def fetch():
+        add_timing(metrics, 'rate_limit_wait', limiter.before_request())
+        req = make_request()
+        req.add_header('Range', f"bytes={start}-{'' if end is None else end}")
+        if if_range:
+            req.add_header('If-Range', if_range)
+        for name, value in (headers or {}).items():
+            req.add_header(name, value)
+        return http_pool.urlopen(req, timeout=chunk_timeout)
+
+    return request_executor.run('supabase-storage', fetch)
+
+
+class SegmentState:
+    """Bytes written per segment, persisted to the sidecar file"""
+
+    def __init__(self, path, total, etag, size, done):
+        self.path = path
+        self.total = total
+        self.size = size
+        self.etag = etag
+        self.done = done
+        self._saved = dict(done)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            done = {int(start): count for start, count in data['done'].items()}
+            return cls(path, data['total'], data['etag'], data['segment_size'], done)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def advance(self, start, count):
+        """Count `count` more bytes of the segment at `start`; saves now and then (worker threads)"""
+        self.done[start] += count
+        if self.done[start] - self._saved.get(start, 0) >= STATE_SAVE_BYTES:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            snapshot = dict(self.done)
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump({'total': self.total, 'etag': self.etag, 'segment_size': self.size, 'done': snapshot}, f)
+            os.replace(temp_path, self.path)
+            self._saved = snapshot
+
+
+def _write_body(response, fd, offset, limit, limiter, metrics, state=None, segment=None):
+    """Copy up to `limit` bytes of a response body to fd at offset; returns the bytes written"""
+    written = 0
+    while written < limit:
+        chunk = response.read(min(READ_CHUNK_SIZE, limit - written))
+        if not chunk:
+            break
+        os.pwrite(fd, chunk, offset + written)
+        written += len(chunk)
+        add_timing(metrics, 'rate_limit_wait', limiter.consume_bytes(len(chunk)))
+        metrics['bytes_downloaded'] += len(chunk)
+        if state is not None:
+            state.advance(segment, len(chunk))
+    return written
+
+
+def _fetch_segment(make_request, fd, state, start, end, limiter):
+    """Fill one segment, resuming at its first missing byte after a broken body; returns its metrics"""
+    metrics = new_job_metrics()
+    attempts = 0
+    while start + state.done[start] <= end:
+        offset = start + state.done[start]
+        try:
+            with open_range(make_request, offset, end, limiter, metrics, if_range=state.etag) as response:
+                add_response_timings(metrics, 'download', response)
+                if response.status != 206:
+                    raise ObjectChanged(f"object changed (HTTP {response.status} to a ranged request)")
+                _write_body(response, fd, offset, end + 1 - offset, limiter, metrics, state, start)
+        except ObjectChanged:
+            raise
+        except Exception:
+            attempts += 1
+            if attempts >= SEGMENT_ATTEMPTS:
+                raise
+    return metrics
+
+
+def _download_segments(make_request, fd, state, limiter, metrics):
+    pending = [(start, end) for start, end in segment_ranges(state.total, state.size)
+               if start + state.done.get(start, 0) <= end]
+    for start, _ in pending:
+        state.done.setdefault(start, 0)
+    try:
+        with ThreadPoolExecutor(max_workers=segment_workers) as executor:
+            futures = [executor.submit(_fetch_segment, make_request, fd, state, start, end, limiter)
+                       for start, end in pending]
+            for future in futures:
+                segment_metrics = future.result()
+                for stage, seconds in segment_metrics['timings'].items():
+                    add_timing(metrics, stage, seconds)
+                metrics['bytes_downloaded'] += segment_metrics['bytes_downloaded']
+    finally:
+        state.save()
+
+
+def download_object(make_request, local_path, limiter=UNLIMITED, metrics=None, conditional=None, info=None):
+    """Download an object to local_path with Range requests, resuming a previous partial download
+
+    make_request() returns a new urllib Request for the object. `conditional`
+    headers (If-None-Match / If-Modified-Since) go on the first request.
+    `info`, if given, receives the object's 'etag' and 'last_modified', and
+    'not_modified' is set when the server answered 304; nothing is written then.
+    Returns (True, SHA-256 hex digest of the content, None after a 304) or (False, error).
+    """
+    metrics = metrics if metrics is not None else new_job_metrics()
+    info = info if info is not None else {}
+    state_path = local_path + STATE_SUFFIX
+    try:
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        state = SegmentState.load(state_path)
+        if state and os.path.exists(local_path) and os.path.getsize(local_path) == state.total:
+            started = time.monotonic()
+            try:
+                with _open_for_writes(local_path, truncate=False) as fd:
+                    _download_segments(make_request, fd, state, limiter, metrics)
+                add_timing(metrics, 'download_transfer', time.monotonic() - started)
+                info.update(etag=state.etag, last_modified=None)
+                return True, file_sha256(local_path, state_path)
+            except ObjectChanged:
+                os.remove(state_path)
+
+        response = open_range(make_request, 0, segment_size - 1, limiter, metrics, headers=conditional)
+        info.update(etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'))
+        if response.status == 304:
+            with response:
+                response.read()
+                add_response_timings(metrics, 'download', response)
+            info['not_modified'] = True
+            return True, None
+        with response, _open_for_writes(local_path) as fd:
+            add_response_timings(metrics, 'download', response)
+            started = time.monotonic()
+            if response.status == 206:
+                _, last, total = parse_content_range(response.headers.get('Content-Range'))
+            else:
+                # No range support: the whole object is in this response
+                last = total = None
+            if total is None or last + 1 >= total:
+                # Single-request path: hash while writing, nothing to resume
+                hasher = new_hasher()
+                offset = 0
+                while True:
+                    chunk = response.read(READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+                    add_timing(metrics, 'rate_limit_wait', limiter.consume_bytes(len(chunk)))
+                    metrics['bytes_downloaded'] += len(chunk)
+                add_timing(metrics, 'download_transfer', time.monotonic() - started)
+                return True, hasher.hexdigest()
+
+            os.ftruncate(fd, total)
+            state = SegmentState(state_path, total, response.headers.get('ETag'), last + 1, {0: 0})
+            state.save()
+            try:
+                _write_body(response, fd, 0, last + 1, limiter, metrics, state, 0)
+            except Exception:
+                pass  # the segment is resumed with the others below
+        with _open_for_writes(local_path, truncate=False) as fd:
+            _download_segments(make_request, fd, state, limiter, metrics)
+        add_timing(metrics, 'download_transfer', time.monotonic() - started)
+        return True, file_sha256(local_path, state_path)
+    except Exception as e:
+        return False, str(e)
+
+
+@contextlib.contextmanager
+def _open_for_writes(path, truncate=True):
+    """A raw file descriptor for positioned writes from several threads"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | (os.O_TRUNC if truncate else 0), 0o644)
+    try:
+        yield fd
+    finally:
+        os.close(fd)
+
+
+def file_sha256(local_path, state_path=None):
+    """Hash a completed segmented download and drop its sidecar"""
+    digest = file_hexdigest(local_path)
+    if state_path and os.path.exists(state_path):
+        os.remove(state_path)
+    return digest
+
+
+def iter_file_body(head, local_path, tail, limiter=UNLIMITED, metrics=None, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Yield an upload body as head, fixed-size chunks of the file, then tail"""
+    yield head
+    with open(local_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            add_timing(metrics, 'rate_limit_wait', limiter.consume_bytes(len(chunk)))
+            if metrics is not None:
+                metrics['bytes_uploaded'] += len(chunk)
+            yield chunk
+    yield tail
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Token-bucket rate limiting for the storage migration scripts (standard library only)
+One EndpointLimiter per remote endpoint, shared by every worker thread
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens/sec up to `capacity`
+
+    Acquiring more tokens than are available reserves them (the balance goes
+    negative) and sleeps until the debt is repaid, so a single large request -
+    e.g. a file bigger than the byte burst - is delayed rather than rejected.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(self.rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.updated = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    def acquire(self, tokens=1):
+        """Consume `tokens`, blocking until the bucket can pay for them"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class EndpointLimiter:
+    """Requests/sec and bytes/sec budget for one endpoint (0 disables a limit)"""
+
+    def __init__(self, requests_per_sec=0, bytes_per_sec=0):
+        self.requests = TokenBucket(requests_per_sec) if requests_per_sec else None
+        self.bytes = TokenBucket(bytes_per_sec) if bytes_per_sec else None
+
+    def before_request(self):
+        """Wait for a request slot; returns the time spent waiting"""
+        return self.requests.acquire() if self.requests else 0.0
+
+    def consume_bytes(self, count):
+        """Charge `count` transferred bytes; returns the time spent waiting"""
+        return self.bytes.acquire(count) if self.bytes and count else 0.0
+
+
+UNLIMITED = EndpointLimiter()
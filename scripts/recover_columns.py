@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Column Recovery
+Recreates dropped enum types and columns in Nhost and copies their values back
+from Supabase, driven by a recovery spec (see column_recovery.py):
+
+    python3 scripts/recover_columns.py                          # built-in spec, all tables
+    python3 scripts/recover_columns.py --skip-schema --table member
+    python3 scripts/recover_columns.py --spec recovery.json --workers 8
+    python3 scripts/recover_columns.py --verify --supabase-rpc recovery_range_hashes
+
+CONFIGURATION REQUIRED (environment variables):
+- NHOST_ADMIN_SECRET: your Nhost admin secret
+- NHOST_SUBDOMAIN / NHOST_REGION: your Nhost project (or NHOST_HASURA_URL)
+- SUPABASE_URL: your Supabase project URL
+- SUPABASE_KEY: your Supabase anon/service key
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import http_pool
+import request_executor
+from column_recovery import DEFAULT_SPEC, DEFAULT_WORKERS, load_spec, recovery_steps, run_recovery, verification_sql
+from range_diff import (
+    DEFAULT_FANOUT, DEFAULT_LEAF_ROWS, RANGE_HASH_FUNCTION, RANGE_HASH_FUNCTION_SQL, NhostSide, SupabaseSide, diff_table,
+)
+from sql_batch import DEFAULT_CHUNK_SIZE
+from supabase_rest import DEFAULT_PAGE_SIZE, iter_table_pages
+
+NHOST_ADMIN_SECRET = os.environ.get('NHOST_ADMIN_SECRET', '<YOUR_NHOST_ADMIN_SECRET>')
+NHOST_SUBDOMAIN = os.environ.get('NHOST_SUBDOMAIN', '<YOUR_NHOST_SUBDOMAIN>')
+NHOST_REGION = os.environ.get('NHOST_REGION', '<YOUR_NHOST_REGION>')
+NHOST_HASURA_URL = os.environ.get('NHOST_HASURA_URL') or f'https://{NHOST_SUBDOMAIN}.hasura.{NHOST_REGION}.nhost.run'
+NHOST_URL = f'{NHOST_HASURA_URL}/v2/query'
+
+SUPABASE_URL = os.environ.get('SUPABASE_URL', '<YOUR_SUPABASE_PROJECT_URL>')  # e.g., https://xxx.supabase.co
+SUPABASE_KEY = os.environ.get('SUPABASE_KEY', '<YOUR_SUPABASE_ANON_KEY>')
+
+DIFF_REPORT_PATH = 'nhost/migrations/column_recovery_diff.json'
+
+
+def run_nhost_sql(sql):
+    """Execute SQL on Nhost"""
+    headers = {
+        'Content-Type': 'application/json',
+        'x-hasura-admin-secret': NHOST_ADMIN_SECRET
+    }
+
+    data = json.dumps({
+        'type': 'run_sql',
+        'args': {'sql': sql}
+    }).encode()
+
+    def send():
+        req = urllib.request.Request(NHOST_URL, data=data, headers=headers)
+        response = http_pool.urlopen(req)
+        return json.loads(response.read())
+
+    try:
+        return request_executor.run('nhost-sql', send)
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Recover dropped columns from Supabase into Nhost")
+    parser.add_argument('--spec', metavar='PATH',
+                        help="JSON recovery spec (default: the enum columns lost in the CASCADE drop)")
+    parser.add_argument('--table', action='append',
+                        help="Only recover this table (repeatable; default: every table in the spec)")
+    parser.add_argument('--skip-schema', action='store_true',
+                        help="Only copy values; the enum types and columns already exist")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"Tables recovered concurrently (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Rows per batched UPDATE request (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f"Rows fetched from Supabase per page (default: {DEFAULT_PAGE_SIZE})")
+    parser.add_argument('--verify', action='store_true',
+                        help="Diff the spec's columns row by row between Supabase and Nhost instead of recovering")
+    parser.add_argument('--supabase-rpc', nargs='?', const=RANGE_HASH_FUNCTION, metavar='FUNCTION',
+                        help=f"Hash Supabase ranges with this SQL function (default name: {RANGE_HASH_FUNCTION}, "
+                             "see --print-rpc-sql); without it Supabase rows are paged and hashed locally, "
+                             "re-reading differing ranges at every level")
+    parser.add_argument('--print-rpc-sql', action='store_true',
+                        help="Print the SQL that installs the range hash function on Supabase and exit")
+    parser.add_argument('--fanout', type=int, default=DEFAULT_FANOUT,
+                        help=f"Sub-ranges a differing range is split into with --verify (default: {DEFAULT_FANOUT})")
+    parser.add_argument('--leaf-rows', type=int, default=DEFAULT_LEAF_ROWS,
+                        help=f"Ranges up to this many rows are compared row by row (default: {DEFAULT_LEAF_ROWS})")
+    parser.add_argument('--report', default=DIFF_REPORT_PATH,
+                        help=f"Where --verify writes the differing rows (default: {DIFF_REPORT_PATH})")
+    parser.add_argument('--max-retries', type=int, default=request_executor.DEFAULT_MAX_RETRIES,
+                        help=f"Retries per request on 429/5xx/timeouts (default: {request_executor.DEFAULT_MAX_RETRIES})")
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.chunk_size < 1 or args.page_size < 1 or args.leaf_rows < 1:
+        parser.error("--workers, --chunk-size, --page-size and --leaf-rows must be at least 1")
+    if args.fanout < 2:
+        parser.error("--fanout must be at least 2")
+    try:
+        args.spec = load_spec(args.spec) if args.spec else DEFAULT_SPEC
+    except (OSError, ValueError) as e:
+        parser.error(f"--spec: {e}")
+    if args.table:
+        known = {table_spec['table'] for table_spec in args.spec['tables']}
+        unknown = sorted(set(args.table) - known)
+        if unknown:
+            parser.error(f"--table {', '.join(unknown)} is not in the spec ({', '.join(sorted(known))})")
+        args.spec = {**args.spec, 'tables': [t for t in args.spec['tables'] if t['table'] in args.table]}
+    return args
+
+
+def run_verify(args):
+    """Range-hash diff of every table in the spec; writes the differing rows to args.report"""
+    print(f"\n🔎 Diffing {len(args.spec['tables'])} tables by range hashes "
+          f"({'Supabase function ' + args.supabase_rpc if args.supabase_rpc else 'Supabase rows hashed locally'})")
+    started = time.monotonic()
+
+    def diff(table_spec):
+        nhost = NhostSide(run_nhost_sql)
+        supabase = SupabaseSide(SUPABASE_URL, SUPABASE_KEY, args.supabase_rpc, args.page_size)
+        try:
+            result = diff_table(nhost, supabase, table_spec['table'], table_spec.get('key', 'id'),
+                                list(table_spec['columns']), args.fanout, args.leaf_rows)
+        except Exception as e:
+            result = {'error': str(e)}
+        result['queries'] = {'nhost': nhost.queries, 'supabase': supabase.queries}
+        return table_spec['table'], result
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        results = dict(executor.map(diff, args.spec['tables']))
+
+    differing = 0
+    for table, result in results.items():
+        queries = f"{result['queries']['nhost']} Nhost + {result['queries']['supabase']} Supabase queries"
+        if 'error' in result:
+            print(f"⚠️  {table}: {result['error']} ({queries})")
+            continue
+        found = len(result['mismatched']) + len(result['missing_in_nhost']) + len(result['extra_in_nhost'])
+        differing += found
+        status = '✅' if not found else '✗'
+        print(f"{status} {table}: {result['rows']} rows, {len(result['mismatched'])} mismatched, "
+              f"{len(result['missing_in_nhost'])} missing in Nhost, {len(result['extra_in_nhost'])} only in Nhost "
+              f"({result['ranges_compared']} ranges, {result['rows_fetched']} rows fetched, {queries})")
+        for row in result['mismatched'][:5]:
+            print(f"     • {row['key']}: {row['columns']}")
+
+    os.makedirs(os.path.dirname(args.report) or '.', exist_ok=True)
+    with open(args.report, 'w') as f:
+        json.dump({'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"), 'tables': results}, f, indent=2)
+    print(f"\n📝 Diff report: {args.report} ({time.monotonic() - started:.1f}s)")
+    failed = any('error' in result for result in results.values())
+    return 0 if not differing and not failed else 1
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    spec = args.spec
+    if args.print_rpc_sql:
+        print(RANGE_HASH_FUNCTION_SQL)
+        return 0
+
+    print("🚨 COLUMN RECOVERY")
+    print("=" * 60)
+    print("Recovering lost columns from Supabase")
+    print("=" * 60)
+
+    # Verify configuration
+    if '<YOUR_' in NHOST_ADMIN_SECRET or '<YOUR_' in SUPABASE_URL:
+        print("\n❌ ERROR: Please set the configuration environment variables:")
+        print("   - NHOST_ADMIN_SECRET")
+        print("   - NHOST_SUBDOMAIN")
+        print("   - NHOST_REGION")
+        print("   - SUPABASE_URL")
+        print("   - SUPABASE_KEY")
+        return 1
+
+    # Every table keeps a Supabase and an Nhost request in flight
+    http_pool.configure(max(args.workers, 2))
+    request_executor.configure(max_retries=args.max_retries, max_concurrency=args.workers)
+
+    if args.verify:
+        return run_verify(args)
+
+    steps = recovery_steps(spec, create_schema=not args.skip_schema)
+    print(f"\n📋 {sum(kind == 'type' for kind, _ in steps)} enum types, "
+          f"{sum(kind == 'table' for kind, _ in steps)} tables ({args.workers} at a time)")
+    for (kind, name), dependencies in steps.items():
+        if kind == 'table':
+            table_spec = next(t for t in spec['tables'] if t['table'] == name)
+            after = f" (after {', '.join(sorted(d[1] for d in dependencies))})" if dependencies else ''
+            print(f"   • {name}: {', '.join(table_spec['columns'])}{after}")
+    print()
+
+    def fetch_pages(table, select_fields, key):
+        return iter_table_pages(SUPABASE_URL, SUPABASE_KEY, table, select_fields, key, page_size=args.page_size)
+
+    def report(step, result):
+        kind, name = step
+        for error in result['errors']:
+            print(f"⚠️  {error}")
+        if kind == 'type' and not result['errors']:
+            print(f"✅ Enum type {name} ready")
+        elif kind == 'table' and result['fetched']:
+            values = ', '.join(f"{column} {count}" for column, count in result['values'].items())
+            print(f"✅ {name}: {result['fetched']} rows fetched, {result['updated']} restored ({values})")
+
+    started = time.monotonic()
+    results = run_recovery(run_nhost_sql, fetch_pages, spec, args.workers, not args.skip_schema,
+                           args.chunk_size, on_step=report)
+    failed = [step for step, result in results.items() if result['errors']]
+
+    # Final verification
+    print("\n\n📋 FINAL VERIFICATION")
+    print("=" * 60)
+
+    result = run_nhost_sql(verification_sql(spec))
+    if result.get('result'):
+        print("\n📊 Restored Data Counts:")
+        for row in result['result'][1:]:
+            print(f"  ✅ {row[0]}: {row[1]} records")
+
+    if failed:
+        print(f"\n\n⚠️  DATA RECOVERY INCOMPLETE ({time.monotonic() - started:.1f}s)")
+        print(f"Failed: {', '.join(name for _, name in failed)} - fix the errors above and re-run")
+        return 1
+    print(f"\n\n🎉 DATA RECOVERY COMPLETE! ({time.monotonic() - started:.1f}s)")
+    print("All column data has been restored from Supabase.")
+    print("Run with --verify for a row-by-row comparison with Supabase.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Retrying, adaptively-throttled request execution for the migration scripts (standard library only)
+
+run(endpoint, fn) calls fn() - which performs one HTTP request and raises on
+failure - under two controls shared by every thread using that endpoint:
+
+- Retries: exponential backoff with full jitter. A Retry-After header on a
+  429/503 is honoured and also pauses the whole endpoint, not just the caller.
+- AIMD concurrency: the number of requests in flight per endpoint grows by
+  roughly one per round of successes and halves on 429/503, timeouts, or
+  when the smoothed latency climbs well above the best seen so far.
+
+Throughput therefore settles at what Supabase/Nhost actually sustain.
+"""
+
+import email.utils
+import http.client
+import random
+import socket
+import threading
+import time
+import urllib.error
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# Statuses where the server refused the request before processing it, so
+# even non-idempotent requests (uploads) can be sent again
+REFUSED_STATUS = {429, 503}
+OVERLOAD_STATUS = {429, 503}
+
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+def _status(exc):
+    return exc.code if isinstance(exc, urllib.error.HTTPError) else None
+
+
+def _is_timeout(exc):
+    if isinstance(exc, urllib.error.URLError) and not isinstance(exc, urllib.error.HTTPError):
+        exc = exc.reason
+    return isinstance(exc, (socket.timeout, TimeoutError))
+
+
+def _is_connection_error(exc):
+    if isinstance(exc, urllib.error.URLError) and not isinstance(exc, urllib.error.HTTPError):
+        exc = exc.reason
+    return isinstance(exc, (ConnectionError, http.client.RemoteDisconnected, http.client.IncompleteRead))
+
+
+def is_retryable(exc, idempotent=True):
+    status = _status(exc)
+    if status is not None:
+        return status in (RETRYABLE_STATUS if idempotent else REFUSED_STATUS)
+    if isinstance(exc, ConnectionRefusedError):
+        return True
+    if not idempotent:
+        return False
+    return _is_timeout(exc) or _is_connection_error(exc)
+
+
+def retry_after_seconds(exc):
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP-date), or None"""
+    headers = getattr(exc, 'headers', None)
+    value = headers.get('Retry-After') if headers is not None else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class RetryPolicy:
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, base_delay=0.5, max_delay=30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for the given retry number (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class AIMDLimiter:
+    """Additive-increase / multiplicative-decrease cap on in-flight requests for one endpoint"""
+
+    def __init__(self, max_limit, initial=None, min_limit=1, latency_factor=2.0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial or min(max_limit, 2))
+        self.latency_factor = latency_factor
+        self.inflight = 0
+        self.paused_until = 0.0
+        self.latency_ewma = None
+        self.best_latency = None
+        self.last_decrease = 0.0
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'decreases': 0}
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.inflight < int(self.limit):
+                    self.inflight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, latency=None, overloaded=False, failed=False):
+        with self._cond:
+            self.inflight -= 1
+            self.stats['requests'] += 1
+            if overloaded:
+                self._decrease()
+            elif latency is not None:
+                self._observe(latency)
+            elif not failed:
+                self._increase()
+            self._cond.notify_all()
+
+    def record_retry(self):
+        with self._cond:
+            self.stats['retries'] += 1
+
+    def pause(self, seconds):
+        """Hold back every request to this endpoint for `seconds` (Retry-After)"""
+        with self._cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.stats['throttled'] += 1
+            self._decrease()
+
+    def _observe(self, latency):
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        if self.best_latency is None or self.latency_ewma < self.best_latency:
+            self.best_latency = self.latency_ewma
+        if self.latency_ewma > self.best_latency * self.latency_factor:
+            self._decrease()
+        else:
+            self._increase()
+
+    def _increase(self):
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def _decrease(self):
+        # One decrease per latency window, so a burst of failures from the
+        # same overload does not collapse the limit to the floor
+        now = time.monotonic()
+        if now - self.last_decrease < (self.latency_ewma or 1.0):
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit / 2)
+        self.stats['decreases'] += 1
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                **self.stats,
+                'concurrency_limit': round(self.limit, 2),
+                'latency_ewma_ms': round(self.latency_ewma * 1000, 1) if self.latency_ewma else None,
+            }
+
+
+class RequestExecutor:
+    def __init__(self, policy=None, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.policy = policy or RetryPolicy()
+        self.max_concurrency = max_concurrency
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def configure(self, max_retries=None, max_concurrency=None):
+        if max_retries is not None:
+            self.policy.max_retries = max_retries
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+            with self._lock:
+                for limiter in self._limiters.values():
+                    limiter.max_limit = max_concurrency
+
+    def limiter(self, endpoint):
+        with self._lock:
+            if endpoint not in self._limiters:
+                self._limiters[endpoint] = AIMDLimiter(self.max_concurrency)
+            return self._limiters[endpoint]
+
+    def run(self, endpoint, fn, idempotent=True, track_latency=True):
+        """Call fn() with retries and AIMD concurrency control; re-raises the last error
+
+        Pass idempotent=False for requests that must not be repeated once the
+        server may have processed them (e.g. uploads): those are only retried
+        on 429/503 or a refused connection. Pass track_latency=False when fn's
+        duration scales with payload size, so big files are not mistaken for
+        a congested endpoint.
+        """
+        limiter = self.limiter(endpoint)
+        attempt = 0
+        while True:
+            limiter.acquire()
+            started = time.monotonic()
+            try:
+                result = fn()
+            except Exception as exc:
+                overloaded = _status(exc) in OVERLOAD_STATUS or _is_timeout(exc)
+                limiter.release(overloaded=overloaded, failed=True)
+                attempt += 1
+                if attempt > self.policy.max_retries or not is_retryable(exc, idempotent):
+                    raise
+                delay = self.policy.backoff(attempt)
+                retry_after = retry_after_seconds(exc)
+                if retry_after is not None:
+                    limiter.pause(retry_after)
+                    delay = max(delay, retry_after)
+                if isinstance(exc, urllib.error.HTTPError):
+                    # Frees the pooled connection the unread error body is holding
+                    exc.close()
+                limiter.record_retry()
+                time.sleep(delay)
+                continue
+            limiter.release(latency=(time.monotonic() - started) if track_latency else None)
+            return result
+
+    def snapshot(self):
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {endpoint: limiter.snapshot() for endpoint, limiter in limiters.items()}
+
+
+default_executor = RequestExecutor()
+
+
+def configure(max_retries=None, max_concurrency=None):
+    """Tune the shared executor used by run()"""
+    default_executor.configure(max_retries, max_concurrency)
+
+
+def run(endpoint, fn, idempotent=True, track_latency=True):
+    return default_executor.run(endpoint, fn, idempotent, track_latency)
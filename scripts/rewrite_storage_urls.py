@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Apply the storage URL -> Nhost file id rewrite to a live database in small batches
+
+00012_update_storage_urls.sql rewrites every referencing column in one
+transaction, which holds row locks on whole tables while the app is live.
+This executor loads the same old URL -> file id mapping (from the migration
+journal) into a work table, then walks each referencing table in primary-key
+order, rewriting one keyset page per Hasura run_sql request. Every batch
+commits on its own, batches can be spaced out with --pause, and progress is
+journaled so an interrupted run continues with --resume:
+
+    python3 scripts/rewrite_storage_urls.py --batch-size 500 --pause 0.2
+    python3 scripts/rewrite_storage_urls.py --resume
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import http_pool
+import request_executor
+from migrate_storage_stdlib import JOURNAL_PATH, load_credentials, run_nhost_sql, supabase_base_url
+from migration_journal import MigrationJournal, read_entries
+from url_rewrite import (
+    DEFAULT_BATCH_SIZE, REFERENCING_COLUMNS, WORK_TABLE,
+    drop_mapping_table, iter_url_mappings, load_mapping_table, rewrite_column, source_url_prefixes,
+)
+
+PROGRESS_PATH = 'nhost/migrations/storage_url_rewrite_progress.jsonl'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rewrite storage URLs to Nhost file ids in committed batches")
+    parser.add_argument('--journal', default=JOURNAL_PATH,
+                        help=f"Migration journal holding the uploaded file ids (default: {JOURNAL_PATH})")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Rows scanned per batch/transaction (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--pause', type=float, default=0.0,
+                        help="Seconds to sleep between batches, to leave headroom for live traffic")
+    parser.add_argument('--column', action='append', metavar='TABLE.COLUMN',
+                        help="Only rewrite this column (repeatable; default: every referencing column)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue after the last committed batch recorded in the progress journal")
+    parser.add_argument('--progress', default=PROGRESS_PATH,
+                        help=f"Progress journal path (default: {PROGRESS_PATH})")
+    parser.add_argument('--keep-map', action='store_true',
+                        help=f"Keep the {WORK_TABLE} work table after a successful run")
+    parser.add_argument('--max-retries', type=int, default=request_executor.DEFAULT_MAX_RETRIES,
+                        help=f"Retries per request on 429/5xx/timeouts (default: {request_executor.DEFAULT_MAX_RETRIES})")
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    known = {f"{table}.{column}" for table, column, _ in REFERENCING_COLUMNS}
+    for name in args.column or []:
+        if name not in known:
+            parser.error(f"--column must be one of: {', '.join(sorted(known))}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("=" * 70)
+    print("🔗 Storage URL Rewrite: Supabase URLs → Nhost file ids")
+    print("=" * 70)
+    print()
+
+    load_credentials()
+    http_pool.configure(2)
+    request_executor.configure(max_retries=args.max_retries, max_concurrency=1)
+
+    entries = read_entries(args.journal)
+    if not entries:
+        print(f"✗ No uploads recorded in {args.journal}")
+        return 1
+    mappings = iter_url_mappings(entries, source_url_prefixes(supabase_base_url(), os.environ.get('NHOST_SUBDOMAIN')))
+
+    print(f"📥 Loading URL mappings into {WORK_TABLE}...")
+    loaded, errors = load_mapping_table(run_nhost_sql, mappings)
+    for error in errors:
+        print(f"   ✗ {error}")
+    if errors:
+        return 1
+    print(f"✓ {loaded} URL mappings loaded")
+    print()
+
+    columns = [c for c in REFERENCING_COLUMNS if not args.column or f"{c[0]}.{c[1]}" in args.column]
+    failed = []
+    started = time.monotonic()
+    with MigrationJournal(args.progress, load=args.resume) as progress:
+        for table, column, is_array in columns:
+            print(f"✏️  {table}.{column}...")
+            column_started = time.monotonic()
+            scanned, updated, error = rewrite_column(run_nhost_sql, table, column, is_array,
+                                                     args.batch_size, args.pause, progress)
+            if error:
+                failed.append(error)
+                print(f"   ✗ {error}")
+                print("   (re-run with --resume to continue from the last committed batch)")
+            else:
+                print(f"   ✓ {updated} rows rewritten, {scanned} scanned "
+                      f"({time.monotonic() - column_started:.1f}s)")
+
+    if not failed and not args.keep_map:
+        drop_mapping_table(run_nhost_sql)
+
+    print()
+    print("=" * 70)
+    print(f"{'✅ URL rewrite complete' if not failed else '⚠️  URL rewrite incomplete'} "
+          f"({time.monotonic() - started:.1f}s)")
+    print("=" * 70)
+    print(f"📝 Progress journal: {args.progress}")
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Rewrite interrupted - re-run with --resume to continue")
+        sys.exit(1)
@@ -7,14 +7,27 @@ Instead of moving files via API, we'll update the files table directly
 import os
 import sys
 import json
+import argparse
 import urllib.request
 
+import http_pool
+import request_executor
+from file_bucket_index import FileBucketIndex, inventory_bucket
+from migration_journal import iter_records
+from sql_batch import chunked
+from storage_listing import CRAWL_WORKERS, crawl_supabase_objects, list_supabase_buckets
+
+INVENTORY_PATH = '/Users/preetam/workspace/AryaMahasangh/nhost/migrations/storage_migration_inventory.json'
+JOURNAL_PATH = '/Users/preetam/workspace/AryaMahasangh/nhost/migrations/storage_migration_journal.jsonl'
+
 def load_credentials():
     local_props_path = '/Users/preetam/workspace/AryaMahasangh/local.properties'
     with open(local_props_path, 'r') as f:
         for line in f:
             if line.startswith('prod_project_ref='):
                 os.environ['SUPABASE_PROJECT_ID'] = line.split('=', 1)[1].strip()
+            elif line.startswith('prod_service_role_key='):
+                os.environ['SUPABASE_SERVICE_ROLE_KEY'] = line.split('=', 1)[1].strip()
 
     nhost_config_path = '/Users/preetam/.config/nhost/mcp-nhost.toml'
     with open(nhost_config_path, 'r') as f:
@@ -29,33 +42,15 @@ def load_credentials():
                 elif line.startswith('admin_secret ='):
                     os.environ['NHOST_ADMIN_SECRET'] = line.split("'")[1]
 
-def update_bucket_assignment(filename, new_bucket):
-    """Update the bucketId for a file in the database"""
+def run_graphql(query, variables):
+    """POST a GraphQL request to Nhost with admin rights; returns (True, data) or (False, error)"""
     try:
-        url = f"https://{os.environ['NHOST_SUBDOMAIN']}.hasura.ap-south-1.nhost.run/v1/graphql"
-
-        mutation = """
-        mutation UpdateFileBucket($filename: String!, $newBucket: String!) {
-          updateFiles(
-            where: {name: {_eq: $filename}},
-            _set: {bucketId: $newBucket}
-          ) {
-            affected_rows
-            returning {
-              id
-              name
-              bucketId
-            }
-          }
-        }
-        """
+        base = os.environ.get('NHOST_HASURA_URL') or f"https://{os.environ['NHOST_SUBDOMAIN']}.hasura.ap-south-1.nhost.run"
+        url = f"{base}/v1/graphql"
 
         payload = {
-            'query': mutation,
-            'variables': {
-                'filename': filename,
-                'newBucket': new_bucket
-            }
+            'query': query,
+            'variables': variables
         }
 
         req = urllib.request.Request(
@@ -66,18 +61,102 @@ def update_bucket_assignment(filename, new_bucket):
         req.add_header('Content-Type', 'application/json')
         req.add_header('x-hasura-admin-secret', os.environ['NHOST_ADMIN_SECRET'])
 
-        with urllib.request.urlopen(req, timeout=30) as response:
-            result = json.loads(response.read().decode())
-            if 'errors' in result:
-                return False, json.dumps(result['errors'])
+        def send():
+            with http_pool.urlopen(req, timeout=30) as response:
+                return json.loads(response.read().decode())
 
-            affected = result['data']['updateFiles']['affected_rows']
-            return True, affected
+        result = request_executor.run('nhost-graphql', send)
+        if 'errors' in result:
+            return False, json.dumps(result['errors'])
+        return True, result['data']
 
     except Exception as e:
         return False, str(e)
 
-def main():
+# GraphQL type of each storage.files column files can be matched on
+KEY_TYPES = {'id': 'uuid!', 'name': 'String!'}
+
+def update_bucket_assignments(keys, new_bucket, field='name'):
+    """Update the bucketId for a chunk of files, matched by file id or by name, in one mutation
+
+    Returns (True, {key: rows_updated}) with 0 for keys not found in the
+    database, or (False, error).
+    """
+    mutation = f"""
+    mutation UpdateFileBuckets($keys: [{KEY_TYPES[field]}]!, $newBucket: String!) {{
+      updateFiles(
+        where: {{{field}: {{_in: $keys}}}},
+        _set: {{bucketId: $newBucket}}
+      ) {{
+        affected_rows
+        returning {{
+          {field}
+        }}
+      }}
+    }}
+    """
+
+    success, result = run_graphql(mutation, {'keys': keys, 'newBucket': new_bucket})
+    if not success:
+        return False, result
+
+    affected = {key: 0 for key in keys}
+    for row in result['updateFiles']['returning']:
+        affected[row[field]] = affected.get(row[field], 0) + 1
+    return True, affected
+
+def iter_inventory_files(inventory_path):
+    """(bucket, file path) for every file in the inventory JSON"""
+    with open(inventory_path, 'r') as f:
+        inventory = json.load(f)
+    for group, bucket_info in inventory['buckets'].items():
+        # "documents/activity_overview" lists files of the documents bucket's activity_overview/ folder
+        bucket, prefix = inventory_bucket(group)
+        for file_path in bucket_info['files']:
+            file_path = file_path.lstrip('/')
+            yield bucket, f"{prefix}/{file_path}" if prefix else file_path
+
+def iter_listed_files(buckets, workers):
+    """(bucket, file path) for every object in the live Supabase listing"""
+    supabase_url = os.environ.get('SUPABASE_URL') or f"https://{os.environ['SUPABASE_PROJECT_ID']}.supabase.co"
+    api_key = os.environ.get('SUPABASE_SERVICE_ROLE_KEY', '')
+    buckets = buckets or list_supabase_buckets(supabase_url, api_key)
+    for obj in crawl_supabase_objects(supabase_url, api_key, [(bucket, '') for bucket in buckets], workers):
+        yield obj['bucket'], obj['path']
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Reassign Nhost storage files to their target buckets")
+    parser.add_argument('--bulk', action='store_true',
+                        help="Group files by bucket and update each chunk with a single mutation")
+    parser.add_argument('--chunk-size', type=int, default=200,
+                        help="Files per bulk mutation (default: 200)")
+    parser.add_argument('--yes', action='store_true',
+                        help="Skip the confirmation prompt")
+    parser.add_argument('--inventory', default=INVENTORY_PATH,
+                        help="Storage migration inventory JSON (default: the AryaMahasangh checkout)")
+    parser.add_argument('--journal', default=JOURNAL_PATH,
+                        help="Storage migration journal; files it records an Nhost id for are updated by id "
+                             "(default: the AryaMahasangh checkout)")
+    parser.add_argument('--index-db', default='', metavar='PATH',
+                        help="Keep the file -> bucket index in this SQLite file (default: a temporary file)")
+    parser.add_argument('--from-listing', action='store_true',
+                        help="Take the file -> bucket mapping from the live Supabase listing instead of the inventory")
+    parser.add_argument('--bucket', action='append', metavar='NAME',
+                        help="Bucket to list with --from-listing (repeatable; default: every Supabase bucket)")
+    parser.add_argument('--list-workers', type=int, default=CRAWL_WORKERS,
+                        help=f"Folders listed in parallel with --from-listing (default: {CRAWL_WORKERS})")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+    if args.list_workers < 1:
+        parser.error("--list-workers must be at least 1")
+    if args.bucket and not args.from_listing:
+        parser.error("--bucket selects what --from-listing lists")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+
     print("=" * 70)
     print("🔧 Simple Bucket Fix - Update Database Records")
     print("=" * 70)
@@ -87,25 +166,25 @@ def main():
     print(f"✓ Loaded credentials for: {os.environ.get('NHOST_SUBDOMAIN')}")
     print()
 
-    # Load inventory to get file-to-bucket mapping
-    inventory_path = '/Users/preetam/workspace/AryaMahasangh/nhost/migrations/storage_migration_inventory.json'
-    with open(inventory_path, 'r') as f:
-        inventory = json.load(f)
+    # Index every file by its full path, from the inventory or the live listing
+    if args.from_listing:
+        print("🔍 Listing Supabase storage...")
+        files = iter_listed_files(args.bucket, args.list_workers)
+    else:
+        files = iter_inventory_files(args.inventory)
+    index = FileBucketIndex(args.index_db)
+    index.add_files(files)
+    # Files the migrator uploaded can be updated by their exact Nhost file id
+    index.attach_file_ids(iter_records(args.journal))
+    bucket_counts = index.bucket_counts()
+    ambiguous = index.ambiguous_names()
 
-    # Build mapping
-    file_to_bucket = {}
-    for bucket_name, bucket_info in inventory['buckets'].items():
-        actual_bucket = 'documents' if 'documents' in bucket_name else bucket_name
-        for file_path in bucket_info['files']:
-            filename = os.path.basename(file_path.lstrip('/'))
-            file_to_bucket[filename] = actual_bucket
-
-    documents_count = sum(1 for b in file_to_bucket.values() if b == 'documents')
-    profile_count = sum(1 for b in file_to_bucket.values() if b == 'profile_image')
-
-    print(f"📊 Files to update:")
-    print(f"   • 'documents' bucket: {documents_count} files")
-    print(f"   • 'profile_image' bucket: {profile_count} files")
+    print("📊 Files to update:")
+    for bucket, count in bucket_counts.items():
+        print(f"   • '{bucket}' bucket: {count} files")
+    if ambiguous:
+        print(f"   ⚠ {len(ambiguous)} file names occur in more than one bucket; files with these")
+        print("     names are only updated when the journal has their Nhost file id")
     print()
     print("💡 Strategy:")
     print("   Instead of moving files via API (which keeps failing),")
@@ -114,7 +193,7 @@ def main():
     print("   serve them from the correct bucket path.")
     print()
 
-    confirm = input("Proceed with updating bucket assignments? (yes/no): ")
+    confirm = 'yes' if args.yes else input("Proceed with updating bucket assignments? (yes/no): ")
 
     if confirm.lower() != 'yes':
         print("\n⏸️  Operation cancelled")
@@ -126,30 +205,68 @@ def main():
 
     success_count = 0
     failed_count = 0
+    not_found_count = 0
+
+    skipped_count = 0
+    done = 0
+    total = sum(bucket_counts.values())
+    # Per-file mode sends one mutation per file, --bulk one per chunk and match field
+    chunk_size = args.chunk_size if args.bulk else 1
+    for bucket in bucket_counts:
+        for chunk in chunked(index.iter_bucket(bucket), chunk_size):
+            done += len(chunk)
+            # (index row key, match key) per field; files in different folders can share a name
+            rows_by_field = {'id': [], 'name': []}
+            for key, name, nhost_id in chunk:
+                if nhost_id:
+                    rows_by_field['id'].append((key, nhost_id))
+                elif name in ambiguous:
+                    print(f"   ⚠ Skipped {key}: name shared across buckets and no Nhost file id in the journal")
+                    skipped_count += 1
+                else:
+                    rows_by_field['name'].append((key, name))
+
+            for field, rows in rows_by_field.items():
+                if not rows:
+                    continue
+                if args.bulk:
+                    print(f"[{bucket}] {len(rows)} files by {field} → {bucket}...")
+                else:
+                    print(f"[{done}/{total}] {chunk[0][0]} → {bucket}...")
 
-    for i, (filename, bucket) in enumerate(file_to_bucket.items(), 1):
-        print(f"[{i}/{len(file_to_bucket)}] {filename} → {bucket}...")
+                keys = list(dict.fromkeys(match for _, match in rows))
+                success, result = update_bucket_assignments(keys, bucket, field)
+                if not success:
+                    print(f"   ✗ Failed: {result}")
+                    failed_count += len(rows)
+                    continue
 
-        success, result = update_bucket_assignment(filename, bucket)
-        if success:
-            if result > 0:
-                print(f"   ✓ Updated")
-                success_count += 1
-            else:
-                print(f"   ⚠ File not found in database")
-        else:
-            print(f"   ✗ Failed: {result}")
-            failed_count += 1
+                # Counted per index row, so the totals match per-file mode for the same input
+                missing = [key for key, match in rows if result.get(match, 0) == 0]
+                success_count += len(rows) - len(missing)
+                not_found_count += len(missing)
+                if args.bulk:
+                    print(f"   ✓ Updated {len(rows) - len(missing)}")
+                    for key in missing:
+                        print(f"   ⚠ File not found in database: {key}")
+                elif missing:
+                    print("   ⚠ File not found in database")
+                else:
+                    print("   ✓ Updated")
+    index.close()
 
     print()
     print("=" * 70)
     print("✅ Update Complete!")
     print("=" * 70)
     print(f"Successfully updated: {success_count}")
+    print(f"Not found in database: {not_found_count}")
+    if skipped_count:
+        print(f"Skipped (ambiguous name): {skipped_count}")
     print(f"Failed: {failed_count}")
     print()
 
-    if failed_count == 0:
+    if failed_count == 0 and skipped_count == 0:
         print("🎉 All file bucket assignments updated!")
         print()
         print("📝 What happened:")
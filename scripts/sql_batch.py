@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Set-based batched UPDATEs over Hasura run_sql (standard library only)
+
+Instead of one `UPDATE ... WHERE id = ...` request per row, rows are sent in
+chunks as a single statement joined against a VALUES list:
+
+    WITH updated AS (
+      UPDATE "member" AS t SET "gender" = v.v0::gender_filter, "birth_year" = v.v1::integer
+      FROM (VALUES ('id-1', 'MALE', '1990'), ('id-2', 'FEMALE', NULL)) AS v(key, v0, v1)
+      WHERE t."id" = v.key
+      RETURNING 1
+    )
+    SELECT count(*) FROM updated;
+
+Hasura executes each run_sql call in its own transaction, so every chunk is
+applied atomically. All values are escaped with sql_literal().
+"""
+
+import re
+
+DEFAULT_CHUNK_SIZE = 500
+
+_TYPE_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_.]*(\[\])?$')
+
+
+def sql_literal(value):
+    """Render a Python value as a PostgreSQL literal"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    text = str(value)
+    if '\x00' in text:
+        raise ValueError("PostgreSQL text cannot contain NUL characters")
+    return "'" + text.replace("'", "''") + "'"
+
+
+def sql_identifier(name):
+    """Double-quote a table/column name"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def sql_type(type_name):
+    """Return type_name, refusing anything that is not a plain type name"""
+    if not _TYPE_NAME.match(type_name):
+        raise ValueError(f"Invalid type name: {type_name!r}")
+    return type_name
+
+
+def sql_cast(type_name):
+    """Render a ::type suffix, refusing anything that is not a plain type name"""
+    if not type_name:
+        return ''
+    return f'::{sql_type(type_name)}'
+
+
+def chunked(iterable, size):
+    """Yield lists of at most `size` items"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def build_batched_row_update(table, key_column, columns, rows, casts=None, key_cast=None):
+    """Build one UPDATE ... FROM (VALUES ...) statement for (key, value, ...) rows that reports rows updated"""
+    casts = casts or {}
+    names = ', '.join(['key'] + [f'v{i}' for i in range(len(columns))])
+    values = ',\n    '.join('(' + ', '.join(sql_literal(value) for value in row) + ')' for row in rows)
+    assignments = ', '.join(f'{sql_identifier(column)} = v.v{i}{sql_cast(casts.get(column))}'
+                            for i, column in enumerate(columns))
+    return (
+        "WITH updated AS (\n"
+        f"  UPDATE {sql_identifier(table)} AS t SET {assignments}\n"
+        f"  FROM (VALUES\n    {values}\n  ) AS v({names})\n"
+        f"  WHERE t.{sql_identifier(key_column)} = v.key{sql_cast(key_cast)}\n"
+        "  RETURNING 1\n"
+        ")\n"
+        "SELECT count(*) FROM updated;"
+    )
+
+
+def apply_batched_row_updates(run_sql, table, key_column, columns, rows, casts=None,
+                              chunk_size=DEFAULT_CHUNK_SIZE, key_cast=None):
+    """Apply (key, value, ...) rows to `columns` of table in chunks of chunk_size rows per request
+
+    Returns (rows_updated, errors) where errors holds one message per failed chunk.
+    """
+    updated = 0
+    errors = []
+    for chunk in chunked(rows, chunk_size):
+        result = run_sql(build_batched_row_update(table, key_column, columns, chunk, casts, key_cast))
+        if result.get('result_type') == 'TuplesOk':
+            updated += int(result['result'][1][0])
+        else:
+            errors.append(f"{table} chunk of {len(chunk)} rows failed: {result.get('error', result)}")
+    return updated, errors
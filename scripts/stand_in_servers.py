@@ -0,0 +1,630 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the Supabase and Nhost endpoints the migration scripts use (standard library only)
+
+- Supabase: public object downloads (with `Range` / `If-Range` / `If-None-Match`), the storage list API and REST `/rest/v1/{table}`
+  with keyset filters (`id=gt.` / `gte.` / `lt.`), `order`, `limit` and gzip
+- Nhost: `/v1/files` multipart uploads and deletes (and downloads when an
+  upload_dir is given), Hasura `/v2/query` run_sql and `/v1/graphql`
+
+Objects and table rows are synthesised deterministically, so nothing is
+held in memory beyond the upload registry. Latency, jitter, the share of
+requests answered with 503 and the object-size distribution are set through
+StandInConfig. Run this file directly to keep a pair of servers up for
+manual testing; migration_bench.py starts them itself.
+"""
+
+import argparse
+import functools
+import gzip
+import hashlib
+import json
+import math
+import random
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+import zlib
+from bisect import bisect_left, bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+READ_CHUNK_SIZE = 64 * 1024
+# Filler used for object bodies; objects are slices of it repeated
+_FILLER = random.Random(0).randbytes(READ_CHUNK_SIZE)
+
+
+def iter_object_content(object_path, start, length):
+    """Bytes start..start+length of an object's generated content (the filler, rotated per path)"""
+    offset = (zlib.crc32(object_path.encode()) + start) % len(_FILLER)
+    filler = _FILLER[offset:] + _FILLER[:offset]
+    remaining = length
+    while remaining:
+        chunk = filler[:remaining]
+        yield chunk
+        remaining -= len(chunk)
+
+
+@functools.lru_cache(maxsize=65536)
+def object_etag(object_path, size):
+    """Quoted MD5 of the content, like the ETag Supabase and hasura-storage give a simple upload"""
+    md5 = hashlib.md5()
+    for chunk in iter_object_content(object_path, 0, size):
+        md5.update(chunk)
+    return f'"{md5.hexdigest()}"'
+
+
+class FilePartDigest:
+    """Upload sink that MD5s the file part of a multipart body as it streams past
+
+    The file part runs from the blank line after its headers to the closing
+    boundary, which is held back until the body ends. Everything is passed on
+    to `sink` unchanged.
+    """
+
+    def __init__(self, boundary, sink=None):
+        self.sink = sink
+        self.tail = len(f'\r\n--{boundary}--\r\n')
+        self.head = bytearray()
+        self.offset = None
+        self.pending = bytearray()
+        self.md5 = hashlib.md5()
+        self.size = 0
+
+    def write(self, data):
+        if self.sink is not None:
+            self.sink.write(data)
+        if self.offset is None:
+            self.head.extend(data)
+            start = self.head.find(b'filename="')
+            end = self.head.find(b'\r\n\r\n', start) if start >= 0 else -1
+            if end < 0:
+                return
+            self.offset = end + 4
+            data = bytes(self.head[self.offset:])
+            self.head = None
+        self.pending.extend(data)
+        if len(self.pending) > self.tail:
+            cut = len(self.pending) - self.tail
+            self.md5.update(self.pending[:cut])
+            self.size += cut
+            del self.pending[:cut]
+
+    @property
+    def etag(self):
+        return f'"{self.md5.hexdigest()}"'
+
+GENERATED_VALUES = {
+    'gender': ('MALE', 'FEMALE'),
+    'allowed_gender': ('MALE', 'FEMALE', 'ANY'),
+    'type': ('SESSION', 'CAMP', 'COURSE', 'EVENT', 'CAMPAIGN', 'PROTECTION_SESSION', 'BODH_SESSION'),
+    'relation_to_head': ('SELF', 'FATHER', 'MOTHER', 'HUSBAND', 'WIFE', 'SON', 'DAUGHTER'),
+}
+
+
+class StandInConfig:
+    """Behaviour shared by both stand-ins
+
+    latency/jitter: seconds added to every response (jitter is uniform on top)
+    error_rate: share of requests answered with 503 + Retry-After: 0
+    object_size: median object size in bytes; size_spread is the sigma of a
+    log-normal around it (0 = every object the same size), capped at max_object_size
+    table_rows: rows served for every REST table
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, object_size=256 * 1024,
+                 size_spread=0.0, max_object_size=64 * 1024 * 1024, table_rows=10000, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.object_size = object_size
+        self.size_spread = size_spread
+        self.max_object_size = max_object_size
+        self.table_rows = table_rows
+        self.seed = seed
+
+    def object_size_for(self, path):
+        """Deterministic size for an object path"""
+        if not self.size_spread:
+            return self.object_size
+        rng = random.Random(zlib.crc32(path.encode()) ^ self.seed)
+        size = int(rng.lognormvariate(math.log(self.object_size), self.size_spread))
+        return max(1, min(size, self.max_object_size))
+
+
+class RequestStats:
+    """Thread-safe per-endpoint request, error and byte counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+
+    def add(self, endpoint, bytes_in=0, bytes_out=0, injected_error=False):
+        with self._lock:
+            stats = self.endpoints.setdefault(
+                endpoint, {'requests': 0, 'injected_errors': 0, 'bytes_in': 0, 'bytes_out': 0})
+            stats['requests'] += 1
+            stats['injected_errors'] += int(injected_error)
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self.endpoints.items()}
+
+
+class _TableIds:
+    """Sorted, evenly spread UUID ids for `count` rows, computed on demand"""
+
+    def __init__(self, count):
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        value = format(index * (1 << 128) // self.count, '032x')
+        return f'{value[:8]}-{value[8:12]}-{value[12:16]}-{value[16:20]}-{value[20:]}'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Small responses on keep-alive connections otherwise stall on Nagle + delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (ConnectionResetError, BrokenPipeError):
+            # Clients close connections whose response body they chose not to read
+            pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def read_body(self, keep=None, sink=None):
+        """Read the request body (Content-Length or chunked); returns (bytes kept, total length)
+
+        keep limits how many leading bytes are retained, so large uploads are
+        counted without being buffered; the whole body is also written to sink if given.
+        """
+        kept = bytearray()
+        total = 0
+
+        def take(data):
+            nonlocal total
+            total += len(data)
+            if sink is not None:
+                sink.write(data)
+            if keep is None or len(kept) < keep:
+                kept.extend(data if keep is None else data[:keep - len(kept)])
+
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                while size:
+                    data = self.rfile.read(min(size, READ_CHUNK_SIZE))
+                    take(data)
+                    size -= len(data)
+                self.rfile.readline()
+        else:
+            remaining = int(self.headers.get('Content-Length') or 0)
+            while remaining:
+                data = self.rfile.read(min(remaining, READ_CHUNK_SIZE))
+                if not data:
+                    break
+                take(data)
+                remaining -= len(data)
+        return bytes(kept), total
+
+    def delay(self):
+        wait = self.config.latency + (random.uniform(0, self.config.jitter) if self.config.jitter else 0)
+        if wait:
+            time.sleep(wait)
+
+    def inject_error(self, endpoint, bytes_in):
+        """Answer with a retryable 503 for config.error_rate of requests"""
+        if not self.config.error_rate or random.random() >= self.config.error_rate:
+            return False
+        body = b'{"error":"injected"}'
+        self.send_response(503)
+        self.send_header('Retry-After', '0')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stats.add(endpoint, bytes_in=bytes_in, bytes_out=len(body), injected_error=True)
+        return True
+
+    def send_json(self, endpoint, payload, bytes_in=0, status=200):
+        body = json.dumps(payload).encode()
+        if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            body = gzip.compress(body, compresslevel=1)
+            encoding = 'gzip'
+        else:
+            encoding = None
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stats.add(endpoint, bytes_in=bytes_in, bytes_out=len(body))
+
+    def send_not_found(self, endpoint, bytes_in=0):
+        self.send_json(endpoint, {'error': 'not found', 'path': self.path}, bytes_in, status=404)
+
+
+class SupabaseHandler(StandInHandler):
+    def do_GET(self):
+        parts = urllib.parse.urlsplit(self.path)
+        if parts.path.startswith('/storage/v1/object/public/'):
+            self.get_object(urllib.parse.unquote(parts.path[len('/storage/v1/object/public/'):]))
+        elif parts.path.startswith('/rest/v1/'):
+            self.get_table(parts.path[len('/rest/v1/'):], urllib.parse.parse_qsl(parts.query))
+        elif parts.path == '/storage/v1/bucket':
+            self.delay()
+            self.send_json('supabase-list', [{'id': name, 'name': name} for name in sorted(self.server.objects)], 0)
+        else:
+            self.send_not_found('supabase-other')
+
+    def do_POST(self):
+        body, length = self.read_body()
+        path = urllib.parse.urlsplit(self.path).path
+        if not path.startswith('/storage/v1/object/list/'):
+            return self.send_not_found('supabase-other', length)
+        self.delay()
+        if self.inject_error('supabase-list', length):
+            return
+        bucket = urllib.parse.unquote(path[len('/storage/v1/object/list/'):])
+        payload = json.loads(body or b'{}')
+        entries = self.server.list_folder(bucket, payload.get('prefix', ''))
+        offset = int(payload.get('offset', 0))
+        self.send_json('supabase-list', entries[offset:offset + int(payload.get('limit', 100))], length)
+
+    def get_object(self, object_path):
+        self.delay()
+        if self.inject_error('supabase-storage', 0):
+            return
+        size = self.config.object_size_for(object_path)
+        etag = object_etag(object_path, size)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.server.stats.add('supabase-storage')
+            return
+        start, end = self.requested_range(size, etag)
+        if start is None:
+            self.send_response(200)
+            start, end = 0, size - 1
+        else:
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        length = end + 1 - start
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        self.end_headers()
+        for chunk in iter_object_content(object_path, start, length):
+            self.wfile.write(chunk)
+        self.server.stats.add('supabase-storage', bytes_out=length)
+
+    def requested_range(self, size, etag):
+        """(start, end) of a satisfiable single `Range: bytes=a-b` whose If-Range matches, else (None, None)"""
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range') or '')
+        if_range = self.headers.get('If-Range')
+        if not match or (if_range and if_range != etag) or int(match.group(1)) >= size:
+            return None, None
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        return (start, end) if end >= start else (None, None)
+
+    def get_table(self, table, params):
+        self.delay()
+        if self.inject_error('supabase-rest', 0):
+            return
+        ids = _TableIds(self.config.table_rows)
+        start, stop = 0, len(ids)
+        select = ['id']
+        limit = None
+        for name, value in params:
+            if name == 'select':
+                select = value.split(',')
+            elif name == 'limit':
+                limit = int(value)
+            elif name == 'id' and '.' in value:
+                op, operand = value.split('.', 1)
+                operand = operand.strip('"')
+                if op == 'gt':
+                    start = max(start, bisect_right(ids, operand))
+                elif op == 'gte':
+                    start = max(start, bisect_left(ids, operand))
+                elif op == 'lt':
+                    stop = min(stop, bisect_left(ids, operand))
+        if limit is not None:
+            stop = min(stop, start + limit)
+        rows = [self.server.table_row(table, index, ids[index], select) for index in range(start, stop)]
+        self.send_json('supabase-rest', rows)
+
+
+class NhostHandler(StandInHandler):
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if not path.startswith('/v1/files/'):
+            return self.send_not_found('nhost-other')
+        self.delay()
+        if self.inject_error('nhost-storage', 0):
+            return
+        content = self.server.contents.get(path[len('/v1/files/'):])
+        if content is None:
+            return self.send_not_found('nhost-storage')
+        spool_path, offset, size, content_type = content
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(size))
+        self.end_headers()
+        with open(spool_path, 'rb') as f:
+            f.seek(offset)
+            remaining = size
+            while remaining:
+                chunk = f.read(min(remaining, READ_CHUNK_SIZE))
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+        self.server.stats.add('nhost-storage', bytes_out=size)
+
+    def do_DELETE(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if not path.startswith('/v1/files/'):
+            return self.send_not_found('nhost-other')
+        self.delay()
+        if self.inject_error('nhost-storage', 0):
+            return
+        if not self.server.delete_upload(path[len('/v1/files/'):]):
+            return self.send_not_found('nhost-storage')
+        self.send_response(204)
+        self.end_headers()
+        self.server.stats.add('nhost-storage')
+
+    def do_POST(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path == '/v1/files':
+            self.upload_file()
+        elif path == '/v2/query':
+            self.run_sql()
+        elif path == '/v1/graphql':
+            self.graphql()
+        else:
+            _, length = self.read_body()
+            self.send_not_found('nhost-other', length)
+
+    def upload_file(self):
+        spool = None
+        if self.server.upload_dir:
+            spool = tempfile.NamedTemporaryFile(dir=self.server.upload_dir, delete=False)
+        boundary = re.search(r'boundary=(\S+)', self.headers.get('Content-Type', ''))
+        with spool or open(os.devnull, 'wb') as sink:
+            # storage.files gets the file part's own size and content MD5 ETag, as on hasura-storage
+            digest = FilePartDigest(boundary.group(1), sink) if boundary else sink
+            head, length = self.read_body(keep=4096, sink=digest)
+        self.delay()
+        if self.inject_error('nhost-storage', length):
+            return
+        text = head.decode('utf-8', 'replace')
+        bucket = re.search(r'name="bucket-id"\r\n\r\n([^\r]*)', text)
+        filename = re.search(r'filename="([^"]*)"', text)
+        part_type = re.search(r'filename="[^"]*"\r\nContent-Type: ([^\r]*)', text)
+        if not (bucket and filename and boundary and digest.offset is not None):
+            return self.send_json('nhost-storage', {'error': 'malformed upload'}, length, status=400)
+
+        content = None
+        if spool:
+            content = (spool.name, digest.offset, digest.size,
+                       part_type.group(1) if part_type else 'application/octet-stream')
+        record = self.server.register_upload(bucket.group(1), filename.group(1), digest.size, digest.etag, content)
+        self.send_json('nhost-storage', {'processedFiles': [record]}, length, status=201)
+
+    def run_sql(self):
+        body, length = self.read_body()
+        self.delay()
+        if self.inject_error('nhost-sql', length):
+            return
+        sql = json.loads(body)['args']['sql']
+        self.send_json('nhost-sql', self.server.answer_sql(sql), length)
+
+    def graphql(self):
+        body, length = self.read_body()
+        self.delay()
+        if self.inject_error('nhost-graphql', length):
+            return
+        payload = json.loads(body)
+        variables = payload.get('variables') or {}
+        if 'keys' in variables:
+            field = 'id' if '{id: {_in' in payload.get('query', '') else 'name'
+            returning = [{field: key} for key in variables['keys']]
+        elif 'filenames' in variables:
+            returning = [{'name': name} for name in variables['filenames']]
+        else:
+            returning = [{'id': str(uuid.uuid4()), 'name': variables.get('filename'),
+                          'bucketId': variables.get('newBucket')}]
+        data = {'updateFiles': {'affected_rows': len(returning), 'returning': returning}}
+        self.send_json('nhost-graphql', {'data': data}, length)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler, config, stats, objects=None, upload_dir=None):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.config = config
+        self.stats = stats
+        self.objects = objects or {}
+        self.upload_dir = upload_dir
+        self.contents = {}
+        self.uploads = []
+        self._uploads_lock = threading.Lock()
+        self._folders = {}
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def list_folder(self, bucket, prefix):
+        """Entries directly under prefix, folders first as id-less placeholders (like Supabase)"""
+        key = (bucket, prefix.strip('/'))
+        if key not in self._folders:
+            folder = key[1]
+            folders, files = set(), []
+            for path in self.objects.get(bucket, ()):
+                path = path.lstrip('/')
+                if folder and not path.startswith(folder + '/'):
+                    continue
+                rest = path[len(folder) + 1:] if folder else path
+                if '/' in rest:
+                    folders.add(rest.split('/', 1)[0])
+                else:
+                    full = f'{folder}/{rest}' if folder else rest
+                    # Sized and hashed by "bucket/path", exactly as get_object serves it
+                    size = self.config.object_size_for(f'{bucket}/{full}')
+                    etag = object_etag(f'{bucket}/{full}', size)
+                    files.append({'name': rest, 'id': str(uuid.uuid5(uuid.NAMESPACE_URL, f'{bucket}/{full}')),
+                                  'metadata': {'size': size, 'eTag': etag}})
+            entries = [{'name': name, 'id': None, 'metadata': None} for name in sorted(folders)]
+            self._folders[key] = entries + sorted(files, key=lambda entry: entry['name'])
+        return self._folders[key]
+
+    def table_row(self, table, index, row_id, select):
+        rng = random.Random(index ^ zlib.crc32(table.encode()))
+        row = {}
+        for column in select:
+            if column == 'id':
+                row[column] = row_id
+            elif column in GENERATED_VALUES:
+                row[column] = rng.choice(GENERATED_VALUES[column])
+            else:
+                row[column] = f'{column}-{index}'
+        return row
+
+    def register_upload(self, bucket, name, size, etag, content=None):
+        """Add an upload to storage.files; content is (spool path, offset, size, type) for downloads"""
+        record = {'id': str(uuid.uuid4()), 'name': name, 'bucketId': bucket, 'size': size,
+                  'etag': etag, 'createdAt': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        with self._uploads_lock:
+            record['createdAt'] += f'.{len(self.uploads):06d}Z'
+            self.uploads.append(record)
+            if content:
+                self.contents[record['id']] = content
+        return record
+
+    def delete_upload(self, file_id):
+        """Remove an upload from storage.files; False if there is none with that id"""
+        with self._uploads_lock:
+            kept = [u for u in self.uploads if u['id'] != file_id]
+            found = len(kept) < len(self.uploads)
+            self.uploads[:] = kept
+            self.contents.pop(file_id, None)
+        return found
+
+    def answer_sql(self, sql):
+        """Plausible run_sql results: batched UPDATEs report their VALUES rows, storage.files pages the uploads"""
+        if 'FROM storage.files' in sql:
+            with self._uploads_lock:
+                uploads = list(self.uploads)
+            after = re.search(r"> \('([^']*)'::timestamptz, '([^']*)'::uuid\)", sql)
+            if after:
+                uploads = [u for u in uploads if (u['createdAt'], u['id']) > after.groups()]
+            limit = re.search(r'LIMIT (\d+)', sql)
+            uploads = uploads[:int(limit.group(1))] if limit else uploads
+            rows = [[u['id'], u['bucketId'], u['name'], str(u['size']), u['etag'], u['createdAt']] for u in uploads]
+            return {'result_type': 'TuplesOk', 'result': [['id', 'bucket_id', 'name', 'size', 'etag', 'created_at']] + rows}
+        if 'RETURNING 1' in sql and 'FROM (VALUES' in sql:
+            values = sql.split('FROM (VALUES', 1)[1].split(') AS v(', 1)[0]
+            return {'result_type': 'TuplesOk', 'result': [['count'], [str(len(re.findall(r'^\s*\(', values, re.M)))]]}
+        if re.match(r'\s*(SELECT|WITH)\b', sql, re.I):
+            return {'result_type': 'TuplesOk', 'result': [['result']]}
+        return {'result_type': 'CommandOk', 'result': None}
+
+
+class StandIns:
+    """A Supabase and an Nhost stand-in sharing one config and one set of counters"""
+
+    def __init__(self, config=None, objects=None, upload_dir=None):
+        """upload_dir: keep uploaded file bodies there so they can be downloaded again (e.g. to verify)"""
+        self.config = config or StandInConfig()
+        self.stats = RequestStats()
+        self.supabase = StandInServer(SupabaseHandler, self.config, self.stats, objects)
+        self.nhost = StandInServer(NhostHandler, self.config, self.stats, upload_dir=upload_dir)
+
+    def environment(self):
+        """Environment variables that point the scripts at the stand-ins"""
+        return {
+            'SUPABASE_URL': self.supabase.url,
+            'SUPABASE_PROJECT_ID': 'stand-in',
+            'SUPABASE_KEY': 'stand-in-key',
+            'SUPABASE_ANON_KEY': 'stand-in-key',
+            'NHOST_STORAGE_URL': self.nhost.url,
+            'NHOST_HASURA_URL': self.nhost.url,
+            'NHOST_SUBDOMAIN': 'stand-in',
+            'NHOST_ADMIN_SECRET': 'stand-in-secret',
+        }
+
+    def __enter__(self):
+        self.supabase.start()
+        self.nhost.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.supabase.stop()
+        self.nhost.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve local Supabase/Nhost stand-ins until interrupted")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra uniform random latency, seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument('--object-size', type=int, default=256 * 1024, help="Median object size in bytes")
+    parser.add_argument('--size-spread', type=float, default=0.0, help="Log-normal sigma of object sizes")
+    parser.add_argument('--table-rows', type=int, default=10000, help="Rows served per REST table")
+    args = parser.parse_args(argv)
+
+    config = StandInConfig(args.latency, args.jitter, args.error_rate, args.object_size,
+                           args.size_spread, table_rows=args.table_rows)
+    with StandIns(config) as stand_ins:
+        for name, value in stand_ins.environment().items():
+            print(f"export {name}={value}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
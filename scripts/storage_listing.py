@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Storage listings for delta sync (standard library only)
+
+- Supabase: crawl_supabase_objects pages through the storage list API,
+  listing many folders in parallel, and streams objects out through a
+  bounded queue as they are found
+- Nhost: keyset-paginates storage.files through Hasura run_sql
+- compute_delta: hash-indexes the Nhost side and yields only source objects
+  that are missing or differ (size / ETag)
+"""
+
+import json
+import os
+import queue
+import threading
+import urllib.request
+
+import http_pool
+import request_executor
+from sql_batch import sql_literal
+
+SUPABASE_LIST_PAGE_SIZE = 1000
+CRAWL_WORKERS = 4
+CRAWL_QUEUE_SIZE = 10000
+NHOST_LIST_PAGE_SIZE = 5000
+
+
+def normalize_etag(etag):
+    """Strip weak-validator prefix and quotes so Supabase and Nhost ETags compare equal"""
+    if not etag:
+        return None
+    etag = etag.strip()
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    return etag.strip('"').lower() or None
+
+
+def list_supabase_page(supabase_url, api_key, bucket, prefix, offset, limit=SUPABASE_LIST_PAGE_SIZE):
+    """Fetch one page of the Supabase storage list API for `prefix` (folders and files)"""
+    payload = {
+        'prefix': prefix,
+        'limit': limit,
+        'offset': offset,
+        'sortBy': {'column': 'name', 'order': 'asc'},
+    }
+    req = urllib.request.Request(
+        f"{supabase_url}/storage/v1/object/list/{bucket}",
+        data=json.dumps(payload).encode(),
+        method='POST'
+    )
+    req.add_header('Content-Type', 'application/json')
+    req.add_header('apikey', api_key)
+    req.add_header('Authorization', f'Bearer {api_key}')
+
+    def fetch():
+        with http_pool.urlopen(req, timeout=30) as response:
+            return json.loads(response.read())
+
+    return request_executor.run('supabase-storage', fetch)
+
+
+def list_supabase_buckets(supabase_url, api_key):
+    """Names of every bucket in the Supabase project (needs the service role key)"""
+    req = urllib.request.Request(f"{supabase_url}/storage/v1/bucket")
+    req.add_header('apikey', api_key)
+    req.add_header('Authorization', f'Bearer {api_key}')
+
+    def fetch():
+        with http_pool.urlopen(req, timeout=30) as response:
+            return json.loads(response.read())
+
+    return sorted(bucket['name'] for bucket in request_executor.run('supabase-storage', fetch))
+
+
+def _object_record(bucket, path, entry):
+    metadata = entry.get('metadata') or {}
+    return {
+        'bucket': bucket,
+        'path': path,
+        'size': metadata.get('size', metadata.get('contentLength')),
+        'etag': normalize_etag(metadata.get('eTag')),
+    }
+
+
+def iter_nhost_files(run_sql, page_size=NHOST_LIST_PAGE_SIZE):
+    """Yield {'id', 'bucket', 'name', 'size', 'etag'} for every row in storage.files, oldest first per key
+
+    Uses keyset pagination on (created_at, id) so each page is an index range
+    scan rather than an ever-growing OFFSET.
+    """
+    last = None
+    while True:
+        where = ''
+        if last:
+            where = (f" WHERE (created_at, id) > ({sql_literal(last[0])}::timestamptz, "
+                     f"{sql_literal(last[1])}::uuid)")
+        result = run_sql(
+            "SELECT id, bucket_id, name, size, etag, created_at FROM storage.files"
+            f"{where} ORDER BY created_at, id LIMIT {int(page_size)};"
+        )
+        if 'error' in result or result.get('result_type') != 'TuplesOk':
+            raise RuntimeError(f"Listing storage.files failed: {result}")
+        rows = result['result'][1:]
+        for file_id, bucket_id, name, size, etag, _ in rows:
+            yield {
+                'id': file_id,
+                'bucket': bucket_id,
+                'name': name,
+                'size': int(size) if size not in (None, 'NULL') else None,
+                'etag': normalize_etag(etag),
+            }
+        if len(rows) < page_size:
+            break
+        last = (rows[-1][5], rows[-1][0])
+
+
+def crawl_supabase_objects(supabase_url, api_key, roots, workers=CRAWL_WORKERS,
+                           page_size=SUPABASE_LIST_PAGE_SIZE, max_queued=CRAWL_QUEUE_SIZE):
+    """Yield objects under every (bucket, prefix) in `roots`, listing folders in parallel
+
+    Each folder found becomes its own listing task, so sibling prefixes such
+    as documents/ and documents/activity_overview/ are paged concurrently by
+    `workers` threads. Objects are handed over through a queue of at most
+    `max_queued` entries: the consumer sees the first objects after one page,
+    and memory stays flat however large the buckets are, because listing
+    pauses while the consumer is busy. Order is not deterministic. A listing
+    error is raised in the consumer; closing the generator stops the crawl.
+    """
+    folders = queue.Queue()
+    found = queue.Queue(maxsize=max_queued)
+    stop = threading.Event()
+    outstanding = [0]
+    lock = threading.Lock()
+    done = object()
+
+    def put(item):
+        # Blocks while the consumer is behind, but gives up once the crawl is stopped
+        while not stop.is_set():
+            try:
+                found.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def add_folder(bucket, prefix):
+        with lock:
+            outstanding[0] += 1
+        folders.put((bucket, prefix))
+
+    def list_folder(bucket, folder):
+        offset = 0
+        while not stop.is_set():
+            page = list_supabase_page(supabase_url, api_key, bucket, folder, offset, page_size)
+            for entry in page:
+                path = f"{folder}/{entry['name']}" if folder else entry['name']
+                # Folders come back as placeholder entries without an id
+                if entry.get('id') is None:
+                    add_folder(bucket, path)
+                elif not put(_object_record(bucket, path, entry)):
+                    return
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    def lister():
+        while not stop.is_set():
+            task = folders.get()
+            if task is None:
+                return
+            bucket, folder = task
+            try:
+                list_folder(bucket, folder)
+            except Exception as e:
+                put(e)
+                stop.set()
+            with lock:
+                outstanding[0] -= 1
+                finished = outstanding[0] == 0
+            if finished:
+                put(done)
+                return
+
+    roots = list(roots)
+    if not roots:
+        return
+    for bucket, prefix in roots:
+        add_folder(bucket, prefix.strip('/'))
+    threads = [threading.Thread(target=lister, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            item = found.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Wake idle listers and any blocked on a full queue so they see the stop
+        stop.set()
+        for _ in threads:
+            folders.put(None)
+        while True:
+            try:
+                found.get_nowait()
+            except queue.Empty:
+                break
+        for thread in threads:
+            thread.join()
+
+
+def build_nhost_index(nhost_files):
+    """Hash index (bucket, name) -> latest Nhost file; later uploads of the same name win"""
+    return {(f['bucket'], f['name']): f for f in nhost_files}
+
+
+def compute_delta(source_objects, nhost_index):
+    """Yield (object, reason, existing_nhost_file) for source objects missing from or differing in Nhost
+
+    Nhost stores the basename as the file name, so objects are matched on
+    (bucket, basename). ETags are only compared when both sides have a
+    simple (non-multipart) one; otherwise size decides.
+    """
+    for obj in source_objects:
+        existing = nhost_index.get((obj['bucket'], os.path.basename(obj['path'])))
+        if existing is None:
+            yield obj, 'new', None
+            continue
+        if obj['size'] is not None and existing['size'] is not None and int(obj['size']) != existing['size']:
+            yield obj, 'changed', existing
+            continue
+        source_etag, target_etag = obj['etag'], existing['etag']
+        if source_etag and target_etag and '-' not in source_etag and source_etag != target_etag:
+            yield obj, 'changed', existing
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Streaming detection of Nhost storage files that no database row references (standard library only)
+
+References are the values in the columns of url_rewrite's
+REFERENCING_COLUMNS, resolved to file ids. After 00013_convert_urls_to_uuids.sql
+they are bare ids, and Nhost file URLs before it carry the id too. Supabase
+URLs, the path-based Nhost URLs of the old 00012 and bare file names carry no
+id and are resolved through storage.files on (bucket_id, name). While any
+non-empty value still resolves to no file, nothing is reported or deleted: a
+file it was meant to reference would look like an orphan.
+
+storage.files is paged in id order, and every file that is not referenced
+is an orphan candidate. Two ways of knowing the referenced ids keep memory
+flat:
+
+- merge: the distinct referenced ids are paged in the same order, and the two
+  sorted streams are merged like a merge join. Exact, and holds one page of
+  each side at a time. Each reference page re-reads the referencing columns,
+  so the cost grows with the number of references.
+- bloom: the referencing tables are read once in primary key order into a
+  Bloom filter, which is then probed for every file. A false positive only
+  keeps an orphan; a referenced file is never reported. Memory is about
+  1.8 bytes per reference at a 0.1% false positive rate.
+
+Files newer than a minimum age are never candidates, so an upload whose row
+has not been saved yet is not mistaken for an orphan. Candidates are written
+to a JSONL report; deleting them re-checks every batch against the current
+references first.
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+
+from sql_batch import sql_identifier, sql_literal
+from url_rewrite import KEY_COLUMN, REFERENCING_COLUMNS
+
+DEFAULT_PAGE_SIZE = 5000
+DEFAULT_MIN_AGE_HOURS = 24
+DEFAULT_FALSE_POSITIVE_RATE = 0.001
+# Above this many references, auto mode reads them once into a Bloom filter instead of merge paging
+DEFAULT_BLOOM_THRESHOLD = 100_000
+UUID_PATTERN = '[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+# "{bucket}/{path}" of a Supabase object URL, and of the path-based Nhost URL the old 00012 wrote
+SUPABASE_PATH_PATTERN = '/storage/v1/object/(?:public|sign|authenticated)/([^?#]+)'
+NHOST_PATH_PATTERN = '/v1/files/([^/?#]+/[^?#]+)'
+
+
+def _values_select(table, column, is_array, key_column=None):
+    """SELECT of every non-empty value of one column as `value` (and the row key as `key`)"""
+    c = sql_identifier(column)
+    key = f"t.{sql_identifier(key_column)} AS key, " if key_column else ''
+    if is_array:
+        return (f"SELECT {key}u.value FROM {sql_identifier(table)} AS t, unnest(t.{c}) AS u(value) "
+                f"WHERE coalesce(u.value, '') <> ''")
+    return f"SELECT {key}t.{c} AS value FROM {sql_identifier(table)} AS t WHERE coalesce(t.{c}, '') <> ''"
+
+
+def _resolved(values_sql):
+    """The rows of values_sql with `ref`, the file id each value points at (NULL if it points at none)
+
+    A Supabase or path-based Nhost URL is resolved through storage.files on
+    (bucket_id, name), since Nhost stores the basename as the name. Any other
+    value counts by the UUID in it, and a value with neither is taken as a
+    bare file name. A value matching several files references all of them.
+    """
+    return (
+        f"SELECT v.*, coalesce(f.id::text, p.id) AS ref FROM (\n  {values_sql}\n) AS v\n"
+        f"CROSS JOIN LATERAL (SELECT coalesce(substring(v.value from {sql_literal(SUPABASE_PATH_PATTERN)}), "
+        f"substring(v.value from {sql_literal(NHOST_PATH_PATTERN)})) AS path, "
+        f"substring(lower(v.value) from {sql_literal(UUID_PATTERN)}) AS uuid) AS q\n"
+        "CROSS JOIN LATERAL (SELECT CASE WHEN q.path IS NULL THEN q.uuid END AS id, "
+        "split_part(q.path, '/', 1) AS bucket,\n"
+        "  CASE WHEN q.path IS NOT NULL THEN regexp_replace(q.path, '^.*/', '')\n"
+        "       WHEN q.uuid IS NULL THEN regexp_replace(split_part(v.value, '?', 1), '^.*/', '') END AS name) AS p\n"
+        "LEFT JOIN storage.files AS f ON f.name = p.name AND (p.bucket IS NULL OR f.bucket_id = p.bucket)"
+    )
+
+
+def references_sql(columns=REFERENCING_COLUMNS):
+    """Every non-empty referencing value with the file id it resolves to as `ref` (NULL if none)"""
+    values = '\n  UNION ALL\n  '.join(_values_select(table, column, is_array) for table, column, is_array in columns)
+    return _resolved(values)
+
+
+def files_page_sql(after, page_size, buckets=None, min_age_hours=DEFAULT_MIN_AGE_HOURS):
+    """One keyset page of storage.files in id order, skipping files newer than min_age_hours"""
+    conditions = [f"created_at < now() - interval '{float(min_age_hours)} hours'"]
+    if after:
+        conditions.append(f"id > {sql_literal(after)}::uuid")
+    if buckets:
+        conditions.append(f"bucket_id IN ({', '.join(sql_literal(bucket) for bucket in buckets)})")
+    return (f"SELECT id::text, bucket_id, name, size, created_at FROM storage.files\n"
+            f"WHERE {' AND '.join(conditions)}\nORDER BY id LIMIT {int(page_size)};")
+
+
+def sorted_references_page_sql(after, page_size, columns=REFERENCING_COLUMNS):
+    """One page of distinct referenced file ids in the order storage.files is paged"""
+    after_condition = f" AND ref COLLATE \"C\" > {sql_literal(after)}" if after else ''
+    return (f"SELECT DISTINCT ref COLLATE \"C\" AS ref FROM (\n{references_sql(columns)}\n) AS r\n"
+            f"WHERE ref IS NOT NULL{after_condition}\nORDER BY 1 LIMIT {int(page_size)};")
+
+
+def column_references_page_sql(table, column, is_array, after, page_size, key_column=KEY_COLUMN):
+    """One primary key page of a table: (key, space-separated file ids the column resolves to)"""
+    k, c = sql_identifier(key_column), sql_identifier(column)
+    where = f"WHERE t.{k} > {sql_literal(after)}\n  " if after is not None else ''
+    values = _values_select('page', 'value', is_array, 'key')
+    return (f"WITH page AS (\n  SELECT t.{k} AS key, t.{c} AS value FROM {sql_identifier(table)} AS t\n  "
+            f"{where}ORDER BY t.{k} LIMIT {int(page_size)}\n)\n"
+            f"SELECT page.key::text, coalesce(string_agg(r.ref, ' '), '') FROM page\n"
+            f"LEFT JOIN (\n{_resolved(values)}\n) AS r ON r.key = page.key\n"
+            "GROUP BY page.key ORDER BY page.key;")
+
+
+def count_references_sql(columns=REFERENCING_COLUMNS):
+    return f"SELECT count(ref) FROM (\n{references_sql(columns)}\n) AS r;"
+
+
+def unresolved_references_sql(columns=REFERENCING_COLUMNS):
+    """Per column: (table.column, values that resolve to no file, one such value)"""
+    selects = [f"SELECT {sql_literal(f'{table}.{column}')}, count(*), min(value) FROM (\n"
+               f"{_resolved(_values_select(table, column, is_array))}\n) AS r WHERE ref IS NULL"
+               for table, column, is_array in columns]
+    return '\nUNION ALL\n'.join(selects) + ';'
+
+
+def referenced_among_sql(file_ids, columns=REFERENCING_COLUMNS):
+    """Which of file_ids are referenced right now (re-checked before deleting); NULL if any value is unresolved"""
+    candidates = ', '.join(sql_literal(file_id) for file_id in file_ids)
+    return (f"SELECT DISTINCT ref FROM (\n{references_sql(columns)}\n) AS r\n"
+            f"WHERE ref IN ({candidates}) OR ref IS NULL;")
+
+
+class UnresolvedReferences(RuntimeError):
+    """Referencing values point at no storage file, so an orphan cannot be told from a file they mean"""
+
+    def __init__(self, unresolved):
+        self.unresolved = unresolved
+        self.total = sum(count for _, count, _ in unresolved)
+        columns = ', '.join(f"{column}: {count}" for column, count, _ in unresolved)
+        super().__init__(f"{self.total} referencing values resolve to no storage file ({columns}); "
+                         "rewrite them to file ids (00012/00013) before looking for orphans")
+
+
+class NhostReferences:
+    """storage.files and the referencing columns, read through run_sql"""
+
+    def __init__(self, run_sql, page_size=DEFAULT_PAGE_SIZE, columns=REFERENCING_COLUMNS):
+        self.run_sql = run_sql
+        self.page_size = page_size
+        self.columns = columns
+        self.queries = 0
+
+    def _rows(self, sql):
+        self.queries += 1
+        result = self.run_sql(sql)
+        if 'error' in result or result.get('result_type') != 'TuplesOk':
+            raise RuntimeError(f"Nhost query failed: {result.get('error', result)}")
+        return result['result'][1:]
+
+    def iter_files(self, buckets=None, min_age_hours=DEFAULT_MIN_AGE_HOURS):
+        """Yield {'id', 'bucket', 'name', 'size', 'created_at'} for storage.files in id order"""
+        after = None
+        while True:
+            rows = self._rows(files_page_sql(after, self.page_size, buckets, min_age_hours))
+            for file_id, bucket, name, size, created_at in rows:
+                yield {'id': file_id, 'bucket': bucket, 'name': name,
+                       'size': int(size) if size not in (None, 'NULL') else None, 'created_at': created_at}
+            if len(rows) < self.page_size:
+                return
+            after = rows[-1][0]
+
+    def iter_sorted_references(self):
+        """Yield every distinct referenced file id in ascending order"""
+        after = None
+        while True:
+            rows = self._rows(sorted_references_page_sql(after, self.page_size, self.columns))
+            for (ref,) in rows:
+                yield ref
+            if len(rows) < self.page_size:
+                return
+            after = rows[-1][0]
+
+    def iter_references(self):
+        """Yield every referenced file id (with repeats), one primary key page of one column at a time"""
+        for table, column, is_array in self.columns:
+            after = None
+            while True:
+                rows = self._rows(column_references_page_sql(table, column, is_array, after, self.page_size))
+                for _, refs in rows:
+                    yield from (ref for ref in refs.split(' ') if ref and ref != 'NULL')
+                if len(rows) < self.page_size:
+                    break
+                after = rows[-1][0]
+
+    def count_references(self):
+        return int(self._rows(count_references_sql(self.columns))[0][0])
+
+    def unresolved(self):
+        """[(table.column, count, example value)] for columns with values that resolve to no file"""
+        return [(column, int(count), example) for column, count, example
+                in self._rows(unresolved_references_sql(self.columns)) if int(count)]
+
+    def check_resolved(self):
+        """Raise UnresolvedReferences unless every referencing value resolves to a file id"""
+        unresolved = self.unresolved()
+        if unresolved:
+            raise UnresolvedReferences(unresolved)
+
+    def referenced_among(self, file_ids):
+        """Which of file_ids are referenced now; raises UnresolvedReferences if any value has become unresolvable"""
+        if not file_ids:
+            return set()
+        refs = {ref for (ref,) in self._rows(referenced_among_sql(file_ids, self.columns))}
+        if refs & {None, 'NULL'}:
+            self.check_resolved()
+        return refs - {None, 'NULL'}
+
+
+class BloomFilter:
+    """Fixed-size set membership with false positives only (k hashes from one blake2b digest)"""
+
+    def __init__(self, capacity, false_positive_rate=DEFAULT_FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+def merge_orphans(files, sorted_refs):
+    """Files (in id order) whose id is not in sorted_refs (ascending): a streaming anti-join"""
+    refs = iter(sorted_refs)
+    ref = next(refs, None)
+    for file in files:
+        while ref is not None and ref < file['id']:
+            ref = next(refs, None)
+        if ref != file['id']:
+            yield file
+
+
+def bloom_orphans(files, bloom):
+    """Files the Bloom filter of referenced ids certainly does not contain"""
+    return (file for file in files if file['id'] not in bloom)
+
+
+def find_orphans(source, method='auto', buckets=None, min_age_hours=DEFAULT_MIN_AGE_HOURS,
+                 bloom_threshold=DEFAULT_BLOOM_THRESHOLD, false_positive_rate=DEFAULT_FALSE_POSITIVE_RATE,
+                 on_method=None):
+    """Yield orphan candidates from `source` (NhostReferences) with the merge or Bloom method
+
+    Raises UnresolvedReferences, before anything is scanned, while a
+    referencing value resolves to no file id. on_method(method,
+    reference_count) is called once the method is chosen; the count is None
+    when it was not needed.
+    """
+    source.check_resolved()
+    count = None
+    if method != 'merge':
+        count = source.count_references()
+        if method == 'auto':
+            method = 'bloom' if count > bloom_threshold else 'merge'
+    if on_method:
+        on_method(method, count)
+    files = source.iter_files(buckets, min_age_hours)
+    if method == 'merge':
+        return merge_orphans(files, source.iter_sorted_references())
+    bloom = BloomFilter(count, false_positive_rate)
+    for ref in source.iter_references():
+        bloom.add(ref)
+    return bloom_orphans(files, bloom)
+
+
+def write_report(path, orphans):
+    """Stream orphan candidates to a JSONL report; returns (count, total bytes)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    count = total = 0
+    with open(path, 'w') as f:
+        for orphan in orphans:
+            f.write(json.dumps(orphan, separators=(',', ':')) + '\n')
+            count += 1
+            total += orphan['size'] or 0
+    return count, total
+
+
+def iter_report(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def delete_orphans(source, report_path, delete_file, batch_size=100, pause=0.0, on_batch=None):
+    """Delete the report's candidates in batches, re-checking each batch against the references first
+
+    delete_file(file_id) returns (deleted, error); a file that is already gone
+    should count as deleted. Raises UnresolvedReferences, before the first or
+    any later batch, while a referencing value resolves to no file id. on_batch(summary) is called after every batch.
+    Returns {'deleted', 'bytes_deleted', 'now_referenced', 'failed': [{'id', 'error'}]}.
+    """
+    source.check_resolved()
+    summary = {'deleted': 0, 'bytes_deleted': 0, 'now_referenced': 0, 'failed': []}
+    batch = []
+
+    def flush():
+        referenced = source.referenced_among([orphan['id'] for orphan in batch])
+        for orphan in batch:
+            if orphan['id'] in referenced:
+                summary['now_referenced'] += 1
+                continue
+            deleted, error = delete_file(orphan['id'])
+            if deleted:
+                summary['deleted'] += 1
+                summary['bytes_deleted'] += orphan['size'] or 0
+            else:
+                summary['failed'].append({'id': orphan['id'], 'error': error})
+        batch.clear()
+        if on_batch:
+            on_batch(summary)
+
+    for orphan in iter_report(report_path):
+        batch.append(orphan)
+        if len(batch) >= batch_size:
+            flush()
+            if pause:
+                time.sleep(pause)
+    if batch:
+        flush()
+    return summary
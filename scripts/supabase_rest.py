@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Paginated, streaming table reads from the Supabase REST API (standard library only)
+
+Rows are fetched with keyset pagination (`order=id.asc&id=gt.<last id>`)
+instead of one unbounded `select`, so tables larger than PostgREST's
+max-rows limit are read completely and only one page is in memory at a
+time. Responses are requested gzip-compressed; the compressed body is
+inflated chunk by chunk, but each page is still decoded as one JSON
+document, so memory is bounded by the page size rather than the table.
+"""
+
+import json
+import urllib.parse
+import urllib.request
+import zlib
+
+import http_pool
+import request_executor
+
+DEFAULT_PAGE_SIZE = 1000
+READ_CHUNK_SIZE = 64 * 1024
+
+_POSTGREST_RESERVED = set(',.:()"\\ ')
+
+
+def postgrest_value(value):
+    """Encode a filter value for a PostgREST query string, quoting reserved characters"""
+    text = str(value)
+    if any(c in _POSTGREST_RESERVED for c in text):
+        text = '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return urllib.parse.quote(text, safe='')
+
+
+def read_json_body(response):
+    """Decode a (possibly gzip-encoded) JSON response body
+
+    The body is read and inflated in chunks, so no compressed copy is held,
+    but the decoded page is joined before json.loads; keep pages small
+    (page_size) to keep memory down.
+    """
+    encoding = (response.headers.get('Content-Encoding') or '').lower()
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == 'gzip' else None
+    parts = []
+    while True:
+        chunk = response.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        parts.append(decompressor.decompress(chunk) if decompressor else chunk)
+    if decompressor:
+        parts.append(decompressor.flush())
+    return json.loads(b''.join(parts))
+
+
+def fetch_page(supabase_url, api_key, table, select_fields, key, after=None, before=None,
+               page_size=DEFAULT_PAGE_SIZE, start=None):
+    """Fetch one page of rows ordered by `key`, with after < key (or start <= key) and key < before"""
+    params = [f'select={select_fields}', f'order={key}.asc', f'limit={int(page_size)}']
+    if after is not None:
+        params.append(f'{key}=gt.{postgrest_value(after)}')
+    elif start is not None:
+        params.append(f'{key}=gte.{postgrest_value(start)}')
+    if before is not None:
+        params.append(f'{key}=lt.{postgrest_value(before)}')
+
+    req = urllib.request.Request(f"{supabase_url}/rest/v1/{table}?{'&'.join(params)}")
+    req.add_header('apikey', api_key)
+    req.add_header('Authorization', f'Bearer {api_key}')
+    req.add_header('Accept', 'application/json')
+    req.add_header('Accept-Encoding', 'gzip')
+
+    def fetch():
+        with http_pool.urlopen(req, timeout=60) as response:
+            return read_json_body(response)
+
+    return request_executor.run('supabase-rest', fetch)
+
+
+def iter_table_pages(supabase_url, api_key, table, select_fields, key='id',
+                     page_size=DEFAULT_PAGE_SIZE, start=None, before=None):
+    """Yield lists of rows page by page; `key` must be in select_fields and unique"""
+    after = None
+    while True:
+        page = fetch_page(supabase_url, api_key, table, select_fields, key, after, before, page_size, start)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = page[-1][key]
+
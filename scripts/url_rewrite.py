@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Exact storage URL -> Nhost file id rewrites (standard library only)
+
+The migration journal records the Nhost file id of every object as it is
+uploaded, so the database references can be rewritten from that index
+directly: each old Supabase URL maps to exactly one file id, with no
+filename matching against storage.files afterwards. Following
+00013_convert_urls_to_uuids.sql, references are rewritten to the bare file
+UUID.
+
+write_url_rewrite_sql() emits the whole rewrite as one reviewable script;
+rewrite_column() applies it to a live database in small keyset-paginated
+batches instead (see rewrite_storage_urls.py).
+"""
+
+import time
+import urllib.parse
+
+from migration_journal import STAGE_UPLOADED
+from sql_batch import chunked, sql_identifier, sql_literal
+
+# (table, column, is_array) for every column that stores storage URLs
+REFERENCING_COLUMNS = (
+    ('member', 'profile_image', False),
+    ('organisation', 'logo', False),
+    ('learning', 'thumbnail_url', False),
+    ('activities', 'media_files', True),
+    ('activities', 'overview_media_urls', True),
+    ('family', 'photos', True),
+)
+MAP_TABLE = 'storage_url_map'
+INSERT_CHUNK_SIZE = 1000
+
+
+def source_url_prefixes(supabase_base_url, nhost_subdomain=None):
+    """URL prefixes a migrated object may be referenced by, each followed by "{bucket}/{path}"
+
+    Besides the Supabase public URL this includes the path-based Nhost URL
+    written by earlier versions of 00012_update_storage_urls.sql.
+    """
+    prefixes = [f"{supabase_base_url}/storage/v1/object/public/"]
+    if nhost_subdomain:
+        prefixes.append(f"https://{nhost_subdomain}.storage.run.app/v1/files/")
+    return prefixes
+
+
+def iter_url_mappings(journal_entries, prefixes):
+    """Yield (old_url, nhost_file_id) for every uploaded (or aliased) object in the journal"""
+    for key, entry in journal_entries.items():
+        if entry['stage'] != STAGE_UPLOADED or not entry.get('nhost_id'):
+            continue
+        variants = {key, urllib.parse.quote(key)}
+        for prefix in prefixes:
+            for variant in sorted(variants):
+                yield prefix + variant, entry['nhost_id']
+
+
+def _rewrite_parts(column, is_array, map_table):
+    """(SET clause, extra FROM item, WHERE condition) rewriting t.column through the mapping table"""
+    c, m = sql_identifier(column), sql_identifier(map_table)
+    if not is_array:
+        return f"{c} = m.new_value", f"{m} AS m", f"t.{c} = m.old_url"
+    # Rebuild the array in its original order, replacing only mapped elements
+    set_clause = (f"{c} = ARRAY(\n"
+                  f"  SELECT COALESCE(m.new_value, u.url)\n"
+                  f"  FROM unnest(t.{c}) WITH ORDINALITY AS u(url, position)\n"
+                  f"  LEFT JOIN {m} AS m ON m.old_url = u.url\n"
+                  f"  ORDER BY u.position\n"
+                  f")")
+    return set_clause, None, f"EXISTS (SELECT 1 FROM unnest(t.{c}) AS u(url) JOIN {m} AS m ON m.old_url = u.url)"
+
+
+def rewrite_statement(table, column, is_array, map_table=MAP_TABLE):
+    """UPDATE replacing mapped URLs in one scalar or array column via the mapping table"""
+    set_clause, from_item, condition = _rewrite_parts(column, is_array, map_table)
+    from_clause = f"\nFROM {from_item}" if from_item else ''
+    return f"UPDATE {sql_identifier(table)} AS t SET {set_clause}{from_clause}\nWHERE {condition};"
+
+
+def write_url_rewrite_sql(path, mappings, columns=REFERENCING_COLUMNS, header=None):
+    """Write a transactional script loading `mappings` into a temp table and rewriting every column
+
+    Returns the number of URL mappings written.
+    """
+    count = 0
+    m = sql_identifier(MAP_TABLE)
+    with open(path, 'w') as f:
+        if header:
+            f.write(''.join(f"-- {line}\n" for line in header) + "\n")
+        f.write("BEGIN;\n\n")
+        f.write(f"CREATE TEMP TABLE {m} (old_url TEXT PRIMARY KEY, new_value TEXT NOT NULL) ON COMMIT DROP;\n\n")
+        for chunk in chunked(mappings, INSERT_CHUNK_SIZE):
+            values = ',\n  '.join(f"({sql_literal(old)}, {sql_literal(new)})" for old, new in chunk)
+            f.write(f"INSERT INTO {m} (old_url, new_value) VALUES\n  {values}\nON CONFLICT (old_url) DO NOTHING;\n\n")
+            count += len(chunk)
+        f.write(f"ANALYZE {m};\n\n")
+        for table, column, is_array in columns:
+            f.write(f"-- {table}.{column}\n{rewrite_statement(table, column, is_array)}\n\n")
+        f.write("COMMIT;\n")
+    return count
+
+
+# Live executor: Hasura run_sql gives every request its own transaction (and
+# possibly its own pooled connection), so the mapping lives in an unlogged work
+# table rather than a session temp table, and each batch commits on its own.
+WORK_TABLE = 'storage_url_rewrite_map'
+DEFAULT_BATCH_SIZE = 500
+KEY_COLUMN = 'id'
+STAGE_BATCH = 'batch'
+STAGE_DONE = 'done'
+
+
+def load_mapping_table(run_sql, mappings, chunk_size=INSERT_CHUNK_SIZE, map_table=WORK_TABLE):
+    """Create the mapping work table if needed and upsert `mappings` into it
+
+    Returns (mappings_loaded, errors); reloading after an interrupted run is harmless.
+    """
+    m = sql_identifier(map_table)
+    result = run_sql(f"CREATE UNLOGGED TABLE IF NOT EXISTS {m} (old_url TEXT PRIMARY KEY, new_value TEXT NOT NULL);")
+    if 'error' in result:
+        return 0, [f"Creating {map_table} failed: {result['error']}"]
+    loaded = 0
+    errors = []
+    for chunk in chunked(mappings, chunk_size):
+        values = ',\n  '.join(f"({sql_literal(old)}, {sql_literal(new)})" for old, new in chunk)
+        result = run_sql(f"INSERT INTO {m} (old_url, new_value) VALUES\n  {values}\n"
+                         f"ON CONFLICT (old_url) DO UPDATE SET new_value = EXCLUDED.new_value;")
+        if 'error' in result:
+            errors.append(f"Loading {len(chunk)} mappings failed: {result['error']}")
+        else:
+            loaded += len(chunk)
+    if loaded:
+        run_sql(f"ANALYZE {m};")
+    return loaded, errors
+
+
+def drop_mapping_table(run_sql, map_table=WORK_TABLE):
+    return run_sql(f"DROP TABLE IF EXISTS {sql_identifier(map_table)};")
+
+
+def build_batch_rewrite(table, column, is_array, last_key, batch_size, map_table=WORK_TABLE, key_column=KEY_COLUMN):
+    """Rewrite one keyset page of `table` (rows after last_key, in key order)
+
+    The statement reports (rows scanned, rows updated, last key of the page).
+    """
+    t, k = sql_identifier(table), sql_identifier(key_column)
+    set_clause, from_item, condition = _rewrite_parts(column, is_array, map_table)
+    after = f" WHERE {k} > {sql_literal(last_key)}" if last_key is not None else ''
+    from_items = ', '.join(item for item in ('batch AS b', from_item) if item)
+    return (
+        "WITH batch AS (\n"
+        f"  SELECT {k} FROM {t}{after} ORDER BY {k} LIMIT {int(batch_size)}\n"
+        "), updated AS (\n"
+        f"  UPDATE {t} AS t SET {set_clause}\n"
+        f"  FROM {from_items}\n"
+        f"  WHERE t.{k} = b.{k} AND {condition}\n"
+        "  RETURNING 1\n"
+        ")\n"
+        f"SELECT (SELECT count(*) FROM batch), (SELECT count(*) FROM updated), (SELECT max({k}) FROM batch);"
+    )
+
+
+def rewrite_column(run_sql, table, column, is_array, batch_size=DEFAULT_BATCH_SIZE, pause=0.0,
+                   progress=None, map_table=WORK_TABLE):
+    """Rewrite table.column batch by batch, each batch its own transaction
+
+    With a MigrationJournal as `progress`, the last key of every committed
+    batch is recorded under "table.column" and a rerun continues after it.
+    Returns (rows_scanned, rows_updated, error or None).
+    """
+    key = f"{table}.{column}"
+    entry = progress.get(key) if progress else None
+    if entry and entry['stage'] == STAGE_DONE:
+        return entry['rows_scanned'], entry['rows_updated'], None
+    last_key = entry['last_key'] if entry else None
+    scanned = entry['rows_scanned'] if entry else 0
+    updated = entry['rows_updated'] if entry else 0
+
+    while True:
+        result = run_sql(build_batch_rewrite(table, column, is_array, last_key, batch_size, map_table))
+        if 'error' in result or result.get('result_type') != 'TuplesOk':
+            return scanned, updated, f"{key} batch after {last_key!r} failed: {result.get('error', result)}"
+        batch_rows, batch_updated, batch_last = result['result'][1]
+        if int(batch_rows) == 0:
+            break
+        scanned += int(batch_rows)
+        updated += int(batch_updated)
+        last_key = batch_last
+        if progress:
+            progress.record(key, STAGE_BATCH, last_key=last_key, rows_scanned=scanned, rows_updated=updated)
+        if int(batch_rows) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    if progress:
+        progress.record(key, STAGE_DONE, last_key=last_key, rows_scanned=scanned, rows_updated=updated)
+    return scanned, updated, None